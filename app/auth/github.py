@@ -1,4 +1,3 @@
-import httpx
 from app.auth.providers import OAuthProvider
 
 
@@ -14,31 +13,31 @@ class GitHubOAuthProvider(OAuthProvider):
         return url
 
     async def exchange_code_for_token(self, code: str, redirect_uri: str) -> dict:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.config.access_token_url,
-                data={
-                    "client_id": self.config.client_id,
-                    "client_secret": self.config.client_secret,
-                    "code": code,
-                },
-                headers={"Accept": "application/json"},
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self.http_client.post(
+            self.config.access_token_url,
+            data={
+                "client_id": self.config.client_id,
+                "client_secret": self.config.client_secret,
+                "code": code,
+            },
+            headers={"Accept": "application/json"},
+            timeout=self.config.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
 
     async def get_user_info(self, access_token: str) -> dict:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                self.config.user_info_url,
-                headers={"Authorization": f"Bearer {access_token}"},
-            )
-            response.raise_for_status()
-            user_data = response.json()
+        response = await self.http_client.get(
+            self.config.user_info_url,
+            headers={"Authorization": f"Bearer {access_token}"},
+            timeout=self.config.timeout,
+        )
+        response.raise_for_status()
+        user_data = response.json()
 
-            return {
-                "id": str(user_data.get("id")),
-                "email": user_data.get("email"),
-                "name": user_data.get("name") or user_data.get("login"),
-                "avatar_url": user_data.get("avatar_url"),
-            }
+        return {
+            "id": str(user_data.get("id")),
+            "email": user_data.get("email"),
+            "name": user_data.get("name") or user_data.get("login"),
+            "avatar_url": user_data.get("avatar_url"),
+        }
@@ -5,6 +5,7 @@ import base64
 import binascii
 
 from app.core.config import get_settings
+from app.auth.identity_cache import identity_cache
 from app.auth.user_service import find_or_create_user, create_user_token
 
 settings = get_settings()
@@ -84,8 +85,8 @@ class HeaderAuthManager:
             "azure_app_service": AzureAppServiceProvider()
         }
 
-    async def authenticate_from_headers(self, request: Request) -> Optional[str]:
-        """Authenticate user from headers and return JWT token"""
+    def extract_user_info(self, request: Request) -> Optional[Dict[str, Any]]:
+        """Extract user info from the first enabled provider whose headers are present"""
         if not settings.header_auth_enabled:
             return None
 
@@ -93,17 +94,41 @@ class HeaderAuthManager:
         if settings.databricks_header_auth:
             user_info = self.providers["databricks"].extract_user_info(request)
             if user_info:
-                return await self._create_or_get_user(user_info)
+                return user_info
 
         if settings.azure_app_service_auth:
             user_info = self.providers["azure_app_service"].extract_user_info(request)
             if user_info:
-                return await self._create_or_get_user(user_info)
+                return user_info
 
         return None
 
-    async def _create_or_get_user(self, user_info: Dict[str, Any]) -> str:
-        """Create user or get existing user and return JWT token"""
+    async def resolve_user(self, request: Request) -> Optional[Dict[str, Any]]:
+        """
+        Authenticate user from headers and return the resolved user dict.
+        Served from the identity cache when possible, so repeat requests skip
+        the database lookup and JWT round trip.
+        """
+        user_info = self.extract_user_info(request)
+        if not user_info:
+            return None
+
+        user = identity_cache.get(user_info["provider"], user_info["provider_id"])
+        if user is None:
+            user = await self._create_or_get_user(user_info)
+            identity_cache.set(user_info["provider"], user_info["provider_id"], user)
+        return user
+
+    async def authenticate_from_headers(self, request: Request) -> Optional[str]:
+        """Authenticate user from headers and return JWT token"""
+        user = await self.resolve_user(request)
+        if not user:
+            return None
+
+        return create_user_token({"_id": user["id"], **user})
+
+    async def _create_or_get_user(self, user_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Create user or get existing user and return the resolved user dict"""
         # Find or create user using shared service
         user = await find_or_create_user(
             provider=user_info["provider"],
@@ -113,8 +138,13 @@ class HeaderAuthManager:
             avatar_url=user_info.get("avatar_url"),
         )
 
-        # Create JWT token
-        return create_user_token(user)
+        return {
+            "id": str(user["_id"]),
+            "email": user["email"],
+            "name": user.get("name", "User"),
+            "role": user.get("role", "user"),
+            "auth_method": "header",
+        }
 
 
 # Global instance
@@ -0,0 +1,47 @@
+from typing import Optional, Dict, Any
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.metrics import CACHE_COUNTERS, register_stats
+
+settings = get_settings()
+
+
+class IdentityCache:
+    """
+    Cache of resolved users keyed on the header-auth provider identity.
+
+    Lets header-authenticated requests skip the `users` lookup and the JWT
+    round trip. Entries expire after `identity_cache_ttl_seconds` and must be
+    invalidated explicitly when a user's role changes.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    def get(self, provider: str, provider_id: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get((provider, provider_id))
+
+    def set(self, provider: str, provider_id: str, user: Dict[str, Any]) -> None:
+        self._cache.set((provider, provider_id), user)
+
+    def invalidate(self, provider: str, provider_id: str) -> None:
+        self._cache.pop((provider, provider_id))
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Drop every cached identity that resolves to the given user id"""
+        return self._cache.invalidate_where(lambda _, user: user.get("id") == user_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+# Global instance
+identity_cache = IdentityCache(
+    max_size=settings.identity_cache_max_size,
+    ttl=settings.identity_cache_ttl_seconds,
+)
+register_stats("app_cache", identity_cache.stats, counters=CACHE_COUNTERS, cache="identity")
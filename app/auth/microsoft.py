@@ -1,4 +1,3 @@
-import httpx
 from app.auth.providers import OAuthProvider
 
 
@@ -15,33 +14,33 @@ class MicrosoftOAuthProvider(OAuthProvider):
         return url
 
     async def exchange_code_for_token(self, code: str, redirect_uri: str) -> dict:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                self.config.access_token_url,
-                data={
-                    "client_id": self.config.client_id,
-                    "client_secret": self.config.client_secret,
-                    "code": code,
-                    "redirect_uri": redirect_uri,
-                    "grant_type": "authorization_code",
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self.http_client.post(
+            self.config.access_token_url,
+            data={
+                "client_id": self.config.client_id,
+                "client_secret": self.config.client_secret,
+                "code": code,
+                "redirect_uri": redirect_uri,
+                "grant_type": "authorization_code",
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=self.config.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
 
     async def get_user_info(self, access_token: str) -> dict:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                self.config.user_info_url,
-                headers={"Authorization": f"Bearer {access_token}"},
-            )
-            response.raise_for_status()
-            user_data = response.json()
+        response = await self.http_client.get(
+            self.config.user_info_url,
+            headers={"Authorization": f"Bearer {access_token}"},
+            timeout=self.config.timeout,
+        )
+        response.raise_for_status()
+        user_data = response.json()
 
-            return {
-                "id": user_data.get("id"),
-                "email": user_data.get("mail") or user_data.get("userPrincipalName"),
-                "name": user_data.get("displayName"),
-                "avatar_url": None,
-            }
+        return {
+            "id": user_data.get("id"),
+            "email": user_data.get("mail") or user_data.get("userPrincipalName"),
+            "name": user_data.get("displayName"),
+            "avatar_url": None,
+        }
@@ -2,8 +2,11 @@ from fastapi import Request, HTTPException
 from fastapi.responses import RedirectResponse
 from typing import Optional
 from app.core.security import decode_access_token
+from app.core.timing import phase
 from app.auth.header_auth import header_auth_manager
 
+_UNRESOLVED = object()
+
 
 async def get_current_user(request: Request) -> Optional[dict]:
     """
@@ -12,7 +15,18 @@ async def get_current_user(request: Request) -> Optional[dict]:
     2. Header-based authentication (Databricks/Azure App Service)
     
     Returns user dict with id, email, name, role, and auth_method.
+    The result is memoized on request.state, so dependencies and handlers
+    calling this several times per request resolve the user only once.
     """
+    user = getattr(request.state, "current_user", _UNRESOLVED)
+    if user is _UNRESOLVED:
+        with phase("auth"):
+            user = await _resolve_current_user(request)
+        request.state.current_user = user
+    return user
+
+
+async def _resolve_current_user(request: Request) -> Optional[dict]:
     # First try JWT token from cookies (OAuth flow)
     token = request.cookies.get("access_token")
     if token:
@@ -27,17 +41,9 @@ async def get_current_user(request: Request) -> Optional[dict]:
             }
     
     # Then try header-based authentication
-    header_token = await header_auth_manager.authenticate_from_headers(request)
-    if header_token:
-        payload = decode_access_token(header_token)
-        if payload:
-            return {
-                "id": payload.get("sub"),
-                "email": payload.get("email"),
-                "name": payload.get("name"),
-                "role": payload.get("role", "user"),  # Include role
-                "auth_method": "header"
-            }
+    user = await header_auth_manager.resolve_user(request)
+    if user:
+        return dict(user)
     
     return None
 
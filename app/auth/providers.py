@@ -1,5 +1,15 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+import importlib.util
+from typing import TYPE_CHECKING, Callable
+
+from app.core.config import get_settings
+from app.core.metrics import register_stats
+
+if TYPE_CHECKING:
+    import httpx
+
+settings = get_settings()
 
 
 @dataclass
@@ -10,11 +20,18 @@ class OAuthProviderConfig:
     access_token_url: str
     user_info_url: str
     scope: str
+    timeout: float = 10.0  # Seconds, per request to this provider
 
 
 class OAuthProvider(ABC):
     def __init__(self, config: OAuthProviderConfig):
         self.config = config
+        self.registry: "OAuthProviderRegistry | None" = None
+
+    @property
+    def http_client(self) -> "httpx.AsyncClient":
+        """Pooled client shared by all providers of the registry this provider belongs to"""
+        return (self.registry or registry).http_client
 
     @abstractmethod
     def get_authorization_url(self, redirect_uri: str, state: str) -> str:
@@ -32,15 +49,86 @@ class OAuthProvider(ABC):
 class OAuthProviderRegistry:
     def __init__(self):
         self._providers: dict[str, OAuthProvider] = {}
+        # Providers whose module is imported on first use (fast start)
+        self._factories: dict[str, Callable[[], OAuthProvider]] = {}
+        self._http_client: "httpx.AsyncClient | None" = None
+        self.requests_sent = 0
+        self.connections_opened = 0
 
     def register(self, name: str, provider: OAuthProvider):
+        provider.registry = self
         self._providers[name] = provider
 
+    def register_lazy(self, name: str, factory: Callable[[], OAuthProvider]):
+        """Register a provider built (and its module imported) on first `get`"""
+        self._factories[name] = factory
+
     def get(self, name: str) -> OAuthProvider | None:
-        return self._providers.get(name)
+        provider = self._providers.get(name)
+        if provider is None and name in self._factories:
+            provider = self._factories.pop(name)()
+            self.register(name, provider)
+            # Fast start defers the HTTP client until a provider is first used
+            self._open_client()
+        return provider
+
+    def load_all(self):
+        """Build every lazily registered provider now"""
+        for name in list(self._factories):
+            self.get(name)
 
     def list_providers(self) -> list[str]:
-        return list(self._providers.keys())
+        return [*self._providers, *self._factories]
+
+    async def startup(self, transport: "httpx.AsyncBaseTransport | None" = None):
+        """Open the shared keep-alive HTTP client (called from the app lifespan)"""
+        self._open_client(transport)
+
+    def _open_client(self, transport: "httpx.AsyncBaseTransport | None" = None):
+        if self._http_client is not None:
+            return
+        import httpx
+
+        # HTTP/2 needs the optional h2 package
+        http2 = settings.oauth_http2 and importlib.util.find_spec("h2") is not None
+        self._http_client = httpx.AsyncClient(
+            http2=http2,
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=settings.oauth_http_max_connections,
+                max_keepalive_connections=settings.oauth_http_max_connections,
+                keepalive_expiry=settings.oauth_http_keepalive_expiry_seconds,
+            ),
+            event_hooks={"request": [self._on_request]},
+        )
+
+    async def aclose(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    @property
+    def http_client(self) -> "httpx.AsyncClient":
+        if self._http_client is None:
+            raise RuntimeError("OAuth HTTP client not started; call registry.startup() first")
+        return self._http_client
+
+    async def _on_request(self, request: "httpx.Request"):
+        self.requests_sent += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: dict):
+        # httpcore only emits connect events when a new connection is opened
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    def connection_stats(self) -> dict:
+        return {
+            "requests": self.requests_sent,
+            "connections_opened": self.connections_opened,
+            "connections_reused": max(0, self.requests_sent - self.connections_opened),
+        }
 
 
 registry = OAuthProviderRegistry()
+register_stats("oauth_http", registry.connection_stats, counters=("requests", "connections_opened", "connections_reused"))
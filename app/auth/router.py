@@ -1,66 +1,86 @@
-from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+import importlib
 import secrets
 
 from app.core.config import get_settings
-from app.auth.providers import registry, OAuthProviderConfig
-from app.auth.github import GitHubOAuthProvider
-from app.auth.google import GoogleOAuthProvider
-from app.auth.microsoft import MicrosoftOAuthProvider
+from app.auth.providers import registry, OAuthProvider, OAuthProviderConfig
 from app.auth.schemas import AuthUrlResponse, TokenResponse, UserResponse
 from app.auth.user_service import find_or_create_user, create_user_token
+from app.auth.identity_cache import identity_cache
+from app.auth.middleware import require_admin
 from fastapi.responses import HTMLResponse
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 settings = get_settings()
 
 
+def _provider_factory(module: str, class_name: str, config: OAuthProviderConfig):
+    """Build the provider on first use, importing its module only then"""
+    def factory() -> OAuthProvider:
+        return getattr(importlib.import_module(module), class_name)(config)
+    return factory
+
+
 def init_oauth_providers():
     """Initialize OAuth providers based on config"""
     if settings.github_client_id and settings.github_client_secret:
-        registry.register(
+        registry.register_lazy(
             "github",
-            GitHubOAuthProvider(
+            _provider_factory(
+                "app.auth.github",
+                "GitHubOAuthProvider",
                 OAuthProviderConfig(
                     client_id=settings.github_client_id,
                     client_secret=settings.github_client_secret,
+                    timeout=settings.github_timeout_seconds,
                     authorize_url="https://github.com/login/oauth/authorize",
                     access_token_url="https://github.com/login/oauth/access_token",
                     user_info_url="https://api.github.com/user",
                     scope="user:email",
-                )
+                ),
             ),
         )
 
     if settings.google_client_id and settings.google_client_secret:
-        registry.register(
+        registry.register_lazy(
             "google",
-            GoogleOAuthProvider(
+            _provider_factory(
+                "app.auth.google",
+                "GoogleOAuthProvider",
                 OAuthProviderConfig(
                     client_id=settings.google_client_id,
                     client_secret=settings.google_client_secret,
+                    timeout=settings.google_timeout_seconds,
                     authorize_url="https://accounts.google.com/o/oauth2/v2/auth",
                     access_token_url="https://oauth2.googleapis.com/token",
                     user_info_url="https://www.googleapis.com/oauth2/v2/userinfo",
                     scope="openid email profile",
-                )
+                ),
             ),
         )
 
     if settings.microsoft_client_id and settings.microsoft_client_secret:
-        registry.register(
+        registry.register_lazy(
             "microsoft",
-            MicrosoftOAuthProvider(
+            _provider_factory(
+                "app.auth.microsoft",
+                "MicrosoftOAuthProvider",
                 OAuthProviderConfig(
                     client_id=settings.microsoft_client_id,
                     client_secret=settings.microsoft_client_secret,
+                    timeout=settings.microsoft_timeout_seconds,
                     authorize_url="https://login.microsoftonline.com/common/oauth2/v2.0/authorize",
                     access_token_url="https://login.microsoftonline.com/common/oauth2/v2.0/token",
                     user_info_url="https://graph.microsoft.com/v1.0/me",
                     scope="openid email profile",
-                )
+                ),
             ),
         )
 
+    # Without fast start, import and build them all now, as before
+    if not settings.fast_start:
+        registry.load_all()
+
 
 @router.get("/providers")
 async def list_providers(request: Request):
@@ -70,6 +90,18 @@ async def list_providers(request: Request):
     return {"providers": providers}
 
 
+@router.get("/identity-cache/stats")
+async def identity_cache_stats(user: dict = Depends(require_admin)):
+    """Hit/miss counters of the header-auth identity cache - Admin only"""
+    return identity_cache.stats()
+
+
+@router.get("/http-client/stats")
+async def http_client_stats(user: dict = Depends(require_admin)):
+    """Connection reuse counters of the shared OAuth HTTP client - Admin only"""
+    return registry.connection_stats()
+
+
 @router.get("/login/{provider}", response_model=AuthUrlResponse)
 async def login(provider: str):
     """Start OAuth login flow"""
@@ -1,45 +1,36 @@
-import os
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.auth.identity_cache import identity_cache
 from app.core.collections import users_collection
+from app.core.config import get_settings
 from app.core.security import create_access_token
 from app.models.user import User, UserRole
 
+settings = get_settings()
+
 
 async def find_or_create_user(provider: str, provider_id: str, email: str, name: str, avatar_url: str = None, role: UserRole = None) -> dict:
     """
     Find existing user or create a new one.
     Returns the user document with _id.
-    
+
+    One atomic upsert on the unique (provider, provider_id) index: concurrent
+    first logins resolve to the same user, and existing users are returned
+    unchanged.
+
     Args:
         provider: OAuth provider (github, google, microsoft)
         provider_id: Unique ID from provider
         email: User email
         name: User display name
         avatar_url: Optional avatar URL
-        role: User role (default: determined by ADMIN_EMAILS env var, else USER)
+        role: User role for a new user (default: ADMIN if the email is in ADMIN_EMAILS, else USER)
     """
-    collection = users_collection.collection
-    
-    # Find existing user
-    user = await collection.find_one({
-        "provider": provider,
-        "provider_id": provider_id,
-    })
-    
-    if user:
-        return user
-    
-    # Determine role: use provided role, or check ADMIN_EMAILS env var
     if role is None:
-        admin_emails = os.getenv("ADMIN_EMAILS", "").split(",")
-        admin_emails = [e.strip().lower() for e in admin_emails if e.strip()]
-        
-        # Grant admin if email is in ADMIN_EMAILS
-        if email and email.lower() in admin_emails:
-            role = UserRole.ADMIN
-        else:
-            role = UserRole.USER
-    
-    # Create new user with determined role
+        role = UserRole.ADMIN if email and email.lower() in settings.admin_emails else UserRole.USER
+
     user_data = User(
         email=email or f"{provider}@local",
         name=name or "User",
@@ -48,13 +39,45 @@ async def find_or_create_user(provider: str, provider_id: str, email: str, name:
         avatar_url=avatar_url,
         role=role,
     )
-    user_dict = user_data.model_dump(by_alias=True, exclude_none=True)
-    user_dict.pop('_id', None)
-    
-    result = await collection.insert_one(user_dict)
-    user = await collection.find_one({"_id": result.inserted_id})
-    
-    return user
+    # The _id is chosen here, so a new user's document is known without reading it back
+    new_user = {**user_data.model_dump(by_alias=True, exclude_none=True), "_id": ObjectId(), "role": role.value}
+    identity = {"provider": provider, "provider_id": provider_id}
+    on_insert = {key: value for key, value in new_user.items() if key not in identity}
+
+    collection = users_collection.collection
+    for attempt in range(2):
+        try:
+            # BEFORE: the existing user, or None when this call inserted new_user
+            user = await collection.find_one_and_update(
+                identity,
+                {"$setOnInsert": on_insert},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+            )
+            break
+        except DuplicateKeyError:
+            # A concurrent upsert inserted the user first; the retry matches it
+            if attempt:
+                raise
+    if user is not None:
+        return user
+
+    await users_collection.cached.invalidate()
+    return new_user
+
+
+async def update_user_role(user_id: str, role: UserRole) -> bool:
+    """
+    Change a user's role and drop their cached identity so the new role
+    takes effect on the next header-authenticated request.
+    Returns True if the user exists.
+    """
+    result = await users_collection.cached.update_one(
+        {"_id": ObjectId(user_id)},
+        {"$set": {"role": role.value, "updated_at": datetime.now(timezone.utc)}},
+    )
+    identity_cache.invalidate_user(user_id)
+    return result.matched_count > 0
 
 
 def create_user_token(user: dict) -> str:
@@ -0,0 +1,165 @@
+"""
+Fingerprinted static assets.
+
+The build step minifies the stylesheets and scripts in app/static and
+writes them to app/static/dist under content-hashed names (cyberpunk.css
+-> cyberpunk.<hash>.css), with precompressed .gz (and, when the optional
+brotli package is installed, .br) variants and a manifest.json mapping
+source to hashed names. It runs at startup, or ahead of time for read-only
+images:
+
+    python -m app.core.assets
+
+Templates link assets with `asset_url("cyberpunk.css")`. Hashed files are
+served by AssetFiles with `Cache-Control: immutable` and the best
+precompressed variant the browser accepts; a changed file gets a new name,
+so browsers never revalidate. Files missing from the manifest fall back to
+their plain /static URL.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+from pathlib import Path
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.staticfiles import StaticFiles
+
+from app.core.compression import available_encodings, compress, negotiate
+
+STATIC_DIR = Path(__file__).parent.parent / "static"
+DIST = "dist"
+IMMUTABLE = "public, max-age=31536000, immutable"
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+logger = logging.getLogger(__name__)
+
+
+_CSS_STRING = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""")
+_CSS_COMMENT_OR_STRING = re.compile(r"/\*.*?\*/|" + _CSS_STRING.pattern, re.S)
+
+
+def _minify_css_code(css: str) -> str:
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    return re.sub(r":\s+", ":", css)
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and insignificant whitespace, leaving string literals alone"""
+    # Comments go first, so quotes inside them don't look like strings
+    css = _CSS_COMMENT_OR_STRING.sub(lambda match: match.group(1) or "", css)
+    parts = _CSS_STRING.split(css)
+    # split() with a capturing group: odd parts are the strings
+    css = "".join(part if index % 2 else _minify_css_code(part) for index, part in enumerate(parts))
+    return css.replace(";}", "}").strip()
+
+
+MINIFIERS = {
+    ".css": minify_css,
+    ".js": str.strip,
+}
+
+
+def _write(path: Path, data: bytes) -> None:
+    # Atomic, so workers building at the same time never serve a partial file
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def build(static_dir: Path = STATIC_DIR) -> dict:
+    """Write the hashed, minified and precompressed assets and their manifest; returns the manifest"""
+    dist = static_dir / DIST
+    dist.mkdir(exist_ok=True)
+    files = {}
+    for source in sorted(static_dir.iterdir()):
+        minify = MINIFIERS.get(source.suffix)
+        if minify is None or not source.is_file():
+            continue
+        data = minify(source.read_text()).encode()
+        name = f"{source.stem}.{hashlib.sha256(data).hexdigest()[:12]}{source.suffix}"
+        files[source.name] = name
+        # Same name, same content: earlier builds' files are kept for pages still referencing them
+        if not (dist / name).exists():
+            _write(dist / name, data)
+        for encoding in available_encodings():
+            variant = dist / f"{name}{SUFFIXES[encoding]}"
+            if not variant.exists():
+                _write(variant, compress(data, encoding))
+
+    manifest = {"files": files, "encodings": list(available_encodings())}
+    _write(dist / "manifest.json", json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+class AssetManifest:
+    def __init__(self):
+        self.files: dict[str, str] = {}
+        self.encodings: tuple[str, ...] = ()
+
+    def load(self, build_assets: bool, static_dir: Path = STATIC_DIR) -> None:
+        """Build the assets (or read a prebuilt manifest); on failure asset_url serves plain files"""
+        try:
+            if build_assets:
+                manifest = build(static_dir)
+            else:
+                manifest = json.loads((static_dir / DIST / "manifest.json").read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Static assets not fingerprinted, serving plain files: {e}")
+            return
+        self.files = manifest["files"]
+        self.encodings = tuple(manifest["encodings"])
+
+    def url(self, path: str) -> str:
+        hashed = self.files.get(path)
+        return f"/static/{DIST}/{hashed}" if hashed else f"/static/{path}"
+
+
+manifest = AssetManifest()
+
+
+def asset_url(path: str) -> str:
+    """URL of a file in app/static: its fingerprinted name once built"""
+    return manifest.url(path)
+
+
+class AssetFiles(StaticFiles):
+    """StaticFiles serving fingerprinted assets precompressed and cached forever"""
+
+    async def get_response(self, path: str, scope):
+        if not path.startswith(f"{DIST}/") or path.endswith(".json"):
+            return await super().get_response(path, scope)
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), manifest.encodings)
+        stat_result = None
+        if encoding:
+            _, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + SUFFIXES[encoding])
+        response = await super().get_response(path + SUFFIXES[encoding] if stat_result else path, scope)
+        if stat_result and response.status_code == 200:
+            # The media type is guessed from the name without the encoding suffix
+            response.headers["content-encoding"] = encoding
+        response.headers["cache-control"] = IMMUTABLE
+        response.headers["vary"] = "Accept-Encoding"
+        return response
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO)
+    built = build()
+    for source, name in built["files"].items():
+        size = (STATIC_DIR / source).stat().st_size
+        minified = (STATIC_DIR / DIST / name).stat().st_size
+        variants = ", ".join(
+            f"{encoding} {(STATIC_DIR / DIST / (name + SUFFIXES[encoding])).stat().st_size} B"
+            for encoding in built["encodings"]
+        )
+        print(f"{source}: {size} B -> {name} {minified} B ({variants})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
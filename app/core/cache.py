@@ -0,0 +1,370 @@
+"""Caching primitives: an in-process TTL/LRU cache and the collection cache backends."""
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after a time-to-live.
+
+    Entries are evicted least-recently-used first once `max_size` is reached.
+    A `max_size` of 0 disables the cache (every lookup is a miss).
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float | None = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Store a value; `ttl` overrides the cache-wide time-to-live for this entry."""
+        if self.max_size <= 0:
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            self._data.pop(key, None)
+            return
+
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Drop every entry for which `predicate(key, value)` is true. Returns the number dropped."""
+        keys = [key for key, (value, _) in self._data.items() if predicate(key, value)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CacheBackend(ABC):
+    """Byte-string store behind the collection cache (see CachedCollection)"""
+
+    name = "backend"
+    # Whether every worker process sees the same data
+    shared = False
+    hits = 0
+    misses = 0
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        pass
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    @abstractmethod
+    async def get_counters(self, *keys: str) -> list[int] | None:
+        """Counters in one round trip, 0 when never set; None when the server can't be reached"""
+
+    @abstractmethod
+    async def get_with_counter(self, counter: str, key: str) -> tuple[int | None, bytes | None]:
+        """A counter and a value in one round trip; the counter is None when the server can't be reached"""
+
+    @abstractmethod
+    async def incr(self, key: str, stamp_key: str | None = None) -> int | None:
+        """
+        Increment a counter that never expires; returns the new value, None when that failed.
+        With `stamp_key`, also set that counter to the current time in milliseconds, in the same round trip.
+        """
+
+    def record_lookup(self, hit: bool) -> None:
+        """Count a lookup whose result the caller validated (get_with_counter doesn't count)"""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    async def aclose(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process LRU with TTL; writes in other workers are only seen once entries expire"""
+
+    name = "memory"
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 30.0):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        # Kept apart from the LRU so eviction can never roll a counter back
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        value = self._cache.get(key)
+        self.record_lookup(value is not None)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        # Counters stay: resetting a generation to 0 would bring back entries written under it
+        for key in keys:
+            self._cache.pop(key)
+
+    async def get_counters(self, *keys: str) -> list[int]:
+        return [self._counters.get(key, 0) for key in keys]
+
+    async def get_with_counter(self, counter: str, key: str) -> tuple[int | None, bytes | None]:
+        return self._counters.get(counter, 0), self._cache.get(key)
+
+    async def incr(self, key: str, stamp_key: str | None = None) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        if stamp_key is not None:
+            self._counters[stamp_key] = int(time.time() * 1000)
+        return self._counters[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            **self._cache.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+class _RespConnection:
+    """One connection speaking RESP2, the Redis serialization protocol"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int, password: str | None, db: int) -> "_RespConnection":
+        reader, writer = await asyncio.open_connection(host, port)
+        connection = cls(reader, writer)
+        try:
+            if password:
+                await connection.execute("AUTH", password)
+            if db:
+                await connection.execute("SELECT", db)
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    async def execute(self, *args: str | bytes | int | float) -> Any:
+        return (await self.pipeline(args))[0]
+
+    async def pipeline(self, *commands: tuple) -> list:
+        """Send the commands together and read their replies: one round trip"""
+        self.writer.write(b"".join(self._encode(args) for args in commands))
+        await self.writer.drain()
+        replies, error = [], None
+        for _ in commands:
+            try:
+                replies.append(await self._read_reply())
+            except RespError as e:
+                # Read the remaining replies too, so the connection stays usable
+                error = error or e
+                replies.append(None)
+        if error is not None:
+            raise error
+        return replies
+
+    @staticmethod
+    def _encode(args: tuple) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    async def _read_reply(self) -> Any:
+        line = await self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by cache server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RespError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            return (await self.reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected reply from cache server: {line!r}")
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache on a Redis-protocol server (Redis, Valkey, KeyDB, or a local stand-in),
+    shared by all workers. Talks RESP directly over a small connection pool.
+
+    The cache is an optimisation: when the server is slow or unreachable,
+    reads are treated as misses and writes are skipped.
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str = "redis://localhost:6379/0", pool_size: int = 8, timeout: float = 0.25):
+        parsed = urlsplit(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle: list[_RespConnection] = []
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def _execute(self, *commands: tuple) -> list:
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(
+                        _RespConnection.open(self.host, self.port, self.password, self.db), self.timeout
+                    )
+                replies = await asyncio.wait_for(connection.pipeline(*commands), self.timeout)
+            except RespError:
+                # An error reply leaves an open connection in a good state
+                if connection is not None:
+                    self._idle.append(connection)
+                raise
+            except BaseException:
+                # Timed out or cancelled mid-reply: the stream can't be trusted any more
+                if connection is not None:
+                    connection.close()
+                raise
+            self._idle.append(connection)
+            return replies
+
+    async def _try(self, *args: str | bytes | int | float) -> Any:
+        replies = await self._try_pipeline(args)
+        return None if replies is None else replies[0]
+
+    async def _try_pipeline(self, *commands: tuple) -> list | None:
+        try:
+            return await self._execute(*commands)
+        except (OSError, ConnectionError, RespError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            self.errors += 1
+            names = " ".join(args[0] for args in commands)
+            logger.warning(f"Cache server {self.host}:{self.port} {names} failed: {e!r}")
+            return None
+
+    async def get(self, key: str) -> bytes | None:
+        value = await self._try("GET", key)
+        self.record_lookup(value is not None)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._try("SET", key, value, "PX", max(1, int(ttl * 1000)))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._try("DEL", *keys)
+
+    async def get_counters(self, *keys: str) -> list[int] | None:
+        reply = await self._try("MGET", *keys)
+        return None if reply is None else [int(value or 0) for value in reply]
+
+    async def get_with_counter(self, counter: str, key: str) -> tuple[int | None, bytes | None]:
+        reply = await self._try("MGET", counter, key)
+        if reply is None:
+            return None, None
+        return int(reply[0] or 0), reply[1]
+
+    async def incr(self, key: str, stamp_key: str | None = None) -> int | None:
+        if stamp_key is None:
+            return await self._try("INCR", key)
+        replies = await self._try_pipeline(("INCR", key), ("SET", stamp_key, int(time.time() * 1000)))
+        return None if replies is None else replies[0]
+
+    async def aclose(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "server": f"{self.host}:{self.port}/{self.db}",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "idle_connections": len(self._idle),
+        }
@@ -1,11 +1,236 @@
+"""
+Collection helpers.
+
+Each CollectionHelper names a MongoDB collection, declares its indexes as
+IndexSpec entries and optionally wraps reads in a CachedCollection backed by
+the memory or Redis cache backend. Versioned helpers carry a CollectionVersion
+for ETags. At startup ensure_all_indexes() creates the declared indexes and
+reports, per collection, any index found in the database but not declared.
+"""
+from dataclasses import dataclass
+import hashlib
+import logging
+from typing import Any
+import bson
+from bson import json_util
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+from app.core.cache import CacheBackend, MemoryCacheBackend, RedisCacheBackend
+from app.core.config import get_settings
 from app.core.database import get_collection
+from app.core.http_cache import CollectionVersion
+from app.core.metrics import CACHE_COUNTERS, register_stats
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """
+    Declared index on a collection; `expire_after_seconds` makes it a TTL
+    index, "text" keys a text index ranked by `weights`
+    """
+    keys: tuple[tuple[str, int | str], ...]
+    name: str | None = None
+    unique: bool = False
+    sparse: bool = False
+    expire_after_seconds: int | None = None
+    weights: tuple[tuple[str, int], ...] = ()
+
+    @property
+    def index_name(self) -> str:
+        # Same naming scheme MongoDB uses when no name is given
+        return self.name or "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    def to_model(self) -> IndexModel:
+        options: dict = {"name": self.index_name}
+        if self.unique:
+            options["unique"] = True
+        if self.sparse:
+            options["sparse"] = True
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        if self.weights:
+            options["weights"] = dict(self.weights)
+        return IndexModel(list(self.keys), **options)
+
+
+def _build_cache_backend() -> CacheBackend | None:
+    if settings.collection_cache_backend == "memory":
+        return MemoryCacheBackend(
+            max_size=settings.collection_cache_max_size,
+            ttl=settings.collection_cache_ttl_seconds,
+        )
+    if settings.collection_cache_backend == "redis":
+        return RedisCacheBackend(
+            settings.collection_cache_url,
+            pool_size=settings.collection_cache_pool_size,
+            timeout=settings.collection_cache_timeout_seconds,
+        )
+    return None
+
+
+# Shared by every collection; None when caching is off
+cache_backend = _build_cache_backend()
+
+
+class CachedCollection:
+    """
+    Read-through cache over a helper's collection (see CollectionHelper.cached).
+
+    Cached reads are stored with the collection's cache generation, which
+    every write through this wrapper increments, and are fetched together
+    with the current generation in one round trip: a write invalidates all
+    cached reads of the collection at once, and a read racing a write can
+    only store an entry that is already out of date. If incrementing the
+    generation fails (cache server unreachable), this worker reads straight
+    from MongoDB until an increment succeeds. Entries also expire after the
+    backend TTL, which bounds how long writes made around this wrapper go
+    unseen. Without a backend, reads go straight to MongoDB. On a backend
+    shared by the workers, each increment also stamps the time of the write,
+    and the generation serves as the collection version (see CollectionVersion).
+    """
+
+    def __init__(self, helper: "CollectionHelper", backend: CacheBackend | None, ttl: float):
+        self.helper = helper
+        self.backend = backend
+        self.ttl = ttl
+        self._generation_key = f"cc:{helper.name}:generation"
+        self._modified_key = f"cc:{helper.name}:modified"
+        self._bump_pending = False
+
+    def _key(self, *parts: Any) -> str:
+        digest = hashlib.sha1(json_util.dumps(parts).encode()).hexdigest()
+        return f"cc:{self.helper.name}:{digest}"
+
+    @property
+    def shared(self) -> bool:
+        return self.backend is not None and self.backend.shared
+
+    async def _bump_generation(self) -> None:
+        # Until an increment succeeds, entries from before the write could still look current
+        modified_key = self._modified_key if self.shared else None
+        self._bump_pending = await self.backend.incr(self._generation_key, modified_key) is None
+
+    async def read_generation(self) -> list[int] | None:
+        """[generation, time of the last write in epoch ms] in one round trip; None when unreachable"""
+        if self._bump_pending:
+            await self._bump_generation()
+            if self._bump_pending:
+                return None
+        return await self.backend.get_counters(self._generation_key, self._modified_key)
+
+    async def _read_through(self, key_parts: tuple, load) -> Any:
+        if self.backend is None:
+            return await load()
+        if self._bump_pending:
+            await self._bump_generation()
+            if self._bump_pending:
+                return await load()
+        key = self._key(*key_parts)
+        generation, cached = await self.backend.get_with_counter(self._generation_key, key)
+        if generation is None:
+            return await load()
+        if cached is not None:
+            entry = bson.decode(cached)
+            if entry["g"] == generation:
+                self.backend.record_lookup(True)
+                return entry["v"]
+        self.backend.record_lookup(False)
+        value = await load()
+        await self.backend.set(key, bson.encode({"g": generation, "v": value}), self.ttl)
+        return value
+
+    async def invalidate(self, shared_version: bool = True) -> None:
+        """
+        Drop every cached read of the collection and bump its version
+        (`shared_version=False`: this worker's only, for writes another worker already announced)
+        """
+        try:
+            await self.helper.version.bump(record=shared_version)
+        finally:
+            if self.backend is not None:
+                await self._bump_generation()
+
+    # Reads
+
+    async def find_one(self, filter: dict | None = None, projection: dict | None = None, sort: list | None = None) -> dict | None:
+        return await self._read_through(
+            ("find_one", filter, projection, sort),
+            lambda: self.helper.collection.find_one(filter, projection=projection, sort=sort),
+        )
+
+    async def find_list(self, filter: dict | None = None, projection: dict | None = None, sort: list | None = None, limit: int = 0) -> list[dict]:
+        """find(...).to_list(); only queries limited to `collection_cache_max_list` documents are cached"""
+        async def load():
+            cursor = self.helper.collection.find(filter or {}, projection=projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            return await cursor.to_list(length=limit or None)
+
+        if not 0 < limit <= settings.collection_cache_max_list:
+            return await load()
+        return await self._read_through(("find", filter, projection, sort, limit), load)
+
+    async def estimated_document_count(self) -> int:
+        return await self._read_through(("count",), self.helper.collection.estimated_document_count)
+
+    # Writes: each invalidates the collection's cached reads, even if it fails part-way
+
+    async def insert_one(self, document: dict, **kwargs):
+        try:
+            return await self.helper.collection.insert_one(document, **kwargs)
+        finally:
+            await self.invalidate()
+
+    async def update_one(self, filter: dict, update: dict | list, **kwargs):
+        try:
+            return await self.helper.collection.update_one(filter, update, **kwargs)
+        finally:
+            await self.invalidate()
+
+    async def delete_one(self, filter: dict, **kwargs):
+        try:
+            return await self.helper.collection.delete_one(filter, **kwargs)
+        finally:
+            await self.invalidate()
+
+    async def find_one_and_update(self, filter: dict, update: dict | list, **kwargs):
+        try:
+            return await self.helper.collection.find_one_and_update(filter, update, **kwargs)
+        finally:
+            await self.invalidate()
+
+    async def bulk_write(self, requests: list, **kwargs):
+        try:
+            return await self.helper.collection.bulk_write(requests, **kwargs)
+        finally:
+            await self.invalidate()
 
 
 class CollectionHelper:
-    def __init__(self, collection_name: str):
+    registry: list["CollectionHelper"] = []
+
+    def __init__(self, collection_name: str, indexes: list[IndexSpec] | None = None, versioned: bool = False):
         self._collection_name = collection_name
         self._collection: AsyncIOMotorCollection | None = None
+        self.indexes = indexes or []
+        # Bumped by writers; `versioned` shares it across workers, for ETags on pages rendered from this collection
+        self.version = CollectionVersion(collection_name, shared=versioned)
+        # Read-through cached access; use its write methods so cached reads stay coherent
+        self.cached = CachedCollection(self, cache_backend, settings.collection_cache_ttl_seconds)
+        if versioned and self.cached.shared:
+            # Every write already increments the shared cache generation: it doubles as the version
+            self.version.counter = self.cached.read_generation
+        CollectionHelper.registry.append(self)
+
+    @property
+    def name(self) -> str:
+        return self._collection_name
 
     @property
     def collection(self) -> AsyncIOMotorCollection:
@@ -13,7 +238,67 @@ class CollectionHelper:
             self._collection = get_collection(self._collection_name)
         return self._collection
 
+    async def ensure_indexes(self) -> list[str]:
+        """Create declared indexes that are missing. Idempotent; returns the names now in place."""
+        ensured = []
+        for spec in self.indexes:
+            try:
+                await self.collection.create_indexes([spec.to_model()])
+                ensured.append(spec.index_name)
+            except OperationFailure as e:
+                # e.g. duplicate keys for a unique index, or options changed on an existing index
+                logger.error(f"Failed to ensure index {self.name}.{spec.index_name}: {e}")
+        return ensured
+
+    async def index_drift(self) -> list[str]:
+        """Names of indexes that exist in the database but are not declared in code"""
+        existing = await self.collection.index_information()
+        declared = {spec.index_name for spec in self.indexes}
+        return sorted(name for name in existing if name != "_id_" and name not in declared)
+
+
+def collection_cache_stats() -> dict:
+    return cache_backend.stats() if cache_backend is not None else {"backend": "none"}
+
+
+register_stats("app_cache", collection_cache_stats, counters=CACHE_COUNTERS, cache="collection")
+
+
+async def close_collection_cache() -> None:
+    if cache_backend is not None:
+        await cache_backend.aclose()
+
+
+async def ensure_all_indexes() -> dict[str, list[str]]:
+    """Ensure declared indexes on every collection and return the drift report per collection"""
+    drift: dict[str, list[str]] = {}
+    for helper in CollectionHelper.registry:
+        await helper.ensure_indexes()
+        extra = await helper.index_drift()
+        if extra:
+            logger.warning(f"Collection {helper.name} has undeclared indexes: {', '.join(extra)}")
+            drift[helper.name] = extra
+    return drift
+
 
-users_collection = CollectionHelper("users")
-todos_collection = CollectionHelper("todo_items")
+users_collection = CollectionHelper(
+    "users",
+    indexes=[IndexSpec(keys=(("provider", 1), ("provider_id", 1)), unique=True)],
+)
+todos_collection = CollectionHelper(
+    "todo_items",
+    versioned=True,
+    indexes=[
+        IndexSpec(keys=(("rank", 1), ("_id", 1))),
+        IndexSpec(
+            keys=(("title", "text"), ("description", "text"), ("content", "text")),
+            name="todo_search",
+            weights=(("title", 10), ("description", 5), ("content", 1)),
+        ),
+    ],
+)
 features_collection = CollectionHelper("features")
+leases_collection = CollectionHelper(
+    "leases",
+    indexes=[IndexSpec(keys=(("expires_at", 1),), expire_after_seconds=0)],
+)
@@ -1,37 +1,138 @@
 from functools import lru_cache
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Annotated, Literal
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     app_name: str = "Home Server"
     debug: bool = False
+    # Prometheus metrics at /metrics, served only when metrics_token is set; scrapes must send
+    # `Authorization: Bearer <token>`
+    metrics_enabled: bool = True
+    metrics_token: str = ""
+    # Server-Timing header with auth/db/markdown/render phases: "off", "admin" (admin users only) or "all"
+    server_timing: Literal["off", "admin", "all"] = "admin"
+    # Dev mode: discover features added under app/features without a restart
+    # (edits to loaded features need `uvicorn --reload`)
+    feature_watch: bool = False
+    # Cold-start mode: import OAuth providers, markdown and feature routers on first use
+    fast_start: bool = False
+    # Seconds `import main` may take (python -m app.core.startup, tests/test_startup.py)
+    startup_budget_seconds: float = 2.0
+    # Fingerprint app/static at startup; turn off for read-only images built with python -m app.core.assets
+    static_build_on_startup: bool = True
+    # Compiled templates cached on disk across restarts (directory "": a per-user temp directory)
+    template_bytecode_cache: bool = True
+    template_bytecode_cache_dir: str = ""
+    template_stream_chunk_size: int = 4096  # Bytes buffered per chunk of a streamed page
+    # gzip/brotli compression of HTML, JSON, CSS and JS responses
+    compression_enabled: bool = True
+    compression_minimum_size: int = 500
+    # Token bucket per user (anonymous: per client IP): bursts of rate_limit_burst, refilled per second (0: off).
+    # Totals for the server: each of N worker processes allows 1/N
+    rate_limit_per_second: float = 10.0
+    rate_limit_burst: int = 40
+    rate_limit_max_keys: int = 100_000  # Buckets kept per worker
+    rate_limit_exempt_paths: list[str] = ["/static", "/healthz", "/readyz", "/metrics"]
+    # Shed requests with 503 past this many in flight per worker, or while the event loop lags this far (0: off)
+    overload_max_in_flight: int = 512
+    overload_max_loop_lag_seconds: float = 0.5
+    # Production server (python -m app.serve)
+    server_bind: str = "0.0.0.0:8000"  # host:port or unix:/path/to.sock
+    server_workers: int = 0  # 0: one per CPU
+    server_backlog: int = 2048
+    server_keepalive_seconds: int = 5
+    server_graceful_timeout_seconds: int = 30  # For in-flight requests on shutdown and recycling
+    server_max_requests: int = 0  # Replace a worker after this many requests (0: never)
+    server_max_requests_jitter: int = 100  # Random extra requests per worker, so workers recycle apart
 
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60 * 24 * 7
+    token_cache_max_size: int = 10_000
 
     mongodb_uri: str
     mongodb_db_name: str = "home_server"
+    # Connection pool (per worker process)
+    mongodb_max_pool_size: int = 100
+    mongodb_min_pool_size: int = 0
+    mongodb_max_idle_time_ms: int | None = None
+    mongodb_server_selection_timeout_ms: int = 30_000
+    mongodb_connect_timeout_ms: int = 20_000
+    mongodb_socket_timeout_ms: int | None = None
+    mongodb_compressors: str = ""  # e.g. "zstd,snappy,zlib"
+    # Connections to pre-open during startup
+    mongodb_warmup_connections: int = 1
+    # Create declared indexes at startup (see CollectionHelper in app/core/collections.py)
+    mongodb_ensure_indexes: bool = True
+    # Read-through cache for CollectionHelper.cached reads
+    collection_cache_backend: Literal["none", "memory", "redis"] = "none"
+    collection_cache_url: str = "redis://localhost:6379/0"  # Any Redis-protocol server
+    collection_cache_ttl_seconds: float = 30.0
+    collection_cache_max_size: int = 10_000  # Entries, memory backend only
+    collection_cache_max_list: int = 100  # Larger list queries bypass the cache
+    collection_cache_pool_size: int = 8
+    collection_cache_timeout_seconds: float = 0.25
+
+    todos_page_size: int = 50
+    todos_card_cache_size: int = 4096
+    # Live updates (Server-Sent Events)
+    sse_queue_size: int = 64  # Events buffered per viewer before it is dropped as a slow consumer
+    sse_keepalive_seconds: float = 15.0
+    todos_change_stream: bool = False  # Use a MongoDB change stream as the event source (replica sets only)
+    # Search: "text" (MongoDB text index), "memory" (in-process index) or "auto" (text, else memory)
+    todos_search_backend: Literal["auto", "text", "memory"] = "auto"
+    todos_search_limit: int = 50
+    todos_search_cache_size: int = 256  # Recent queries, per collection version
+    todos_search_cache_ttl_seconds: float = 30.0  # Also bounds staleness from other workers' writes
+    # Rebalance todo ranks in the background once one grows longer than this
+    todos_rank_max_length: int = 16
+    todos_transfer_batch_size: int = 500  # Cards per cursor batch (export) and bulk write (import)
 
     github_client_id: str = ""
     github_client_secret: str = ""
+    github_timeout_seconds: float = 10.0
 
     google_client_id: str = ""
     google_client_secret: str = ""
+    google_timeout_seconds: float = 10.0
 
     microsoft_client_id: str = ""
     microsoft_client_secret: str = ""
+    microsoft_timeout_seconds: float = 10.0
+
+    # Shared keep-alive HTTP client for OAuth providers
+    oauth_http_max_connections: int = 20
+    oauth_http_keepalive_expiry_seconds: float = 60.0
+    oauth_http2: bool = True  # Used when the optional h2 package is installed
 
     frontend_url: str = "http://localhost:8001"
+    # New users with these emails (comma-separated, any case) are created as admins
+    admin_emails: Annotated[frozenset[str], NoDecode] = frozenset()
 
     # Header-based authentication
     header_auth_enabled: bool = False
     databricks_header_auth: bool = False
     azure_app_service_auth: bool = False
     trusted_header_proxies: list[str] = ["127.0.0.1", "::1"]
+    identity_cache_ttl_seconds: int = 300
+    identity_cache_max_size: int = 10_000
 
     model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8')
 
+    @field_validator("admin_emails", mode="before")
+    @classmethod
+    def _parse_admin_emails(cls, value):
+        if isinstance(value, str):
+            value = value.split(",")
+        return frozenset(email.strip().lower() for email in value if email.strip())
+
 @lru_cache
 def get_settings() -> Settings:
     return Settings()
+
+
+# Worker processes serving the app: set by app.serve before forking, 1 under plain uvicorn.
+# Kept here rather than in app.serve, which runs as __main__ and would be imported twice.
+worker_processes = 1
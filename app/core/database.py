@@ -1,17 +1,134 @@
+import asyncio
+import logging
+import threading
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
 from app.core.config import get_settings
+from app.core.metrics import command_metrics, register_stats
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 client: AsyncIOMotorClient | None = None
 database: AsyncIOMotorDatabase | None = None
 
 
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters, updated by pymongo from its own threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.created = 0
+        self.closed = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def _add(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def connection_created(self, event):
+        self._add(open=1, created=1)
+
+    def connection_closed(self, event):
+        self._add(open=-1, closed=1)
+
+    def connection_checked_out(self, event):
+        self._add(checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
+    def connection_check_out_failed(self, event):
+        self._add(checkout_failures=1)
+
+    def pool_cleared(self, event):
+        self._add(pool_clears=1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "open": self.open,
+                "checked_out": self.checked_out,
+                "idle": self.open - self.checked_out,
+                "created": self.created,
+                "closed": self.closed,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+                "max_pool_size": settings.mongodb_max_pool_size,
+                "min_pool_size": settings.mongodb_min_pool_size,
+            }
+
+
+pool_stats = PoolStats()
+register_stats("mongodb_pool", pool_stats.snapshot, counters=("created", "closed", "checkout_failures", "pool_clears"))
+
+
+def _client_options() -> dict:
+    options = {
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": settings.mongodb_min_pool_size,
+        "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+        "connectTimeoutMS": settings.mongodb_connect_timeout_ms,
+        "event_listeners": [pool_stats, command_metrics],
+    }
+    if settings.mongodb_max_idle_time_ms is not None:
+        options["maxIdleTimeMS"] = settings.mongodb_max_idle_time_ms
+    if settings.mongodb_socket_timeout_ms is not None:
+        options["socketTimeoutMS"] = settings.mongodb_socket_timeout_ms
+    if settings.mongodb_compressors:
+        options["compressors"] = settings.mongodb_compressors
+    return options
+
+
 async def connect_to_mongodb():
     global client, database
-    client = AsyncIOMotorClient(settings.mongodb_uri)
+    client = AsyncIOMotorClient(settings.mongodb_uri, **_client_options())
     database = client[settings.mongodb_db_name]
 
 
+async def ping_mongodb() -> bool:
+    try:
+        await database.command("ping")
+        return True
+    except PyMongoError as e:
+        logger.warning(f"MongoDB ping failed: {e}")
+        return False
+
+
+async def warm_up_mongodb() -> bool:
+    """
+    Ping the server and pre-open `mongodb_warmup_connections` pooled connections,
+    so the first requests after a deploy don't pay connection setup.
+    Returns False if MongoDB is unreachable.
+    """
+    # Concurrent pings each check out their own connection; pinging once first would
+    # leave an idle connection for the others to reuse, opening one fewer
+    pings = max(1, settings.mongodb_warmup_connections)
+    if not any(await asyncio.gather(*(ping_mongodb() for _ in range(pings)))):
+        return False
+    logger.info(f"MongoDB warm: {pool_stats.snapshot()['open']} pooled connections open")
+    return True
+
+
 async def close_mongodb():
     global client
     if client:
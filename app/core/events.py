@@ -0,0 +1,88 @@
+"""In-process pub/sub broker for Server-Sent Events."""
+import asyncio
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Queued after a subscription is closed so a waiting consumer wakes up
+_CLOSED = object()
+
+
+class Subscription:
+    """A subscriber's bounded event queue"""
+
+    def __init__(self, topic: str, max_queue_size: int):
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.closed = False
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        # Drop pending events: the consumer is disconnected either way
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSED)
+
+    async def get(self) -> Any | None:
+        """Next event, or None once the subscription is closed"""
+        event = await self.queue.get()
+        return None if event is _CLOSED else event
+
+
+class EventBroker:
+    """
+    Fan-out of events to subscribers of a topic. Publishing never blocks:
+    a subscriber whose queue is full is a slow consumer and gets disconnected.
+    """
+
+    def __init__(self, max_queue_size: int = 64):
+        self.max_queue_size = max_queue_size
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self.published = 0
+        self.slow_consumers_dropped = 0
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscription = Subscription(topic, self.max_queue_size)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        subscribers = self._subscribers.get(subscription.topic)
+        if subscribers:
+            subscribers.discard(subscription)
+
+    def publish(self, topic: str, event: Any) -> int:
+        """Queue the event for every subscriber of the topic. Returns the number it reached."""
+        self.published += 1
+        delivered = 0
+        for subscription in list(self._subscribers.get(topic, ())):
+            try:
+                subscription.queue.put_nowait(event)
+                delivered += 1
+            except asyncio.QueueFull:
+                logger.info(f"Disconnecting slow event consumer on {topic}")
+                self.slow_consumers_dropped += 1
+                self.unsubscribe(subscription)
+        return delivered
+
+    def subscriber_count(self, topic: str | None = None) -> int:
+        if topic is not None:
+            return len(self._subscribers.get(topic, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.subscriber_count(),
+            "published": self.published,
+            "slow_consumers_dropped": self.slow_consumers_dropped,
+        }
+
+
+def format_sse(event: str, data: str) -> str:
+    """Encode one Server-Sent Event; multi-line data is split over data: fields"""
+    lines = "".join(f"data: {line}\n" for line in data.splitlines() or [""])
+    return f"event: {event}\n{lines}\n"
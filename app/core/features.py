@@ -1,47 +1,204 @@
+from dataclasses import dataclass
 from pathlib import Path
-from fastapi import APIRouter
-import importlib.util
+from fastapi import APIRouter, FastAPI
+import ast
+import asyncio
+import importlib
 import logging
+import sys
 
 FEATURES_DIR = Path(__file__).parent.parent / "features"
 logger = logging.getLogger(__name__)
 
 
 class Feature:
-    def __init__(self, name: str, router: APIRouter, url: str, description: str = ""):
+    def __init__(self, name: str, router: APIRouter | None, url: str, description: str = "", module_name: str = ""):
         self.name = name
-        self.router = router
+        self.router = router  # None until a lazily discovered feature is loaded
         self.url = url
         self.description = description
+        self.module_name = module_name
 
+    def load(self) -> APIRouter:
+        if self.router is None:
+            self.router = importlib.import_module(self.module_name).router
+        return self.router
+
+    def serves(self, path: str) -> bool:
+        return path == self.url or path.startswith(self.url.rstrip("/") + "/")
+
+
+@dataclass(frozen=True)
+class FeatureSnapshot:
+    """Immutable view of the discovered features, safe to share across requests"""
+    features: tuple[Feature, ...] = ()
+    fingerprint: tuple = ()
 
-def discover_features() -> list[Feature]:
-    features: list[Feature] = []
 
+def _feature_dirs() -> list[Path]:
     if not FEATURES_DIR.exists():
-        return features
+        return []
+    return sorted(
+        d for d in FEATURES_DIR.iterdir()
+        if d.is_dir() and not d.name.startswith("_") and (d / "router.py").exists()
+    )
+
+
+def _fingerprint() -> tuple:
+    """Cheap change marker for the features tree: (path, mtime) of every feature source file"""
+    return tuple(
+        (str(path), path.stat().st_mtime_ns)
+        for feature_dir in _feature_dirs()
+        for path in sorted(feature_dir.glob("*.py"))
+    )
+
+
+def _static_feature_info(router_path: Path) -> dict | None:
+    """`feature_info` read from the router source without importing it, if it is a plain literal"""
+    try:
+        tree = ast.parse(router_path.read_text())
+    except (OSError, SyntaxError):
+        return None
+    for node in tree.body:
+        if (
+            isinstance(node, ast.Assign)
+            and any(isinstance(target, ast.Name) and target.id == "feature_info" for target in node.targets)
+        ):
+            try:
+                return ast.literal_eval(node.value)
+            except ValueError:
+                return None
+    return None
+
+
+def discover_features(lazy: bool = False) -> list[Feature]:
+    """
+    Find feature routers under app/features. With `lazy`, routers whose
+    feature_info is a literal are not imported; they load on first request.
+    Routers already imported are reused as they are.
+    """
+    features: list[Feature] = []
+
+    for feature_dir in _feature_dirs():
+        try:
+            module_name = f"app.features.{feature_dir.name}.router"
+            module = sys.modules.get(module_name)
+            info = _static_feature_info(feature_dir / "router.py") if lazy and module is None else None
+            if info is not None:
+                features.append(
+                    Feature(
+                        name=info.get("name", feature_dir.name),
+                        router=None,
+                        url=info.get("url", f"/{feature_dir.name}"),
+                        description=info.get("description", ""),
+                        module_name=module_name,
+                    )
+                )
+                continue
+
+            if module is None:
+                module = importlib.import_module(module_name)
+
+            if hasattr(module, "router") and hasattr(module, "feature_info"):
+                features.append(
+                    Feature(
+                        name=module.feature_info.get("name", feature_dir.name),
+                        router=module.router,
+                        url=module.feature_info.get("url", f"/{feature_dir.name}"),
+                        description=module.feature_info.get("description", ""),
+                        module_name=module_name,
+                    )
+                )
+        except Exception as e:
+            logger.error(f"Failed to load feature {feature_dir.name}: {e}", exc_info=True)
+
+    return features
 
-    for feature_dir in FEATURES_DIR.iterdir():
-        if feature_dir.is_dir() and not feature_dir.name.startswith("_"):
-            router_path = feature_dir / "router.py"
-            if router_path.exists():
+
+class FeatureRegistry:
+    """
+    Startup-time registry of features.
+
+    The snapshot is built once (in the app lifespan) and read by request
+    handlers without touching the filesystem. In dev mode `watch()` rebuilds
+    it when a feature directory changes, which picks up new features; edits
+    to features already loaded need `uvicorn --reload`.
+    """
+
+    def __init__(self):
+        self._snapshot: FeatureSnapshot | None = None
+        self._mounted: set[str] = set()
+        self._lazy = False
+
+    def build(self, lazy: bool = False) -> FeatureSnapshot:
+        fingerprint = _fingerprint()
+        self._lazy = lazy
+        self._snapshot = FeatureSnapshot(
+            features=tuple(discover_features(lazy=lazy)),
+            fingerprint=fingerprint,
+        )
+        return self._snapshot
+
+    @property
+    def snapshot(self) -> FeatureSnapshot:
+        if self._snapshot is None:
+            return self.build()
+        return self._snapshot
+
+    @property
+    def features(self) -> tuple[Feature, ...]:
+        return self.snapshot.features
+
+    def mount(self, app: FastAPI) -> None:
+        """Include the router of every loaded feature not yet mounted on the app"""
+        for feature in self.snapshot.features:
+            if feature.router is not None and feature.url not in self._mounted:
+                app.include_router(feature.router)
+                self._mounted.add(feature.url)
+
+    def mount_for_path(self, app: FastAPI, path: str) -> None:
+        """Load and mount a lazily discovered feature on the first request to its URL"""
+        for feature in self.snapshot.features:
+            if feature.router is None and feature.serves(path):
                 try:
-                    module_name = f"app.features.{feature_dir.name}.router"
-                    spec = importlib.util.spec_from_file_location(module_name, router_path)
-                    if spec and spec.loader:
-                        module = importlib.util.module_from_spec(spec)
-                        spec.loader.exec_module(module)
-
-                        if hasattr(module, "router") and hasattr(module, "feature_info"):
-                            features.append(
-                                Feature(
-                                    name=module.feature_info.get("name", feature_dir.name),
-                                    router=module.router,
-                                    url=module.feature_info.get("url", f"/{feature_dir.name}"),
-                                    description=module.feature_info.get("description", ""),
-                                )
-                            )
+                    feature.load()
                 except Exception as e:
-                    logger.error(f"Failed to load feature {feature_dir.name}: {e}", exc_info=True)
+                    logger.error(f"Failed to load feature {feature.name}: {e}", exc_info=True)
+                    continue
+                logger.info(f"Loaded feature {feature.name} on first request")
+                self.mount(app)
 
-    return features
+    async def watch(self, app: FastAPI, interval: float = 1.0) -> None:
+        """
+        Poll the features tree and rebuild the snapshot when it changes (dev mode).
+        New features are mounted. Loaded routers are not re-imported: reloading
+        would leave the app routing to the old routes and re-run module side
+        effects (metrics sources, caches), so code edits need `uvicorn --reload`.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if _fingerprint() != self.snapshot.fingerprint:
+                    logger.info("Feature sources changed, rebuilding feature registry")
+                    self.build(lazy=self._lazy)
+                    self.mount(app)
+            except Exception as e:
+                logger.error(f"Failed to rebuild feature registry: {e}", exc_info=True)
+
+
+class LazyFeatureMiddleware:
+    """ASGI middleware mounting lazily discovered features before their first request is routed"""
+
+    def __init__(self, app, registry: FeatureRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            # The app is put in the scope by FastAPI before its middleware runs
+            self.registry.mount_for_path(scope["app"], scope["path"])
+        await self.app(scope, receive, send)
+
+
+# Global instance
+feature_registry = FeatureRegistry()
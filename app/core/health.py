@@ -0,0 +1,36 @@
+"""Liveness and readiness endpoints."""
+import asyncio
+import time
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.database import ping_mongodb, pool_stats
+
+router = APIRouter(tags=["health"])
+
+READY_TIMEOUT_SECONDS = 2.0
+
+
+@router.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz():
+    """Readiness: MongoDB answers a ping, with connection pool state"""
+    start = time.perf_counter()
+    try:
+        ready = await asyncio.wait_for(ping_mongodb(), timeout=READY_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        ready = False
+
+    body = {
+        "status": "ready" if ready else "unavailable",
+        "mongodb": {
+            "ping_ms": round((time.perf_counter() - start) * 1000, 2) if ready else None,
+            "pool": pool_stats.snapshot(),
+        },
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
@@ -0,0 +1,134 @@
+"""Conditional GET helpers (ETag / Last-Modified)."""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+import os
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.core import config as app_config
+from app.core.database import get_collection
+
+APP_DIR = Path(__file__).resolve().parents[1]
+VERSIONS_COLLECTION = "collection_versions"
+DEPLOY_SUFFIXES = {".py", ".html", ".css", ".js"}
+
+
+def _deploy_id() -> str:
+    """Hash of the code, templates and static sources: the same in every worker, new on every deploy"""
+    digest = hashlib.sha256()
+    for path in sorted([*APP_DIR.rglob("*"), APP_DIR.parent / "main.py"]):
+        relative = path.relative_to(APP_DIR.parent)
+        if path.is_file() and path.suffix in DEPLOY_SUFFIXES and "dist" not in relative.parts:
+            digest.update(str(relative).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+# Distinguishes ETags issued by a previous deploy, whose pages may render differently
+DEPLOY_ID = _deploy_id()
+BOOT_TIME = datetime.now(timezone.utc)
+
+
+class CollectionVersion:
+    """
+    Change marker for a collection, bumped on every write through CachedCollection.
+
+    `local` counts this worker's writes and `last_modified` stamps the latest,
+    for in-process caches and single-process servers. A `shared` marker must
+    also see the writes of other worker processes, and `current()` picks the
+    cheapest source that does:
+
+    - `counter` set (a cache backend shared by the workers): the collection's
+      cache generation, which every write already increments, read with one
+      cache round trip. MongoDB is not touched.
+    - several app.serve workers and no shared backend: every bump is also
+      recorded in the collection_versions collection, and read back from it.
+    - otherwise the local version.
+    """
+
+    def __init__(self, name: str, shared: bool = False):
+        self.name = name
+        self.shared = shared
+        self.local = 0
+        self.last_modified = datetime.now(timezone.utc)
+        # Returns (version, last write in epoch ms), or None when unreachable; set by CollectionHelper
+        self.counter: Callable[[], Awaitable[list[int] | None]] | None = None
+        # A recycled worker starts counting again from 0: don't let it reuse its predecessor's versions
+        os.register_at_fork(after_in_child=self._restart)
+
+    def _restart(self) -> None:
+        self.last_modified = datetime.now(timezone.utc)
+
+    def _recorded(self) -> bool:
+        return self.shared and self.counter is None and app_config.worker_processes > 1
+
+    async def bump(self, record: bool = True) -> None:
+        """Count a write; `record=False` for writes another worker already recorded"""
+        self.local += 1
+        self.last_modified = datetime.now(timezone.utc)
+        if record and self._recorded():
+            await get_collection(VERSIONS_COLLECTION).update_one(
+                {"_id": self.name},
+                {"$inc": {"value": 1}, "$set": {"last_modified": self.last_modified}},
+                upsert=True,
+            )
+
+    async def current(self) -> tuple[int, datetime] | None:
+        """(version, last modified) as every worker sees it; None when that can't be known right now"""
+        if self.counter is not None:
+            counters = await self.counter()
+            if counters is None:
+                return None
+            version, stamp = counters
+            return version, datetime.fromtimestamp(stamp / 1000, timezone.utc) if stamp else BOOT_TIME
+        if self._recorded():
+            doc = await get_collection(VERSIONS_COLLECTION).find_one({"_id": self.name})
+            if doc is None:
+                return 0, BOOT_TIME
+            # Stored without a timezone: BSON dates are UTC
+            return doc["value"], doc["last_modified"].replace(tzinfo=timezone.utc)
+        return self.local, self.last_modified
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the given parts plus the deploy id"""
+    digest = hashlib.sha256(repr((DEPLOY_ID, *parts)).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime | None = None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, as required for If-None-Match
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def cache_headers(etag: str, last_modified: datetime | None = None) -> dict[str, str]:
+    headers = {
+        "ETag": etag,
+        # Always revalidate: pages are per-user and change on every write
+        "Cache-Control": "private, no-cache",
+        "Vary": "Cookie, HX-Request",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def not_modified(etag: str, last_modified: datetime | None = None) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, last_modified))
@@ -0,0 +1,35 @@
+"""
+Leases: at most one holder of a named job across every worker and host.
+
+A lease is a document in the `leases` collection with an owner token and
+an expiry. Acquiring it is a single upsert that only matches an expired
+lease; while another owner holds it, the upsert collides with the
+existing _id and fails. A holder that dies without releasing only blocks
+the job until the lease expires (a TTL index cleans the documents up).
+"""
+from datetime import datetime, timedelta, timezone
+import uuid
+
+from pymongo.errors import DuplicateKeyError
+
+from app.core.collections import leases_collection
+
+
+async def acquire_lease(name: str, seconds: float) -> str | None:
+    """Take the lease for `seconds`; returns the owner token, or None while someone else holds it"""
+    owner = uuid.uuid4().hex
+    now = datetime.now(timezone.utc)
+    try:
+        await leases_collection.collection.update_one(
+            {"_id": name, "expires_at": {"$lte": now}},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return None
+    return owner
+
+
+async def release_lease(name: str, owner: str) -> None:
+    """Give the lease up early; a no-op once it has expired and been taken by someone else"""
+    await leases_collection.collection.delete_one({"_id": name, "owner": owner})
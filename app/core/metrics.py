@@ -0,0 +1,254 @@
+"""
+Prometheus metrics.
+
+Per-route request latency and status counts come from MetricsMiddleware;
+MongoDB command counts and durations from MongoCommandMetrics, a pymongo
+CommandListener that also charges each command to the request that issued
+it (Motor runs pymongo in the caller's copied context, so the request's
+RequestStats from app.core.timing is visible from its executor threads). Components expose their
+own counters with register_stats. GET /metrics renders it all in the
+Prometheus text format.
+"""
+import bisect
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from pymongo import monitoring
+
+from app.core.config import get_settings
+from app.core.timing import current_request, request_stats
+
+settings = get_settings()
+
+# Keys of TTLCache-style stats() dicts that only ever grow
+CACHE_COUNTERS = ("hits", "misses", "evictions", "errors")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> list[tuple[str, Labels, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_labels(labels)] = value
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # Per label set: [count per bucket..., +Inf count], sum
+        self._values: dict[Labels, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> list[tuple[str, Labels, float]]:
+        samples = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                cumulative = 0
+                for bound, count in zip((*self.buckets, math.inf), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    samples.append((f"{self.name}_bucket", (*key, ("le", le)), cumulative))
+                samples.append((f"{self.name}_sum", key, total[0]))
+                samples.append((f"{self.name}_count", key, cumulative))
+        return samples
+
+
+@dataclass
+class StatsSource:
+    """A component's stats() dict, exported as `<prefix>_<key>` gauges, or counters for `counters`"""
+    prefix: str
+    stats: Callable[[], dict]
+    labels: dict = field(default_factory=dict)
+    counters: frozenset[str] = frozenset()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+        self._sources: list[StatsSource] = []
+
+    def counter(self, name: str, help: str) -> Counter:
+        metric = Counter(name, help)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        metric = Gauge(name, help)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, prefix: str, stats: Callable[[], dict], counters: Iterable[str] = (), **labels) -> None:
+        self._sources.append(StatsSource(prefix, stats, labels, frozenset(counters)))
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            kind = "histogram" if isinstance(metric, Histogram) else "gauge" if isinstance(metric, Gauge) else "counter"
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            lines.extend(_sample_line(name, labels, value) for name, labels, value in metric.samples())
+
+        # Sources sharing a prefix (e.g. every cache) become one metric family with different labels
+        families: dict[str, tuple[str, list[str]]] = {}
+        for source in self._sources:
+            for key, value in source.stats().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                counter = key in source.counters
+                name = f"{source.prefix}_{key}_total" if counter else f"{source.prefix}_{key}"
+                _, samples = families.setdefault(name, ("counter" if counter else "gauge", []))
+                samples.append(_sample_line(name, _labels(source.labels), value))
+        for name, (kind, samples) in families.items():
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample_line(name: str, labels: Labels, value: float) -> str:
+    label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+    return f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}"
+
+
+registry = MetricsRegistry()
+register_stats = registry.register_stats
+
+http_requests = registry.counter("http_requests_total", "HTTP requests by route and status")
+http_request_duration = registry.histogram("http_request_duration_seconds", "HTTP request latency by route")
+http_in_progress = registry.gauge("http_requests_in_progress", "HTTP requests being handled")
+request_db_commands = registry.counter("http_request_db_commands_total", "MongoDB commands issued while handling requests, by route")
+request_db_duration = registry.histogram("http_request_db_seconds", "MongoDB time per HTTP request, by route", DB_BUCKETS)
+db_commands = registry.counter("mongodb_commands_total", "MongoDB commands by name and outcome")
+db_command_duration = registry.histogram("mongodb_command_duration_seconds", "MongoDB command latency by name", DB_BUCKETS)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Counts MongoDB commands and charges their time to the current request"""
+
+    def started(self, event):
+        pass
+
+    def _finished(self, event, outcome: str):
+        seconds = event.duration_micros / 1_000_000
+        db_commands.inc(command=event.command_name, outcome=outcome)
+        db_command_duration.observe(seconds, command=event.command_name)
+        stats = current_request.get()
+        if stats is not None:
+            stats.add_db(seconds)
+
+    def succeeded(self, event):
+        self._finished(event, "succeeded")
+
+    def failed(self, event):
+        self._finished(event, "failed")
+
+
+command_metrics = MongoCommandMetrics()
+
+
+def _route_label(scope: dict) -> str:
+    # Route templates, not raw paths, so ids don't explode label cardinality
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path_format", None) or route.path
+    if scope.get("root_path"):
+        return scope["root_path"] + "/{path}"  # Mounted app, e.g. /static
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = request_stats(scope)
+        token = current_request.set(stats)
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                streaming = content_type.startswith(b"text/event-stream")
+            await send(message)
+
+        http_in_progress.inc(1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_progress.inc(-1)
+            current_request.reset(token)
+            route = _route_label(scope)
+            http_requests.inc(method=scope["method"], route=route, status=status)
+            # Event streams stay open for minutes; their duration isn't latency
+            if not streaming:
+                http_request_duration.observe(time.perf_counter() - stats.start, method=scope["method"], route=route)
+            request_db_commands.inc(stats.db_commands, route=route)
+            request_db_duration.observe(stats.db_seconds, route=route)
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(authorization: str | None = Header(default=None)):
+    """Prometheus scrape endpoint; requires `Bearer <METRICS_TOKEN>`, and is only mounted when one is set"""
+    if not settings.metrics_token or authorization != f"Bearer {settings.metrics_token}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,40 @@
+"""Keyset (cursor) pagination helpers."""
+import base64
+import json
+from typing import Any
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+def encode_cursor(value: Any, last_id: ObjectId, page: int) -> str:
+    """Encode the sort key of the last item on a page into an opaque cursor"""
+    raw = json.dumps({"v": value, "id": str(last_id), "p": page}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Any, ObjectId, int]:
+    """Decode a cursor produced by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return data["v"], ObjectId(data["id"]), int(data["p"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_filter(field: str, value: Any, last_id: ObjectId) -> dict:
+    """Filter for documents strictly after (value, last_id) in (field, _id) ascending order"""
+    if value is None:
+        # Missing and null values sort before every other value, but {"$gt": None} matches nothing else
+        return {
+            "$or": [
+                {field: {"$ne": None}},
+                {field: None, "_id": {"$gt": last_id}},
+            ]
+        }
+    return {
+        "$or": [
+            {field: {"$gt": value}},
+            {field: value, "_id": {"$gt": last_id}},
+        ]
+    }
@@ -0,0 +1,201 @@
+"""
+Rate limiting and overload shedding.
+
+RateLimitMiddleware gives every client a token bucket: RATE_LIMIT_BURST
+requests at once, refilled at RATE_LIMIT_PER_SECOND. Clients are keyed on
+the user id from get_current_user (memoized on request.state, so handlers
+don't resolve the user again), falling back to the client IP for
+anonymous requests. A client out of tokens gets 429 with Retry-After.
+Buckets live in each worker process, so under python -m app.serve each
+worker gets 1/N of the rate and burst; together they allow the configured
+totals (a client whose requests all reach one worker is held to its share).
+
+Before any of that, requests are shed with 503 and Retry-After while the
+worker is overloaded: OVERLOAD_MAX_IN_FLIGHT requests already being
+handled, or the event loop running OVERLOAD_MAX_LOOP_LAG_SECONDS behind.
+Shedding early keeps the requests already admitted fast instead of
+letting every request slow down together. Event streams stop counting as
+in flight once they start, since they stay open for minutes.
+
+Throttled and shed requests are counted in /metrics (app_rate_limit_*).
+"""
+import asyncio
+import math
+import time
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app.auth.middleware import get_current_user
+from app.core import config
+from app.core.cache import TTLCache
+from app.core.metrics import register_stats
+
+SHED_RETRY_AFTER = 1  # Seconds; overload usually clears quickly
+
+
+class TokenBucket:
+    """Per-key token buckets; buckets idle long enough to be full again are dropped"""
+
+    def __init__(self, rate: float, burst: int, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        # An expired bucket would have refilled completely, so forgetting it changes nothing
+        self._buckets = TTLCache(max_size=max_keys, ttl=burst / rate)
+
+    def acquire(self, key: str) -> float:
+        """Take a token; returns 0 when allowed, else the seconds until one is available"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key) or (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            return (1 - tokens) / self.rate
+        self._buckets.set(key, (tokens - 1, now))
+        return 0.0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class LoopLag:
+    """How far the event loop runs behind, from a callback scheduled every `interval` seconds"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.seconds = 0.0  # Lag of the last completed measurement
+        self._due: float | None = None
+        self._task: asyncio.Task | None = None
+
+    def ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._due = None
+            self._task = loop.create_task(self._measure())
+
+    def current(self) -> float:
+        """How overdue the pending measurement is: nonzero only while the loop is behind"""
+        return max(0.0, time.perf_counter() - self._due) if self._due is not None else 0.0
+
+    async def _measure(self) -> None:
+        while True:
+            self._due = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.seconds = self.current()
+
+
+def _client_ip(scope: dict) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _retry_after(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+class RateLimitMiddleware:
+    """ASGI middleware shedding load when overloaded and throttling clients per user or IP"""
+
+    def __init__(
+        self,
+        app,
+        rate: float = 10.0,
+        burst: int = 40,
+        max_keys: int = 100_000,
+        max_in_flight: int = 0,
+        max_loop_lag: float = 0.0,
+        exempt_paths: tuple[str, ...] = (),
+        workers: int | None = None,
+    ):
+        self.app = app
+        # Built per worker on its first request, after serve() has set the worker count
+        self.workers = workers or config.worker_processes
+        self.buckets = (
+            TokenBucket(rate / self.workers, max(1, math.ceil(burst / self.workers)), max_keys) if rate > 0 else None
+        )
+        self.max_in_flight = max_in_flight
+        self.loop_lag = LoopLag() if max_loop_lag > 0 else None
+        self.max_loop_lag = max_loop_lag
+        self.exempt_paths = tuple(path.rstrip("/") for path in exempt_paths)
+        self.in_flight = 0
+        self.throttled = 0
+        self.shed = 0
+        limiters.append(self)
+
+    def stats(self) -> dict:
+        return {
+            "throttled": self.throttled,
+            "shed": self.shed,
+            "in_flight": self.in_flight,
+            "loop_lag_seconds": self.loop_lag.seconds if self.loop_lag else 0.0,
+            "buckets": len(self.buckets) if self.buckets else 0,
+        }
+
+    def _overloaded(self) -> bool:
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return True
+        # The current lag, not the last measured: a stall that has passed sheds nothing
+        return self.loop_lag is not None and self.loop_lag.current() > self.max_loop_lag
+
+    def _exempt(self, path: str) -> bool:
+        # Whole path segments: /static and /static/app.css, not /staticfoo
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._exempt(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        if self.loop_lag is not None:
+            self.loop_lag.ensure_started()
+        if self._overloaded():
+            self.shed += 1
+            response = JSONResponse(
+                {"detail": "Server overloaded, try again shortly"},
+                status_code=503,
+                headers=_retry_after(SHED_RETRY_AFTER),
+            )
+            await response(scope, receive, send)
+            return
+
+        if self.buckets is not None:
+            user = await get_current_user(Request(scope))
+            key = f"user:{user['id']}" if user and user.get("id") else f"ip:{_client_ip(scope)}"
+            wait = self.buckets.acquire(key)
+            if wait:
+                self.throttled += 1
+                response = JSONResponse({"detail": "Too many requests"}, status_code=429, headers=_retry_after(wait))
+                await response(scope, receive, send)
+                return
+
+        counted = True
+        self.in_flight += 1
+
+        async def send_wrapper(message):
+            nonlocal counted
+            if message["type"] == "http.response.start" and counted:
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                if content_type.startswith(b"text/event-stream"):
+                    counted = False
+                    self.in_flight -= 1
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if counted:
+                self.in_flight -= 1
+
+
+# Every installed middleware; /metrics sums them (one per app, in practice)
+limiters: list[RateLimitMiddleware] = []
+
+
+def rate_limit_stats() -> dict:
+    totals: dict = {}
+    for limiter in limiters:
+        for key, value in limiter.stats().items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+register_stats("app_rate_limit", rate_limit_stats, counters=("throttled", "shed"))
@@ -1,9 +1,16 @@
 from datetime import datetime, timedelta, timezone
+import hashlib
+import time
 from jose import JWTError, jwt
+from app.core.cache import TTLCache
 from app.core.config import get_settings
+from app.core.metrics import CACHE_COUNTERS, register_stats
 
 settings = get_settings()
 
+# Already-verified token payloads keyed by token digest; each entry expires at the token's `exp`
+_verified_tokens = TTLCache(max_size=settings.token_cache_max_size, ttl=None)
+
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
@@ -18,8 +25,23 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
 
 
 def decode_access_token(token: str) -> dict | None:
+    key = hashlib.sha256(token.encode()).digest()
+    payload = _verified_tokens.get(key)
+    if payload is not None:
+        return dict(payload)
+
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        return payload
     except JWTError:
         return None
+
+    exp = payload.get("exp")
+    _verified_tokens.set(key, payload, ttl=exp - time.time() if exp else None)
+    return dict(payload)
+
+
+def token_cache_stats() -> dict:
+    return _verified_tokens.stats()
+
+
+register_stats("app_cache", token_cache_stats, counters=CACHE_COUNTERS, cache="jwt")
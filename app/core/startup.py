@@ -0,0 +1,104 @@
+"""
+Startup timing.
+
+Milestones are measured from when main.py starts importing: `imported`
+(module import done), `ready` (lifespan startup done) and `first_request`
+(first response sent). The report is logged once the first request
+completes.
+
+    python -m app.core.startup
+
+prints the import time of `import main` per module (from python -X
+importtime) and fails when it exceeds STARTUP_BUDGET_SECONDS. Set
+FAST_START=true to see the effect of lazy imports.
+"""
+import logging
+import os
+import subprocess
+import sys
+import time
+
+STARTED = time.perf_counter()
+
+logger = logging.getLogger(__name__)
+_milestones: dict[str, float] = {}
+
+
+def mark(name: str) -> None:
+    """Record a milestone, in seconds since main.py started importing (first call wins)"""
+    _milestones.setdefault(name, time.perf_counter() - STARTED)
+
+
+def report() -> dict[str, float]:
+    return {name: round(seconds, 4) for name, seconds in _milestones.items()}
+
+
+class FirstRequestMiddleware:
+    """ASGI middleware recording when the first response has been sent"""
+
+    def __init__(self, app):
+        self.app = app
+        self._seen = False
+
+    async def __call__(self, scope, receive, send):
+        if self._seen or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self._seen = True
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            mark("first_request")
+            logger.info("Startup: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in report().items()))
+
+
+def import_times(code: str = "import main", env: dict | None = None) -> list[tuple[str, int, float]]:
+    """
+    (module, depth, cumulative seconds) for every module imported by `code`
+    in a fresh interpreter, in import order. Depth 0 is a top-level import.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{code!r} failed:\n{result.stderr[-2000:]}")
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append((name.strip(), depth, int(cumulative) / 1_000_000))
+    return times
+
+
+def main() -> int:
+    from app.core.config import get_settings
+
+    budget = get_settings().startup_budget_seconds
+    times = import_times()
+    total = next(seconds for name, depth, seconds in times if name == "main" and depth == 0)
+
+    # importtime lists a module after everything it imported: main's imports
+    # are the entries between the previous top-level import and main itself
+    main_index = next(i for i, (name, depth, _) in enumerate(times) if name == "main" and depth == 0)
+    first = max((i + 1 for i, (_, depth, _) in enumerate(times[:main_index]) if depth == 0), default=0)
+    rows = [
+        (name, seconds) for name, depth, seconds in times[first:main_index]
+        if depth == 1 or name.startswith("app.")
+    ]
+    print(f"{'module':<48}{'cumulative ms':>14}")
+    for name, seconds in sorted(rows, key=lambda row: -row[1])[:25]:
+        print(f"{name:<48}{seconds * 1000:>14.1f}")
+    print(f"\nimport main: {total * 1000:.1f} ms (budget {budget * 1000:.0f} ms)")
+    return 0 if total <= budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
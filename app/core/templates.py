@@ -0,0 +1,142 @@
+"""
+Shared Jinja environment.
+
+Every router renders through `templates`, one async-enabled environment,
+so each template is compiled once per process instead of once per
+Jinja2Templates instance. Compiled templates are also cached as bytecode
+on disk, so restarted workers skip parsing, and precompile() compiles them
+all at startup instead of on each template's first request.
+
+Rendering is async (macros and template globals such as `todo_card` may
+await); use
+
+    await templates.render("page.html", {"request": request, ...})
+
+for a buffered HTMLResponse, or templates.stream(...) to send a page while
+it renders: the browser gets the shell (and starts fetching CSS and
+scripts) before long loops finish. Streamed pages commit to a 200 before
+rendering, so load the data they need first; a render that fails part-way
+is logged and the page ends with a visible error marker. Their render time
+is charged to the request's render phase and exported as
+template_render_seconds, but can't appear in Server-Timing, which is sent
+with the headers.
+"""
+import logging
+import os
+from pathlib import Path
+import time
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+from starlette.responses import HTMLResponse, StreamingResponse
+
+from app.core.assets import asset_url
+from app.core.config import get_settings
+from app.core.metrics import registry
+from app.core.timing import phase
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
+# Ends a streamed page whose render failed after the response started
+RENDER_ERROR_MARKER = (
+    '\n<!-- render failed -->\n'
+    '<p class="render-error" role="alert">This page failed to load completely. Please reload.</p>\n'
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+render_duration = registry.histogram("template_render_seconds", "Template render time by template")
+stream_errors = registry.counter("template_stream_errors_total", "Streamed renders that failed after the response started")
+
+
+def _bytecode_cache() -> jinja2.BytecodeCache | None:
+    if not settings.template_bytecode_cache:
+        return None
+    directory = settings.template_bytecode_cache_dir or None  # None: a per-user temp directory
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return jinja2.FileSystemBytecodeCache(directory)
+
+
+_modules: dict[str, tuple[jinja2.Template, jinja2.environment.TemplateModule]] = {}
+
+
+class AsyncTemplates(Jinja2Templates):
+    """Jinja2Templates over an async environment; render with `render` or `stream`"""
+
+    async def render(self, name: str, context: dict, status_code: int = 200, headers: dict | None = None) -> HTMLResponse:
+        template = self.get_template(name)
+        started = time.perf_counter()
+        html = await template.render_async(context)
+        render_duration.observe(time.perf_counter() - started, template=name)
+        return HTMLResponse(html, status_code=status_code, headers=headers)
+
+    def stream(self, name: str, context: dict, status_code: int = 200, headers: dict | None = None) -> StreamingResponse:
+        # Looked up now, so a missing or broken template fails before the response starts
+        template = self.get_template(name)
+        return StreamingResponse(
+            _chunks(template, context, settings.template_stream_chunk_size),
+            status_code=status_code,
+            headers=headers,
+            media_type="text/html",
+        )
+
+    async def macro(self, name: str, macro_name: str):
+        """A macro from a template's module (built once per compiled template)"""
+        template = self.get_template(name)
+        module = _modules.get(name)
+        if module is None or module[0] is not template:
+            module = _modules[name] = (template, await template.make_module_async())
+        return getattr(module[1], macro_name)
+
+
+async def _chunks(template: jinja2.Template, context: dict, size: int):
+    # Jinja yields every text and expression separately; send them in chunks of about `size`.
+    # Only the time spent producing a chunk counts as rendering, not waiting for the client to take it.
+    texts = template.generate_async(context)
+    name = template.name or "<string>"
+    seconds = 0.0
+    done = False
+    try:
+        while not done:
+            buffer: list[str] = []
+            length = 0
+            started = time.perf_counter()
+            with phase("render"):
+                while length < size:
+                    try:
+                        text = await texts.__anext__()
+                    except StopAsyncIteration:
+                        done = True
+                        break
+                    buffer.append(text)
+                    length += len(text)
+            seconds += time.perf_counter() - started
+            if buffer:
+                yield "".join(buffer)
+    except Exception:
+        # The 200 and the top of the page are already sent: end it visibly rather than silently truncated
+        logger.exception(f"Streamed render of {name} failed")
+        stream_errors.inc(template=name)
+        yield RENDER_ERROR_MARKER
+    finally:
+        render_duration.observe(seconds, template=name)
+
+
+environment = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(TEMPLATES_DIR),
+    autoescape=True,
+    enable_async=True,
+    bytecode_cache=_bytecode_cache(),
+    # Checking every template's mtime per render is only worth it while editing
+    auto_reload=settings.debug or settings.feature_watch,
+)
+templates = AsyncTemplates(env=environment)
+environment.globals["asset_url"] = asset_url
+
+
+def precompile() -> int:
+    """Compile (or load from bytecode) every template now; returns how many"""
+    names = environment.list_templates(extensions=["html"])
+    for name in names:
+        environment.get_template(name)
+    return len(names)
@@ -0,0 +1,119 @@
+"""
+Per-request timing and the Server-Timing header.
+
+Code marks its phases with `with phase("render"):`; MongoDB time is added
+by the metrics command listener. Phases are exclusive: entering a phase
+pauses the enclosing one, so markdown rendered while a template renders
+counts as markdown, not render. MongoDB time overlaps the phase that
+issued the query (e.g. user lookups inside auth).
+
+With SERVER_TIMING set to "all", or "admin" and an admin user, responses
+carry the breakdown in a Server-Timing header, shown by browser devtools.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class RequestStats:
+    """Per-request timings; MongoDB counters are filled in from pymongo threads"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.db_commands = 0
+        self.db_seconds = 0.0
+        self.phases: dict[str, float] = {}
+        self._stack: list[list] = []  # [name, started_at] of active phases, innermost last
+
+    def add_db(self, seconds: float) -> None:
+        with self._lock:
+            self.db_commands += 1
+            self.db_seconds += seconds
+
+    def _charge(self, name: str, since: float, now: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + now - since
+
+    def enter(self, name: str) -> None:
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self._charge(outer[0], outer[1], now)
+        self._stack.append([name, now])
+
+    def exit(self) -> None:
+        now = time.perf_counter()
+        name, started_at = self._stack.pop()
+        self._charge(name, started_at, now)
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def server_timing(self) -> str:
+        entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()]
+        if self.db_commands:
+            entries.append(f'db;dur={self.db_seconds * 1000:.2f};desc="{self.db_commands} queries"')
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.2f}")
+        return ", ".join(entries)
+
+
+current_request: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("current_request", default=None)
+
+
+def request_stats(scope: dict) -> RequestStats:
+    """The request's stats, shared by every middleware that handles the same scope"""
+    stats = scope.get("request_stats")
+    if stats is None:
+        stats = scope["request_stats"] = RequestStats()
+    return stats
+
+
+@contextmanager
+def phase(name: str):
+    """Charge the time spent in the block to `name` in the current request's Server-Timing"""
+    stats = current_request.get()
+    if stats is None:
+        yield
+        return
+    stats.enter(name)
+    try:
+        yield
+    finally:
+        stats.exit()
+
+
+def _timing_visible(scope: dict) -> bool:
+    if settings.server_timing == "all":
+        return True
+    # Set by get_current_user; only requests that resolved their user can qualify
+    user = scope.get("state", {}).get("current_user")
+    return bool(user) and user.get("role") == "admin"
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding the Server-Timing header to responses"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = request_stats(scope)
+        token = current_request.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and _timing_visible(scope):
+                message["headers"] = [*message.get("headers", []), (b"server-timing", stats.server_timing().encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
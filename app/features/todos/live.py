@@ -0,0 +1,77 @@
+"""
+Live todo updates.
+
+Writes in the todos router publish card events to the in-process broker,
+which the /todos/events SSE endpoint streams to viewers. When
+TODOS_CHANGE_STREAM is enabled and MongoDB is a replica set, a change
+stream becomes the source instead, so viewers also see writes made by
+other workers.
+"""
+import asyncio
+import logging
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.core.collections import todos_collection
+from app.core.config import get_settings
+from app.core.events import EventBroker
+from app.core.metrics import register_stats
+
+TOPIC = "todos"
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+broker = EventBroker(max_queue_size=settings.sse_queue_size)
+register_stats("sse", broker.stats, counters=("published", "slow_consumers_dropped"), topic=TOPIC)
+
+_change_stream_task: asyncio.Task | None = None
+_change_stream_active = False
+_change_stream_unsupported = False
+
+
+def publish_upsert(todo: dict) -> None:
+    """Announce a created or updated card"""
+    if not _change_stream_active:
+        broker.publish(TOPIC, {"type": "upsert", "todo": todo})
+
+
+def publish_delete(todo_id: str) -> None:
+    if not _change_stream_active:
+        broker.publish(TOPIC, {"type": "delete", "id": todo_id})
+
+
+def publish_refresh() -> None:
+    """Ask viewers to reload the board, for bulk writes too large to send card by card"""
+    if not _change_stream_active:
+        broker.publish(TOPIC, {"type": "refresh"})
+
+
+def ensure_change_stream() -> None:
+    """Start the change-stream source on first use, if enabled"""
+    global _change_stream_task
+    if not settings.todos_change_stream or _change_stream_unsupported:
+        return
+    if _change_stream_task is None or _change_stream_task.done():
+        _change_stream_task = asyncio.create_task(_watch_changes())
+
+
+async def _watch_changes() -> None:
+    global _change_stream_active, _change_stream_unsupported
+    try:
+        async with todos_collection.collection.watch(full_document="updateLookup") as stream:
+            _change_stream_active = True
+            logger.info("Streaming todo updates from MongoDB change stream")
+            async for change in stream:
+                # Writes from any worker land here; the writer already bumped the shared version
+                await todos_collection.cached.invalidate(shared_version=False)
+                if change["operationType"] == "delete":
+                    broker.publish(TOPIC, {"type": "delete", "id": str(change["documentKey"]["_id"])})
+                elif change.get("fullDocument"):
+                    broker.publish(TOPIC, {"type": "upsert", "todo": change["fullDocument"]})
+    except OperationFailure as e:
+        # Change streams need a replica set; stay on in-process publishing
+        _change_stream_unsupported = True
+        logger.warning(f"Todo change stream unavailable, using in-process events: {e}")
+    except PyMongoError as e:
+        logger.error(f"Todo change stream stopped: {e}")
+    finally:
+        _change_stream_active = False
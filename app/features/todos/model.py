@@ -6,6 +6,10 @@ class TodoItem(MongoBaseModel):
     title: str = Field(..., max_length=200)
     description: str | None = Field(default=None, max_length=1000)
     content: str | None = Field(default=None, max_length=5000)  # Detailed content/notes
+    html: str | None = None  # Rendered content, computed at write time
+    content_hash: str | None = None  # sha256 of content the stored html was rendered from
+    renderer_version: int | None = None
     completed: bool = False
     column_width: int = Field(default=12, ge=1, le=12)  # Bootstrap column width (1-12)
-    order: int = 0  # For sorting within columns
+    order: int = 0  # Legacy sort key, superseded by rank
+    rank: str | None = None  # Fractional sort key, see ranking.py
@@ -0,0 +1,147 @@
+"""
+Fractional ranks for ordering todo cards.
+
+A rank is a string of base-62 digits read as the fraction after a radix
+point, so plain string comparison (MongoDB's default collation) orders
+cards. There is always a rank between any two others, so moving a card
+is a single-document write; ranks only grow longer, and are rewritten
+evenly by a background rebalance once they get too long.
+"""
+import asyncio
+import logging
+from pymongo import UpdateOne
+
+from app.core.collections import todos_collection
+from app.core.config import get_settings
+from app.core.leases import acquire_lease, release_lease
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+REBALANCE_LEASE = "todos_rebalance"
+REBALANCE_LEASE_SECONDS = 300  # Outlasts any rebalance; frees the job if its worker dies
+REBALANCE_PASSES = 3  # Re-reads after writes that raced the rebalance
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _midpoint(a: str, b: str | None) -> str:
+    """Rank strictly between a and b (None meaning the end). Neither may end with a zero digit."""
+    if b is not None:
+        # Keep the common prefix, padding a with zeros
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b) // 2]
+
+    # Consecutive first digits
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _increment(a: str) -> str:
+    """Smallest convenient rank after a; keeps appends from growing ranks quickly"""
+    if not a:
+        return DIGITS[BASE // 2]
+    last = DIGITS.index(a[-1])
+    if last < BASE - 1:
+        return a[:-1] + DIGITS[last + 1]
+    return a + DIGITS[BASE // 2]
+
+
+def rank_between(before: str | None, after: str | None) -> str:
+    """Rank for a card placed between two neighbours (None for the start/end of the board)"""
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"Ranks out of order: {before!r} >= {after!r}")
+    if after is None:
+        return _increment(before or "")
+    return _midpoint(before or "", after)
+
+
+def spread_ranks(count: int) -> list[str]:
+    """`count` evenly spaced ranks, leaving a full digit of room between neighbours"""
+    width = 1
+    while BASE ** width < (count + 1) * BASE:
+        width += 1
+
+    step = BASE ** width // (count + 1)
+    ranks = []
+    for i in range(1, count + 1):
+        value = i * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        ranks.append("".join(reversed(digits)).rstrip(DIGITS[0]))
+    return ranks
+
+
+async def rebalance_ranks(batch_size: int = 500) -> int:
+    """
+    Rewrite every card's rank evenly, preserving the current order.
+    Cards without a rank (created before ranks existed) keep their legacy
+    `order` and come first. Returns the number of cards updated.
+
+    Runs in one worker at a time (a lease in MongoDB). Each card is only
+    updated if its rank is still the one read, so a move landing meanwhile
+    is not overwritten; the pass is repeated until a re-read finds the
+    order unchanged.
+    """
+    owner = await acquire_lease(REBALANCE_LEASE, REBALANCE_LEASE_SECONDS)
+    if owner is None:
+        logger.info("Todo rank rebalance already running in another worker")
+        return 0
+
+    collection = todos_collection.collection
+    updated = 0
+    previous: list | None = None
+    try:
+        for _ in range(REBALANCE_PASSES):
+            cursor = collection.find({}, projection={"rank": 1}).sort([("rank", 1), ("order", 1), ("_id", 1)])
+            docs = [doc async for doc in cursor]
+            ids = [doc["_id"] for doc in docs]
+            if ids == previous:
+                break
+            updates = [
+                UpdateOne({"_id": doc["_id"], "rank": doc.get("rank")}, {"$set": {"rank": rank}})
+                for doc, rank in zip(docs, spread_ranks(len(docs)))
+            ]
+            for start in range(0, len(updates), batch_size):
+                result = await todos_collection.cached.bulk_write(updates[start:start + batch_size], ordered=False)
+                updated += result.modified_count
+            previous = ids
+        else:
+            logger.warning(f"Todo ranks still changing after {REBALANCE_PASSES} rebalance passes")
+    finally:
+        await release_lease(REBALANCE_LEASE, owner)
+
+    logger.info(f"Rebalanced ranks of {len(previous or [])} todos")
+    return updated
+
+
+_rebalance_task: asyncio.Task | None = None
+
+
+def schedule_rebalance() -> None:
+    """Run rebalance_ranks in the background unless one is already running"""
+    global _rebalance_task
+    if _rebalance_task is not None and not _rebalance_task.done():
+        return
+    _rebalance_task = asyncio.create_task(rebalance_ranks())
+    _rebalance_task.add_done_callback(_log_rebalance_failure)
+
+
+def _log_rebalance_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception():
+        logger.error("Todo rank rebalance failed", exc_info=task.exception())
+
+
+def needs_rebalance(rank: str | None) -> bool:
+    return rank is None or len(rank) > settings.todos_rank_max_length
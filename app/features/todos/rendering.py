@@ -0,0 +1,61 @@
+"""Markdown rendering for todo content."""
+import hashlib
+
+from app.core.cache import TTLCache
+from app.core.metrics import CACHE_COUNTERS, register_stats
+from app.core.timing import phase
+
+# Bump when the markdown configuration changes so stored HTML is re-rendered
+RENDERER_VERSION = 1
+
+# Rendered HTML for documents without (or with stale) stored HTML, keyed by content hash
+_rendered = TTLCache(max_size=2048, ttl=None)
+register_stats("app_cache", _rendered.stats, counters=CACHE_COUNTERS, cache="markdown")
+
+
+def markdown(content: str) -> str:
+    # Imported on first use so fast start doesn't pay for it
+    from markdown import markdown as render_markdown
+    return render_markdown(content)
+
+
+def warm_up() -> None:
+    """Import markdown ahead of the first request; called at startup unless fast start is on"""
+    markdown("")
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def render_fields(content: str | None) -> dict:
+    """Fields to store alongside `content` at write time"""
+    if not content:
+        return {"html": "", "content_hash": None, "renderer_version": RENDERER_VERSION}
+
+    digest = content_hash(content)
+    with phase("markdown"):
+        html = markdown(content)
+    _rendered.set(digest, html)
+    return {"html": html, "content_hash": digest, "renderer_version": RENDERER_VERSION}
+
+
+def rendered_html(doc: dict) -> str:
+    """
+    HTML for a todo's content. Uses the HTML stored at write time when it is
+    current, otherwise renders once per distinct content and caches the result.
+    """
+    content = doc.get("content")
+    if not content:
+        return ""
+
+    digest = content_hash(content)
+    if doc.get("content_hash") == digest and doc.get("renderer_version") == RENDERER_VERSION:
+        return doc.get("html") or ""
+
+    html = _rendered.get(digest)
+    if html is None:
+        with phase("markdown"):
+            html = markdown(content)
+        _rendered.set(digest, html)
+    return html
@@ -1,17 +1,32 @@
+import asyncio
 from bson import ObjectId
 from datetime import datetime, timezone
-from json import dumps
-from fastapi import APIRouter, Request, Form, Depends, HTTPException
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from markdown import markdown
+from fastapi import APIRouter, Request, Form, Depends, HTTPException, Query
+from fastapi.responses import HTMLResponse, StreamingResponse
+from markupsafe import Markup
+from pymongo import ReturnDocument
 
+from app.core.cache import TTLCache
 from app.core.collections import todos_collection
+from app.core.config import get_settings
+from app.core.events import format_sse
+from app.core.http_cache import cache_headers, is_not_modified, make_etag, not_modified
+from app.core.metrics import CACHE_COUNTERS, register_stats
+from app.core.templates import templates
+from app.core.timing import phase
+from app.core.pagination import decode_cursor, encode_cursor, keyset_filter
+from app.schemas.base import PaginatedResponse
 from app.features.todos.model import TodoItem
+from app.features.todos.live import TOPIC, broker, ensure_change_stream, publish_delete, publish_upsert
+from app.features.todos.ranking import needs_rebalance, rank_between, schedule_rebalance
+from app.features.todos.rendering import render_fields, rendered_html
+from app.features.todos.schema import TodoImportResult
+from app.features.todos.search import todo_search
+from app.features.todos.transfer import export_lines, import_lines
 from app.auth.middleware import get_current_user, require_admin
 
 router = APIRouter(prefix="/todos", tags=["todos"])
-templates = Jinja2Templates(directory="app/templates")
+settings = get_settings()
 
 feature_info = {
     "name": "Todo List",
@@ -28,6 +43,13 @@ async def require_user(request: Request) -> dict:
     return user
 
 
+def parse_todo_id(todo_id: str) -> ObjectId:
+    """Convert a todo id from the URL to an ObjectId, 404 if malformed"""
+    if not ObjectId.is_valid(todo_id):
+        raise HTTPException(status_code=404, detail="Todo not found")
+    return ObjectId(todo_id)
+
+
 def convert_mongo_doc(doc: dict) -> dict:
     """Convert MongoDB document for template rendering (ObjectId -> string, content markdown)"""
     if not doc:
@@ -37,26 +59,75 @@ def convert_mongo_doc(doc: dict) -> dict:
     if '_id' in doc_dict and doc_dict['_id']:
         doc_dict['_id'] = str(doc_dict['_id'])
 
-    if 'content' in doc_dict and doc_dict['content']:
-        doc_dict['html'] = markdown(doc_dict['content'])
-    else:
-        doc_dict['html'] = ""
+    doc_dict['html'] = rendered_html(doc_dict)
 
     return doc_dict
 
 
+async def fetch_todo_page(cursor: str | None = None) -> PaginatedResponse[dict]:
+    """
+    Fetch one page of todos using keyset pagination on (rank, _id),
+    so every page costs the same regardless of how deep it is.
+    """
+    page_size = settings.todos_page_size
+    query: dict = {}
+    page = 1
+    if cursor:
+        try:
+            last_rank, last_id, page = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = keyset_filter("rank", last_rank, last_id)
+        page += 1
+
+    docs = await todos_collection.cached.find_list(
+        query, sort=[("rank", 1), ("_id", 1)], limit=page_size + 1
+    )
+    has_more = len(docs) > page_size
+    docs = docs[:page_size]
+    if any(needs_rebalance(doc.get("rank")) for doc in docs):
+        schedule_rebalance()
+
+    next_cursor = None
+    if has_more:
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get("rank"), last["_id"], page)
+
+    total = await todos_collection.cached.estimated_document_count()
+    return PaginatedResponse[dict](
+        # Raw documents: cards are converted and rendered through the fragment cache
+        items=docs,
+        total=total,
+        page=page,
+        page_size=page_size,
+        total_pages=max(1, -(-total // page_size)),
+        next_cursor=next_cursor,
+    )
+
+
 @router.get("/", response_class=HTMLResponse)
 async def list_todos(request: Request, user: dict = Depends(require_user)):
-    """Show the main todos page with all todo cards"""
-    from app.core.features import discover_features
+    """Show the main todos page with the first page of todo cards"""
+    from app.core.features import feature_registry
     
-    features = discover_features()
-    todos_cursor = await todos_collection.collection.find({}).sort("order", 1).to_list(length=100)
+    # Conditional GET: answered from the collection version, before the page
+    # query or any template work. Unknown while the cache server is unreachable.
+    headers = None
+    current = await todos_collection.version.current()
+    if current is not None:
+        version, last_modified = current
+        etag = make_etag(
+            "todos", version, last_modified, user.get("id"), user.get("name"), user.get("email"), user.get("role"),
+            feature_registry.snapshot.fingerprint,
+        )
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        headers = cache_headers(etag, last_modified)
     
-    # Convert ObjectId to string for template rendering
-    todos = [convert_mongo_doc(todo) for todo in todos_cursor]
+    todo_page = await fetch_todo_page()
 
-    return templates.TemplateResponse(
+    # Streamed: the page shell is sent while the cards render
+    return templates.stream(
         "todos/todos.html",
         {
             "request": request,
@@ -66,13 +137,116 @@ async def list_todos(request: Request, user: dict = Depends(require_user)):
                 "avatar_url": None,
                 "role": user.get("role", "user"),
             },
-            "features": [{"name": f.name, "url": f.url} for f in features],
-            "todos": todos,
+            "features": feature_registry.features,
+            "todos": todo_page.items,
+            "next_cursor": todo_page.next_cursor,
             "is_admin": user.get("role") == "admin",
         },
+        headers=headers,
+    )
+
+
+@router.get("/page", response_class=HTMLResponse)
+async def list_todos_page(
+    request: Request,
+    cursor: str = Query(...),
+    user: dict = Depends(require_user),
+):
+    """Next page of todo cards as an HTMX fragment (infinite scroll)"""
+    todo_page = await fetch_todo_page(cursor)
+
+    with phase("render"):
+        return await templates.render(
+            "todos/_page.html",
+            {
+                "request": request,
+                "todos": todo_page.items,
+                "next_cursor": todo_page.next_cursor,
+                "is_admin": user.get("role") == "admin",
+            },
+        )
+
+
+@router.get("/search", response_class=HTMLResponse)
+async def search_todos(
+    request: Request,
+    q: str = Query(default="", max_length=200),
+    user: dict = Depends(require_user),
+):
+    """Cards matching `q`, best match first, as an HTMX fragment (active search). No query: the first page."""
+    if q.strip():
+        todos, next_cursor = await todo_search.search(q), None
+    else:
+        todo_page = await fetch_todo_page()
+        todos, next_cursor = todo_page.items, todo_page.next_cursor
+
+    with phase("render"):
+        return await templates.render(
+            "todos/_search.html",
+            {
+                "request": request,
+                "query": q.strip(),
+                "todos": todos,
+                "next_cursor": next_cursor,
+                "is_admin": user.get("role") == "admin",
+            },
+        )
+
+
+@router.get("/events")
+async def todo_events(request: Request, user: dict = Depends(require_user)):
+    """Server-Sent Events stream of card updates for live viewers"""
+    ensure_change_stream()
+    is_admin = user.get("role") == "admin"
+    
+    async def stream():
+        subscription = broker.subscribe(TOPIC)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=settings.sse_keepalive_seconds)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing idle connections
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    # Dropped as a slow consumer; the browser reconnects and reloads
+                    break
+                if event["type"] == "delete":
+                    yield format_sse("delete", event["id"])
+                elif event["type"] == "refresh":
+                    yield format_sse("refresh", "")
+                else:
+                    # Rendered through the fragment cache: once per card version and role
+                    yield format_sse("upsert", await render_card(event["todo"], is_admin))
+        finally:
+            broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+@router.get("/export")
+async def export_todos(request: Request, user: dict = Depends(require_admin)):  # Admin only
+    """Download every card as NDJSON - Admin only"""
+    filename = f"todos-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.ndjson"
+    return StreamingResponse(
+        export_lines(settings.todos_transfer_batch_size),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/import", response_model=TodoImportResult)
+async def import_todos(request: Request, user: dict = Depends(require_admin)):  # Admin only
+    """Add or replace cards from an NDJSON request body (as written by /todos/export) - Admin only"""
+    return await import_lines(request.stream(), settings.todos_transfer_batch_size)
+
+
 @router.post("/save", response_class=HTMLResponse)
 async def save_todo(
     request: Request,
@@ -88,70 +262,54 @@ async def save_todo(
     column_width = max(1, min(12, column_width))
     
     # Check if we're updating an existing todo
-    if todo_id and todo_id.strip():
-        try:
-            # Try to convert to ObjectId
-            object_id = ObjectId(todo_id)
-            
-            # Check if todo exists
-            existing_todo = await todos_collection.collection.find_one({"_id": object_id})
-            
-            if existing_todo:
-                # Preserve existing completed status and order when updating
-                await todos_collection.collection.update_one(
-                    {"_id": object_id},
-                    {
-                        "$set": {
-                            "title": title,
-                            "description": description or None,
-                            "content": content or None,
-                            "column_width": column_width,
-                            "updated_at": datetime.now(timezone.utc),
-                        }
-                    }
-                )
-                
-                # Fetch updated todo
-                updated_todo = await todos_collection.collection.find_one({"_id": object_id})
-                if not updated_todo:
-                    raise HTTPException(status_code=404, detail="Todo not found after update")
-                
-                return render_todo_card(updated_todo)
-            else:
-                # Todo ID provided but not found - fall back to create
-                # (or could return error: raise HTTPException(status_code=404, detail="Todo not found"))
-                pass
-        except Exception:
-            # Invalid ObjectId format - fall back to create
-            pass
+    if todo_id and todo_id.strip() and ObjectId.is_valid(todo_id.strip()):
+        # Single round trip: update and return the new document atomically.
+        # Existing completed status and rank are preserved.
+        updated_todo = await todos_collection.cached.find_one_and_update(
+            {"_id": ObjectId(todo_id.strip())},
+            {
+                "$set": {
+                    "title": title,
+                    "description": description or None,
+                    "content": content or None,
+                    **render_fields(content),
+                    "column_width": column_width,
+                    "updated_at": datetime.now(timezone.utc),
+                }
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+        if updated_todo:
+            publish_upsert(updated_todo)
+            return await render_todo_card(updated_todo, user)
+        # Todo ID provided but not found - fall back to create
     
     # CREATE new todo (either no ID provided, or ID not found/invalid)
-    # Get max order
-    last_todo = await todos_collection.collection.find_one(sort=[("order", -1)])
-    new_order = (last_todo.get("order", 0) + 1) if last_todo else 0
+    # New cards go after the last one (read uncached: ranks must be current)
+    last_todo = await todos_collection.collection.find_one({}, projection={"rank": 1}, sort=[("rank", -1)])
+    new_rank = rank_between(last_todo.get("rank") if last_todo else None, None)
+    if needs_rebalance(new_rank):
+        schedule_rebalance()
 
     todo = TodoItem(
         _id=None,  # Will be generated by MongoDB
         title=title,
         description=description or None,
         content=content or None,
+        **render_fields(content),
         column_width=column_width,
-        order=new_order,
+        rank=new_rank,
     )
     
     todo_dict = todo.model_dump(by_alias=True, exclude_none=True)
     todo_dict.pop("_id", None)
     
-    result = await todos_collection.collection.insert_one(todo_dict)
-    new_todo = await todos_collection.collection.find_one({"_id": result.inserted_id})
-
-    if not new_todo:
-        raise HTTPException(status_code=500, detail="Failed to create todo")
+    result = await todos_collection.cached.insert_one(todo_dict)
+    # The inserted document is exactly what we sent, no need to read it back
+    todo_dict["_id"] = result.inserted_id
+    publish_upsert(todo_dict)
     
-    return render_todo_card(new_todo)
-
-
-
+    return await render_todo_card(todo_dict, user)
 
 
 @router.delete("/{todo_id}", response_class=HTMLResponse)
@@ -161,7 +319,9 @@ async def delete_todo(
     user: dict = Depends(require_admin),  # Admin only
 ):
     """Delete a todo - Admin only"""
-    await todos_collection.collection.delete_one({"_id": ObjectId(todo_id)})
+    result = await todos_collection.cached.delete_one({"_id": parse_todo_id(todo_id)})
+    if result.deleted_count:
+        publish_delete(todo_id)
     return HTMLResponse("")
 
 
@@ -172,106 +332,96 @@ async def toggle_todo(
     user: dict = Depends(require_user),  # Any authenticated user can toggle
 ):
     """Toggle todo completion status - Any authenticated user"""
-    todo = await todos_collection.collection.find_one({"_id": ObjectId(todo_id)})
+    # Pipeline update flips the stored value server-side, so concurrent
+    # clicks each toggle once instead of racing on a read-modify-write
+    todo = await todos_collection.cached.find_one_and_update(
+        {"_id": parse_todo_id(todo_id)},
+        [{
+            "$set": {
+                "completed": {"$not": [{"$ifNull": ["$completed", False]}]},
+                "updated_at": datetime.now(timezone.utc),
+            }
+        }],
+        return_document=ReturnDocument.AFTER,
+    )
     if not todo:
         return HTMLResponse("Todo not found", status_code=404)
     
-    new_completed = not todo.get("completed", False)
+    publish_upsert(todo)
+    return await render_todo_card(todo, user)
+
+
+@router.post("/{todo_id}/move", status_code=204)
+async def move_todo(
+    request: Request,
+    todo_id: str,
+    before_id: str = Form(default=""),  # Card now preceding the moved one
+    after_id: str = Form(default=""),  # Card now following the moved one
+    user: dict = Depends(require_admin),  # Admin only
+):
+    """Move a todo between two neighbours - Admin only. Writes only the moved card."""
+    object_id = parse_todo_id(todo_id)
+    neighbour_ids = [parse_todo_id(i) for i in (before_id, after_id) if i]
     
-    await todos_collection.collection.update_one(
-        {"_id": ObjectId(todo_id)},
-        {"$set": {"completed": new_completed, "updated_at": datetime.now(timezone.utc)}}
-    )
+    ranks = {}
+    if neighbour_ids:
+        cursor = todos_collection.collection.find({"_id": {"$in": neighbour_ids}}, projection={"rank": 1})
+        ranks = {str(doc["_id"]): doc.get("rank") async for doc in cursor}
     
-    todo["completed"] = new_completed
-    return render_todo_card(todo)
-
+    after_rank = ranks.get(after_id)
+    if before_id and not after_id and ranks.get(before_id) is not None:
+        # Dropped after the last loaded card: the next card may be on a page not loaded yet
+        after = await todos_collection.collection.find_one(
+            {"rank": {"$gt": ranks[before_id]}, "_id": {"$ne": object_id}},
+            projection={"rank": 1},
+            sort=[("rank", 1)],
+        )
+        after_rank = after["rank"] if after else None
+    
+    try:
+        if any(ranks.get(i) is None for i in (before_id, after_id) if i):
+            raise ValueError("Neighbour has no rank")
+        new_rank = rank_between(ranks.get(before_id), after_rank)
+    except ValueError:
+        # Unranked legacy cards or ranks collided under concurrent moves
+        schedule_rebalance()
+        raise HTTPException(status_code=409, detail="Card order is being rebuilt, reload and try again")
+    
+    todo = await todos_collection.cached.find_one_and_update(
+        {"_id": object_id},
+        {"$set": {"rank": new_rank, "updated_at": datetime.now(timezone.utc)}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not todo:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    publish_upsert(todo)
+    if needs_rebalance(new_rank):
+        schedule_rebalance()
 
-# SVG Icons (defined outside f-string)
-REFRESH_ICON = '''<svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 4v5h.582m15.356 2A8.001 8.001 0 004.582 9m0 0H9m11 11v-5h-.581m0 0a8.003 8.003 0 01-15.357-2m15.357 2H15"></path></svg>'''
 
-CHECK_ICON = '''<svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M5 13l4 4L19 7"></path></svg>'''
+async def render_card(todo: dict, is_admin: bool) -> Markup:
+    """
+    Render a todo card from the todos/_card.html macro. Cards are cached on
+    (_id, updated_at, completed, rank, role) - card edits set updated_at, and
+    the rank rebalance rewrites ranks alone, so a cached card is never stale.
+    """
+    key = (str(todo.get("_id")), todo.get("updated_at"), bool(todo.get("completed")), todo.get("rank"), is_admin)
+    html = _card_cache.get(key)
+    if html is None:
+        with phase("render"):
+            # The template module is built once per compiled template and reused
+            todo_card = await templates.macro("todos/_card.html", "todo_card")
+            html = await todo_card(convert_mongo_doc(todo), is_admin)
+        _card_cache.set(key, html)
+    return html
 
-EDIT_ICON = '''<svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M11 5H6a2 2 0 00-2 2v11a2 2 0 002 2h11a2 2 0 002-2v-5m-1.414-9.414a2 2 0 112.828 2.828L11.828 15H9v-2.828l8.586-8.586z"></path></svg>'''
 
-DELETE_ICON = '''<svg class="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M19 7l-.867 12.142A2 2 0 0116.138 21H7.862a2 2 0 01-1.995-1.858L5 7m5 4v6m4-6v6m1-10V4a1 1 0 00-1-1h-4a1 1 0 00-1 1v3M4 7h16"></path></svg>'''
+async def render_todo_card(todo: dict, user: dict) -> HTMLResponse:
+    """Render a single todo card HTML for HTMX swaps"""
+    return HTMLResponse(await render_card(todo, user.get("role") == "admin"))
 
 
-def render_todo_card(todo: dict) -> HTMLResponse:
-    """Render a single todo card HTML"""
-    # Convert MongoDB document for template rendering
-    todo = convert_mongo_doc(todo)
-    
-    completed = todo.get("completed", False)
-    title = todo.get("title", "")
-    description = todo.get("description", "")
-    content = todo.get("content", "")
-    column_width = todo.get("column_width", 12)
-    todo_id = str(todo.get("_id", ""))
-    
-    # Escape strings for JavaScript using JSON encoding (same as |tojson filter)
-    title_escaped = dumps(title)
-    description_escaped = dumps(description)
-    content_escaped = dumps(content)
-    todo_id_escaped = dumps(todo_id)
-    
-    # Select icon based on completion status
-    toggle_icon = REFRESH_ICON if completed else CHECK_ICON
-    opacity_class = "opacity-60" if completed else ""
-    line_through = "line-through" if completed else ""
-    
-    html_output = f'''
-    <div class="col-span-{column_width} todo-card" data-id="{todo_id}">
-        <div class="cyber-card h-full flex flex-col {opacity_class}">
-            <div class="flex justify-between items-start mb-3">
-                <h3 class="font-semibold text-lg text-[#e0e0e0] {line_through}">
-                    {title}
-                </h3>
-                <div class="flex gap-1">
-                    <button 
-                        onclick='editTodo({todo_id_escaped}, {title_escaped}, {description_escaped}, {content_escaped}, {column_width})'
-                        class="text-[#6b7280] hover:text-[#00d4ff] p-1 transition-colors">
-                        {EDIT_ICON}
-                    </button>
-                    <button 
-                        hx-post="/todos/{todo_id}/toggle"
-                        hx-target="closest .todo-card"
-                        hx-swap="outerHTML"
-                        class="text-[#6b7280] hover:text-[#00ff88] p-1 transition-colors">
-                        {toggle_icon}
-                    </button>
-                    <button 
-                        hx-delete="/todos/{todo_id}"
-                        hx-target="closest .todo-card"
-                        hx-swap="outerHTML"
-                        hx-confirm="Are you sure you want to delete this todo?"
-                        class="text-[#6b7280] hover:text-[#ff3366] p-1 transition-colors">
-                        {DELETE_ICON}
-                    </button>
-                </div>
-            </div>
-    '''
-    
-    if description:
-        html_output += f'<p class="text-[#6b7280] text-sm mb-3">{description}</p>'
-    
-    if content:
-        html_output += f'''
-        <div class="flex-1 bg-[#1c1c2e] p-3 mb-3 border border-[#2a2a3a]">
-            <p class="text-[#e0e0e0] text-sm whitespace-pre-wrap">{markdown(content)}</p>
-        </div>
-        '''
-    
-    status_text = "[✓] COMPLETE" if completed else "[ ] PENDING"
-    status_class = "text-[#00ff88]" if completed else "text-[#ff00ff]"
-    
-    html_output += f'''
-            <div class="flex justify-between items-center mt-auto pt-3 border-t border-[#2a2a3a]">
-                <span class="text-xs text-[#6b7280] font-mono">COL: {column_width}/12</span>
-                <span class="text-xs font-mono {status_class}">{status_text}</span>
-            </div>
-        </div>
-    </div>
-    '''
-    
-    return HTMLResponse(html_output)
+_card_cache = TTLCache(max_size=settings.todos_card_cache_size, ttl=None)
+register_stats("app_cache", _card_cache.stats, counters=CACHE_COUNTERS, cache="todo_cards")
+# Async global: templates await it in their card loops
+templates.env.globals["todo_card"] = render_card
@@ -14,3 +14,15 @@ class TodoItemResponse(BaseModel):
     description: Optional[str]
     completed: bool
     created_at: datetime
+
+
+class TodoImportError(BaseModel):
+    line: int
+    error: str
+
+
+class TodoImportResult(BaseModel):
+    inserted: int = 0
+    updated: int = 0  # Lines whose _id already existed (replaced)
+    failed: int = 0
+    errors: list[TodoImportError] = []  # The first MAX_REPORTED_ERRORS failures
@@ -0,0 +1,139 @@
+"""
+Full-text search over todo cards.
+
+Uses the todo_search text index when the deployment supports $text, and
+otherwise an in-process inverted index over the same fields and weights,
+rebuilt when the collection changes. Results of recent queries are cached
+per collection version, so the repeated requests of active search (and
+several viewers typing the same words) cost one query.
+"""
+import asyncio
+import logging
+import math
+import re
+import time
+
+from pymongo.errors import OperationFailure
+
+from app.core.cache import TTLCache
+from app.core.collections import todos_collection
+from app.core.config import get_settings
+from app.core.metrics import CACHE_COUNTERS, register_stats
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Fields and weights of the todo_search index, so both backends rank alike
+WEIGHTS = next(dict(spec.weights) for spec in todos_collection.indexes if spec.index_name == "todo_search")
+MAX_TERMS = 16
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str | None) -> list[str]:
+    return _WORD.findall(text.casefold()) if text else []
+
+
+class InvertedIndex:
+    """Term -> {todo id: weighted term frequency}, scored tf-idf"""
+
+    def __init__(self, docs: list[dict]):
+        self._docs = {doc["_id"]: doc for doc in docs}
+        self._postings: dict[str, dict] = {}
+        for doc in docs:
+            for field, weight in WEIGHTS.items():
+                for term in tokenize(doc.get(field)):
+                    postings = self._postings.setdefault(term, {})
+                    postings[doc["_id"]] = postings.get(doc["_id"], 0) + weight
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def search(self, terms: list[str], limit: int) -> list[dict]:
+        """Documents containing any of the terms, best match first (ties in card order)"""
+        scores: dict = {}
+        for term in set(terms):
+            postings = self._postings.get(term, {})
+            if not postings:
+                continue
+            idf = math.log(1 + len(self._docs) / len(postings))
+            for doc_id, frequency in postings.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + frequency * idf
+        ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], self._docs[doc_id].get("rank") or ""))
+        return [self._docs[doc_id] for doc_id in ranked[:limit]]
+
+
+class TodoSearch:
+    def __init__(self, backend: str, limit: int, cache_size: int, ttl: float):
+        self.backend = backend
+        self.limit = limit
+        self.ttl = ttl
+        self._results = TTLCache(max_size=cache_size, ttl=ttl)
+        self._index: InvertedIndex | None = None
+        self._index_version: int | None = None
+        self._index_built_at = 0.0
+        self._lock = asyncio.Lock()
+        self.queries = 0
+        self.index_builds = 0
+
+    async def search(self, query: str) -> list[dict]:
+        """Todos matching any word of `query`, best match first"""
+        terms = tokenize(query)[:MAX_TERMS]
+        if not terms:
+            return []
+
+        key = (todos_collection.version.local, " ".join(terms))
+        docs = self._results.get(key)
+        if docs is None:
+            self.queries += 1
+            docs = await self._search(terms)
+            self._results.set(key, docs)
+        return docs
+
+    async def _search(self, terms: list[str]) -> list[dict]:
+        if self.backend != "memory":
+            try:
+                return await self._text_search(terms)
+            except OperationFailure as e:
+                if self.backend == "text":
+                    raise
+                # e.g. no text index support (some MongoDB-compatible services)
+                logger.warning(f"Text search unavailable, using the in-process index: {e}")
+                self.backend = "memory"
+        index = await self._memory_index()
+        return index.search(terms, self.limit)
+
+    async def _text_search(self, terms: list[str]) -> list[dict]:
+        score = {"score": {"$meta": "textScore"}}
+        cursor = todos_collection.collection.find({"$text": {"$search": " ".join(terms)}}, score)
+        return await cursor.sort([("score", {"$meta": "textScore"}), ("rank", 1)]).limit(self.limit).to_list(self.limit)
+
+    async def _memory_index(self) -> InvertedIndex:
+        async with self._lock:
+            version = todos_collection.version.local
+            # The version only sees this worker's writes; the TTL bounds staleness from others
+            if self._index is None or self._index_version != version or time.monotonic() - self._index_built_at > self.ttl:
+                docs = await todos_collection.collection.find({}).to_list(None)
+                self._index = InvertedIndex(docs)
+                self._index_version = version
+                self._index_built_at = time.monotonic()
+                self.index_builds += 1
+            return self._index
+
+    def stats(self) -> dict:
+        return {
+            "queries": self.queries,
+            "index_builds": self.index_builds,
+            "indexed_documents": len(self._index) if self._index is not None else 0,
+            "memory_backend": int(self.backend == "memory"),
+        }
+
+
+todo_search = TodoSearch(
+    settings.todos_search_backend,
+    settings.todos_search_limit,
+    settings.todos_search_cache_size,
+    settings.todos_search_cache_ttl_seconds,
+)
+register_stats("todo_search", todo_search.stats, counters=("queries", "index_builds"))
+register_stats("app_cache", todo_search._results.stats, counters=CACHE_COUNTERS, cache="todo_search")
@@ -0,0 +1,178 @@
+"""
+NDJSON export and import of todo cards, for backups and moving boards.
+
+Each line is one card in MongoDB extended JSON (ObjectIds and dates
+round-trip). Export streams from a cursor in batches and import parses the
+upload as it arrives and writes in unordered bulk batches, so memory stays
+constant however large the board is. Rendered HTML is not exported: import
+renders content again, so a file can't carry its own HTML.
+
+Importing a line with an `_id` replaces that card (re-importing a backup is
+idempotent); lines without one are added after the last card, in file order.
+Imported cards get a new `updated_at`, which keys the card fragment cache,
+and live viewers are asked to reload the board once the import ends.
+"""
+from datetime import datetime, timezone
+import logging
+from typing import AsyncIterator
+
+from bson import ObjectId, json_util
+from bson.errors import BSONError
+from pydantic import ValidationError
+from pymongo import InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from app.core.collections import todos_collection
+from app.features.todos.live import publish_refresh
+from app.features.todos.model import TodoItem
+from app.features.todos.ranking import needs_rebalance, rank_between, schedule_rebalance
+from app.features.todos.rendering import render_fields
+from app.features.todos.schema import TodoImportError, TodoImportResult
+
+logger = logging.getLogger(__name__)
+
+RENDERED_FIELDS = ("html", "content_hash", "renderer_version")
+MAX_LINE_BYTES = 1 << 20
+MAX_REPORTED_ERRORS = 100
+
+
+async def export_lines(batch_size: int) -> AsyncIterator[str]:
+    """NDJSON for every card in _id order, `batch_size` lines per chunk"""
+    cursor = todos_collection.collection.find({}, projection={field: 0 for field in RENDERED_FIELDS})
+    # _id order: cards moved while exporting are neither skipped nor repeated
+    cursor = cursor.sort("_id", 1).batch_size(batch_size)
+    lines: list[str] = []
+    async for doc in cursor:
+        lines.append(json_util.dumps(doc) + "\n")
+        if len(lines) >= batch_size:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, bytes | None]]:
+    """(line number, line) for each non-blank line; None for lines over MAX_LINE_BYTES"""
+    buffer = bytearray()
+    number = 0
+    oversized = False
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            end = buffer.find(b"\n")
+            if end < 0:
+                break
+            number += 1
+            line = bytes(buffer[:end]).strip()
+            del buffer[:end + 1]
+            if oversized:
+                oversized = False
+                yield number, None
+            elif line:
+                yield number, line
+        if len(buffer) > MAX_LINE_BYTES:
+            # Drop the rest of an oversized line as it arrives instead of buffering it
+            oversized = True
+            buffer.clear()
+    if oversized:
+        yield number + 1, None
+    elif buffer.strip():
+        yield number + 1, bytes(buffer).strip()
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'line'}: {e['msg']}" for e in error.errors())
+    return str(error)
+
+
+def parse_line(line: bytes) -> dict:
+    """A card ready to store (content rendered, _id an ObjectId); ValueError when invalid"""
+    try:
+        doc = json_util.loads(line)
+    except (ValueError, TypeError, BSONError) as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(doc, dict):
+        raise ValueError("Expected a JSON object")
+
+    item = TodoItem.model_validate(doc)  # ValidationError is a ValueError
+    card = item.model_dump(by_alias=True, exclude_none=True, exclude=set(RENDERED_FIELDS))
+    card.update(render_fields(item.content))
+    # Never the file's: cached card HTML is keyed on it
+    card["updated_at"] = datetime.now(timezone.utc)
+    if "_id" in card:
+        card["_id"] = ObjectId(card["_id"])
+    return card
+
+
+class _Importer:
+    def __init__(self):
+        self.result = TodoImportResult()
+        self._last_rank: str | None = None
+        self._ranked_after_last = False
+        self.rebalance = False
+
+    def fail(self, number: int, message: str) -> None:
+        self.result.failed += 1
+        if len(self.result.errors) < MAX_REPORTED_ERRORS:
+            self.result.errors.append(TodoImportError(line=number, error=message))
+
+    async def next_rank(self) -> str:
+        if not self._ranked_after_last:
+            # Read once, uncached: new cards go after whatever is last now
+            last = await todos_collection.collection.find_one({}, projection={"rank": 1}, sort=[("rank", -1)])
+            self._last_rank = last.get("rank") if last else None
+            self._ranked_after_last = True
+        self._last_rank = rank_between(self._last_rank, None)
+        return self._last_rank
+
+    async def write(self, batch: list[tuple[int, dict]]) -> None:
+        requests = [
+            ReplaceOne({"_id": card["_id"]}, card, upsert=True) if "_id" in card else InsertOne(card)
+            for _, card in batch
+        ]
+        try:
+            details = (await todos_collection.cached.bulk_write(requests, ordered=False)).bulk_api_result
+        except BulkWriteError as e:
+            # Unordered: the other writes of the batch went through
+            details = e.details
+        for error in details.get("writeErrors", []):
+            self.fail(batch[error["index"]][0], error.get("errmsg", "Write failed"))
+        written = details.get("nInserted", 0) + details.get("nUpserted", 0)
+        self.result.inserted += written
+        self.result.updated += details.get("nMatched", 0)
+
+
+async def import_lines(chunks: AsyncIterator[bytes], batch_size: int) -> TodoImportResult:
+    """Store the cards of an NDJSON stream in unordered bulk writes of `batch_size`"""
+    importer = _Importer()
+    batch: list[tuple[int, dict]] = []
+    try:
+        async for number, line in read_lines(chunks):
+            if line is None:
+                importer.fail(number, f"Line longer than {MAX_LINE_BYTES} bytes")
+                continue
+            try:
+                card = parse_line(line)
+            except ValueError as e:
+                importer.fail(number, _error_message(e))
+                continue
+            if not card.get("rank"):
+                card["rank"] = await importer.next_rank()
+            importer.rebalance = importer.rebalance or needs_rebalance(card["rank"])
+            batch.append((number, card))
+            if len(batch) >= batch_size:
+                await importer.write(batch)
+                batch = []
+        if batch:
+            await importer.write(batch)
+    finally:
+        # Once per import, even one cut short: each refresh makes every viewer reload the whole board
+        if importer.result.inserted or importer.result.updated:
+            publish_refresh()
+
+    if importer.rebalance:
+        schedule_rebalance()
+    result = importer.result
+    logger.info(f"Imported todos: {result.inserted} inserted, {result.updated} updated, {result.failed} failed")
+    return result
@@ -21,6 +21,7 @@ class PaginatedResponse(BaseSchema, Generic[ModelType]):
     page: int
     page_size: int
     total_pages: int
+    next_cursor: str | None = None  # Opaque keyset cursor for the next page, None on the last page
 
 
 class ErrorResponse(BaseSchema):
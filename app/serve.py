@@ -0,0 +1,209 @@
+"""
+Production server.
+
+    python -m app.serve
+
+runs the app in SERVER_WORKERS prefork worker processes (default: one per
+CPU) listening on SERVER_BIND. The parent imports the app and compiles the
+templates before forking, so workers start without importing anything and
+share that memory copy-on-write. Each worker then runs the lifespan
+(MongoDB connections are per process) and serves the shared listening
+socket with uvicorn, on uvloop and httptools when they are installed.
+
+With SERVER_MAX_REQUESTS set, a worker exits gracefully after that many
+requests (plus a random SERVER_MAX_REQUESTS_JITTER, so workers don't all
+recycle at once) and is replaced. The parent keeps the socket open, so
+connections arriving meanwhile wait in the backlog instead of being
+refused. SIGTERM or SIGINT stops the workers, giving in-flight requests
+SERVER_GRACEFUL_TIMEOUT_SECONDS to finish.
+
+During development, keep using `uvicorn main:app --reload`.
+"""
+import gc
+import importlib.util
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+import uvicorn
+from uvicorn.config import STARTUP_FAILURE
+
+from app.core import config as app_config
+from app.core.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def bind_socket(bind: str, backlog: int) -> socket.socket:
+    """Listening socket for "host:port", "[ipv6]:port" or "unix:/path/to.sock" """
+    if bind.startswith("unix:"):
+        path = bind[len("unix:"):]
+        if os.path.exists(path):
+            os.unlink(path)  # Left over from a previous run
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        os.chmod(path, 0o666)
+    else:
+        host, _, port = bind.rpartition(":")
+        host = host.strip("[]") or "0.0.0.0"
+        sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, int(port)))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def worker_count(settings: Settings) -> int:
+    return settings.server_workers or os.cpu_count() or 1
+
+
+def server_config(app, settings: Settings) -> uvicorn.Config:
+    """uvicorn settings shared by every worker; loop and http "auto" pick uvloop and httptools"""
+    return uvicorn.Config(
+        app,
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keepalive_seconds,
+        timeout_graceful_shutdown=settings.server_graceful_timeout_seconds,
+        limit_max_requests=settings.server_max_requests or None,
+        limit_max_requests_jitter=settings.server_max_requests_jitter,
+        lifespan="on",
+    )
+
+
+def _exit_with_parent(parent: int) -> None:
+    # Orphaned workers (the parent was killed) shut down instead of serving forever
+    while os.getppid() == parent:
+        time.sleep(1)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+class Arbiter:
+    """Forks the workers, replaces the ones that exit and stops them on SIGTERM/SIGINT"""
+
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int, graceful_timeout: float):
+        self.config = config
+        self.sock = sock
+        self.count = workers
+        self.graceful_timeout = graceful_timeout
+        self.workers: dict[int, float] = {}  # pid -> started (monotonic)
+        self.stopping = False
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return
+
+        # Worker: uvicorn installs its own SIGTERM/SIGINT handlers for a graceful shutdown
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            threading.Thread(target=_exit_with_parent, args=(os.getppid(),), daemon=True).start()
+            uvicorn.Server(self.config).run(sockets=[self.sock])
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            logger.exception("Worker crashed")
+            code = 1
+        finally:
+            logging.shutdown()
+            os._exit(code)
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for _ in range(self.count):
+            self.spawn()
+
+        while not self.stopping:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if not pid:
+                time.sleep(0.1)
+                continue
+
+            started = self.workers.pop(pid, None)
+            code = os.waitstatus_to_exitcode(status)
+            if code == STARTUP_FAILURE:
+                logger.error(f"Worker {pid} failed to start (lifespan error), stopping")
+                self.stop()
+                return STARTUP_FAILURE
+            if code == 0:
+                logger.info(f"Worker {pid} recycled after {time.monotonic() - started:.0f}s")
+            else:
+                logger.warning(f"Worker {pid} exited with code {code}, replacing it")
+            self.spawn()
+
+        self.stop()
+        return 0
+
+    def stop(self) -> None:
+        """SIGTERM every worker; kill the ones still running after the graceful timeout"""
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        # A little longer than uvicorn's own timeout, which covers in-flight requests only
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            for pid in list(self.workers):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    del self.workers[pid]
+            time.sleep(0.05)
+        for pid in self.workers:
+            logger.warning(f"Worker {pid} did not stop in time, killing it")
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.workers.clear()
+
+
+def serve(app, settings: Settings) -> int:
+    sock = bind_socket(settings.server_bind, settings.server_backlog)
+    config = server_config(app, settings)
+    config.load()
+    workers = app_config.worker_processes = worker_count(settings)
+    logger.info(
+        f"Serving on {settings.server_bind} with {workers} workers "
+        f"(loop: {'uvloop' if importlib.util.find_spec('uvloop') else 'asyncio'}, "
+        f"http: {config.http_protocol_class.__name__})"
+    )
+    # Objects allocated so far are never collected: the collector leaves their pages shared
+    gc.freeze()
+    try:
+        return Arbiter(config, sock, workers, settings.server_graceful_timeout_seconds).run()
+    finally:
+        sock.close()
+        if settings.server_bind.startswith("unix:") and os.path.exists(settings.server_bind[len("unix:"):]):
+            os.unlink(settings.server_bind[len("unix:"):])
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:     [%(process)d] %(message)s")
+
+    # Preload: everything imported or compiled here is shared by the workers
+    import main as application
+    from app.core.templates import precompile
+
+    count = precompile()
+    logger.info(f"Preloaded the app and {count} templates")
+    return serve(application.app, get_settings())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
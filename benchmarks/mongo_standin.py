@@ -0,0 +1,533 @@
+"""
+In-memory stand-in for the parts of Motor the app uses.
+
+Implements the query, update and index behaviour the app relies on
+(equality, comparison, $in/$or/$and filters; $set/$setOnInsert/$inc/$unset
+and aggregation-pipeline updates with $not/$ifNull; unique indexes), so the
+app can be exercised end to end without a MongoDB server. Install it with
+`install()` before the app's lifespan runs: `connect_to_mongodb` then gets a
+stand-in client instead of a real one.
+
+`latency` adds a simulated round trip to every operation.
+"""
+import asyncio
+import copy
+import datetime
+import re
+from typing import Any
+
+import bson
+from bson import ObjectId
+from pymongo import DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertOneResult, UpdateResult
+
+_MISSING = object()
+
+
+def _type_order(value: Any) -> int:
+    # BSON comparison order for the types the app stores
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime.datetime):
+        return 9
+    return 10
+
+
+def _sort_key(value: Any) -> tuple:
+    if value is _MISSING or value is None:
+        return (1, 0)
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return (_type_order(value), value)
+
+
+def _stored(doc: dict) -> dict:
+    """The document as MongoDB would store and return it (naive UTC datetimes, lists for tuples, ...)"""
+    return bson.decode(bson.encode(doc))
+
+
+def _get(doc: dict, path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set(doc: dict, path: str, value: Any) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _unset(doc: dict, path: str) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(last, None)
+
+
+def _compare(value: Any, other: Any) -> int | None:
+    """-1/0/1, or None when the values are of different BSON types (they never match a range query)"""
+    if _type_order(value) != _type_order(other):
+        return None
+    a, b = _sort_key(value), _sort_key(other)
+    return (a > b) - (a < b)
+
+
+def _matches_operator(value: Any, operator: str, operand: Any) -> bool:
+    if operator == "$eq":
+        return _equals(value, operand)
+    if operator == "$ne":
+        return not _equals(value, operand)
+    if operator == "$in":
+        return any(_equals(value, item) for item in operand)
+    if operator == "$nin":
+        return not any(_equals(value, item) for item in operand)
+    if operator == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if operator in ("$gt", "$gte", "$lt", "$lte"):
+        if value is _MISSING:
+            return False
+        result = _compare(value, operand)
+        if result is None:
+            return False
+        return {"$gt": result > 0, "$gte": result >= 0, "$lt": result < 0, "$lte": result <= 0}[operator]
+    if operator == "$regex":
+        return isinstance(value, str) and re.search(operand, value) is not None
+    raise OperationFailure(f"Stand-in does not support query operator {operator}")
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if value is _MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+
+def matches(doc: dict, filter: dict | None) -> bool:
+    for key, condition in (filter or {}).items():
+        if key == "$text":
+            # Like deployments without text index support; search falls back to its own index
+            raise OperationFailure("text index required for $text query", code=27)
+        if key == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            value = _get(doc, key)
+            if not all(_matches_operator(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif not _equals(_get(doc, key), condition):
+            return False
+    return True
+
+
+def _evaluate(expression: Any, doc: dict) -> Any:
+    """Aggregation expressions used by pipeline updates"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _get(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict) and len(expression) == 1:
+        (operator, args), = expression.items()
+        if operator == "$not":
+            args = args if isinstance(args, list) else [args]
+            return not _evaluate(args[0], doc)
+        if operator == "$ifNull":
+            *values, fallback = args
+            for value in values:
+                value = _evaluate(value, doc)
+                if value is not None:
+                    return value
+            return _evaluate(fallback, doc)
+        if operator == "$literal":
+            return args
+        if operator.startswith("$"):
+            raise OperationFailure(f"Stand-in does not support expression {operator}")
+    if isinstance(expression, dict):
+        return {key: _evaluate(value, doc) for key, value in expression.items()}
+    return expression
+
+
+def _project(doc: dict, projection: dict | list | None) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    if isinstance(projection, list):
+        projection = {field: 1 for field in projection}
+    include = {field for field, flag in projection.items() if flag and field != "_id"}
+    if include:
+        result = {field: copy.deepcopy(doc[field]) for field in include if field in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {field: copy.deepcopy(value) for field, value in doc.items() if projection.get(field, 1)}
+
+
+def _normalize_sort(sort: Any, direction: int | None = None) -> list[tuple[str, int]]:
+    if sort is None:
+        return []
+    if isinstance(sort, str):
+        return [(sort, direction or 1)]
+    # {"$meta": "textScore"} orders only apply to $text queries, which the stand-in rejects
+    return [
+        (field, int(order)) for field, order in (sort.items() if isinstance(sort, dict) else sort)
+        if not isinstance(order, dict)
+    ]
+
+
+def _sorted(docs: list[dict], sort: list[tuple[str, int]]) -> list[dict]:
+    for field, direction in reversed(sort):
+        docs = sorted(docs, key=lambda doc: _sort_key(_get(doc, field)), reverse=direction < 0)
+    return docs
+
+
+class StandInCursor:
+    def __init__(self, collection: "StandInCollection", filter: dict | None, projection: dict | None):
+        self._collection = collection
+        self._filter = filter
+        self._projection = projection
+        self._sort: list[tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: list[dict] | None = None
+
+    def sort(self, key_or_list: Any, direction: int | None = None) -> "StandInCursor":
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, count: int) -> "StandInCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "StandInCursor":
+        self._limit = count
+        return self
+
+    def batch_size(self, size: int) -> "StandInCursor":
+        return self
+
+    def _evaluate(self) -> list[dict]:
+        docs = [doc for doc in self._collection._docs.values() if matches(doc, self._filter)]
+        docs = _sorted(docs, self._sort)[self._skip:]
+        if self._limit:
+            docs = docs[:abs(self._limit)]
+        return [_project(doc, self._projection) for doc in docs]
+
+    async def to_list(self, length: int | None = None) -> list[dict]:
+        await self._collection._round_trip()
+        docs = self._evaluate()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        if self._results is None:
+            await self._collection._round_trip()
+            self._results = self._evaluate()
+        if not self._results:
+            raise StopAsyncIteration
+        return self._results.pop(0)
+
+
+class StandInCollection:
+    def __init__(self, database: "StandInDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._docs: dict[Any, dict] = {}
+        self._indexes: dict[str, dict] = {"_id_": {"key": [("_id", 1)], "v": 2}}
+
+    async def _round_trip(self) -> None:
+        await self.database.client.round_trip()
+
+    def _check_unique(self, doc: dict, ignore_id: Any = _MISSING) -> None:
+        for name, index in self._indexes.items():
+            if name == "_id_" or not index.get("unique"):
+                continue
+            fields = [field for field, _ in index["key"]]
+            key = tuple(_get(doc, field) for field in fields)
+            if index.get("sparse") and all(value is _MISSING for value in key):
+                continue
+            for other_id, other in self._docs.items():
+                if other_id != ignore_id and tuple(_get(other, field) for field in fields) == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {name}", 11000)
+
+    def _insert(self, document: dict) -> Any:
+        # Like pymongo, an inserted document gets its generated _id
+        document.setdefault("_id", ObjectId())
+        doc = _stored(document)
+        if doc["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: _id_", 11000)
+        self._check_unique(doc)
+        self._docs[doc["_id"]] = doc
+        return doc["_id"]
+
+    def _apply_update(self, doc: dict, update: dict | list, inserting: bool) -> dict:
+        updated = copy.deepcopy(doc)
+        if isinstance(update, list):
+            for stage in update:
+                (stage_name, fields), = stage.items()
+                if stage_name not in ("$set", "$addFields"):
+                    raise OperationFailure(f"Stand-in does not support pipeline stage {stage_name}")
+                values = {field: _evaluate(expression, updated) for field, expression in fields.items()}
+                for field, value in values.items():
+                    _set(updated, field, value)
+            return _stored(updated)
+
+        for operator, fields in update.items():
+            for field, value in fields.items():
+                if operator == "$set" or (operator == "$setOnInsert" and inserting):
+                    _set(updated, field, copy.deepcopy(value))
+                elif operator == "$inc":
+                    current = _get(updated, field)
+                    _set(updated, field, (0 if current is _MISSING else current) + value)
+                elif operator == "$unset":
+                    _unset(updated, field)
+                elif operator != "$setOnInsert":
+                    raise OperationFailure(f"Stand-in does not support update operator {operator}")
+        return _stored(updated)
+
+    def _find_first(self, filter: dict | None, sort: Any = None) -> dict | None:
+        docs = [doc for doc in self._docs.values() if matches(doc, filter)]
+        docs = _sorted(docs, _normalize_sort(sort))
+        return docs[0] if docs else None
+
+    def _update(self, filter: dict, update: dict | list, upsert: bool, sort: Any = None) -> tuple[dict | None, dict | None, Any]:
+        """Returns (before, after, upserted_id)"""
+        doc = self._find_first(filter, sort)
+        if doc is not None:
+            updated = self._apply_update(doc, update, inserting=False)
+            updated["_id"] = doc["_id"]
+            self._check_unique(updated, ignore_id=doc["_id"])
+            self._docs[doc["_id"]] = updated
+            return doc, updated, None
+        if not upsert:
+            return None, None, None
+
+        # Upserts start from the equality fields of the filter
+        seed = {
+            key: value for key, value in filter.items()
+            if not key.startswith("$") and not (isinstance(value, dict) and any(k.startswith("$") for k in value))
+        }
+        new_doc = self._apply_update(seed, update, inserting=True)
+        upserted_id = self._insert(new_doc)
+        return None, self._docs[upserted_id], upserted_id
+
+    # Motor API
+
+    def find(self, filter: dict | None = None, projection: dict | None = None, **kwargs) -> StandInCursor:
+        cursor = StandInCursor(self, filter, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    async def find_one(self, filter: Any = None, projection: dict | None = None, sort: Any = None, **kwargs) -> dict | None:
+        await self._round_trip()
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        doc = self._find_first(filter, sort)
+        return _project(doc, projection) if doc is not None else None
+
+    async def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        await self._round_trip()
+        return InsertOneResult(self._insert(document), acknowledged=True)
+
+    async def update_one(self, filter: dict, update: dict | list, upsert: bool = False, **kwargs) -> UpdateResult:
+        await self._round_trip()
+        before, after, upserted_id = self._update(filter, update, upsert)
+        raw = {"n": 1 if after is not None else 0, "nModified": int(before is not None and before != after), "ok": 1.0}
+        if upserted_id is not None:
+            raw["upserted"] = upserted_id
+        return UpdateResult(raw, acknowledged=True)
+
+    async def update_many(self, filter: dict, update: dict | list, **kwargs) -> UpdateResult:
+        await self._round_trip()
+        matched = modified = 0
+        for doc in [doc for doc in self._docs.values() if matches(doc, filter)]:
+            updated = self._apply_update(doc, update, inserting=False)
+            matched += 1
+            modified += updated != doc
+            self._docs[doc["_id"]] = updated
+        return UpdateResult({"n": matched, "nModified": modified, "ok": 1.0}, acknowledged=True)
+
+    async def find_one_and_update(
+        self,
+        filter: dict,
+        update: dict | list,
+        projection: dict | None = None,
+        sort: Any = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+        **kwargs,
+    ) -> dict | None:
+        await self._round_trip()
+        before, after, _ = self._update(filter, update, upsert, sort)
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return _project(doc, projection) if doc is not None else None
+
+    async def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        await self._round_trip()
+        doc = self._find_first(filter)
+        if doc is not None:
+            del self._docs[doc["_id"]]
+        return DeleteResult({"n": int(doc is not None), "ok": 1.0}, acknowledged=True)
+
+    async def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        await self._round_trip()
+        ids = [doc["_id"] for doc in self._docs.values() if matches(doc, filter)]
+        for _id in ids:
+            del self._docs[_id]
+        return DeleteResult({"n": len(ids), "ok": 1.0}, acknowledged=True)
+
+    async def bulk_write(self, requests: list, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        await self._round_trip()
+        result = {
+            "nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0,
+            "upserted": [], "writeErrors": [], "writeConcernErrors": [],
+        }
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    result["nInserted"] += 1
+                elif isinstance(request, UpdateOne):
+                    before, after, upserted_id = self._update(request._filter, request._doc, bool(request._upsert))
+                    if upserted_id is not None:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": index, "_id": upserted_id})
+                    elif after is not None:
+                        result["nMatched"] += 1
+                        result["nModified"] += before != after
+                elif isinstance(request, ReplaceOne):
+                    doc = self._find_first(request._filter)
+                    if doc is not None:
+                        replacement = _stored({**request._doc, "_id": doc["_id"]})
+                        self._check_unique(replacement, ignore_id=doc["_id"])
+                        self._docs[doc["_id"]] = replacement
+                        result["nMatched"] += 1
+                        result["nModified"] += replacement != doc
+                    elif request._upsert:
+                        # Like an update upsert, the new document takes the filter's _id
+                        seed = {"_id": request._filter["_id"]} if "_id" in request._filter else {}
+                        upserted_id = self._insert({**seed, **request._doc})
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": index, "_id": upserted_id})
+                elif isinstance(request, DeleteOne):
+                    doc = self._find_first(request._filter)
+                    if doc is not None:
+                        del self._docs[doc["_id"]]
+                        result["nRemoved"] += 1
+                else:
+                    raise OperationFailure(f"Stand-in does not support {type(request).__name__}")
+            except DuplicateKeyError as e:
+                result["writeErrors"].append({"index": index, "code": 11000, "errmsg": str(e), "op": request._doc})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, acknowledged=True)
+
+    async def count_documents(self, filter: dict, **kwargs) -> int:
+        await self._round_trip()
+        return sum(1 for doc in self._docs.values() if matches(doc, filter))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        await self._round_trip()
+        return len(self._docs)
+
+    async def create_indexes(self, indexes: list, **kwargs) -> list[str]:
+        await self._round_trip()
+        names = []
+        for model in indexes:
+            spec = dict(model.document)
+            name = spec.pop("name")
+            spec["key"] = list(spec["key"].items())
+            self._indexes[name] = spec
+            if spec.get("unique"):
+                for doc in self._docs.values():
+                    self._check_unique(doc, ignore_id=doc["_id"])
+            names.append(name)
+        return names
+
+    async def index_information(self) -> dict:
+        await self._round_trip()
+        return copy.deepcopy(self._indexes)
+
+    def watch(self, *args, **kwargs):
+        # Like a standalone mongod: change streams need a replica set
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+
+class StandInDatabase:
+    def __init__(self, client: "StandInClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: dict[str, StandInCollection] = {}
+
+    def __getitem__(self, name: str) -> StandInCollection:
+        if name not in self._collections:
+            self._collections[name] = StandInCollection(self, name)
+        return self._collections[name]
+
+    async def command(self, command: str | dict, **kwargs) -> dict:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name != "ping":
+            raise OperationFailure(f"Stand-in does not support command {name}")
+        await self.client.round_trip()
+        return {"ok": 1.0}
+
+
+class StandInClient:
+    """Drop-in for AsyncIOMotorClient; accepts and ignores the connection options"""
+
+    latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        self._databases: dict[str, StandInDatabase] = {}
+        self.operations = 0
+
+    def __getitem__(self, name: str) -> StandInDatabase:
+        if name not in self._databases:
+            self._databases[name] = StandInDatabase(self, name)
+        return self._databases[name]
+
+    async def round_trip(self) -> None:
+        self.operations += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def close(self) -> None:
+        pass
+
+
+def install(latency: float = 0.0) -> None:
+    """Make connect_to_mongodb create stand-in clients; `latency` is seconds per operation"""
+    from app.core import database
+
+    StandInClient.latency = latency
+    database.AsyncIOMotorClient = StandInClient
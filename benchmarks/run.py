@@ -0,0 +1,341 @@
+"""
+End-to-end benchmarks of the app's hot paths.
+
+Requests go through the ASGI app in-process (httpx.ASGITransport, real
+lifespan, real middleware and templates) against the in-memory MongoDB
+stand-in, so results measure application code rather than the network.
+
+    python -m benchmarks.run                          # all scenarios
+    python -m benchmarks.run -s todos_list -n 2000    # one scenario, more requests
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --fail-on-regression
+
+Each scenario reports throughput and p50/p95/p99 latency. Baselines are
+plain JSON; --compare flags scenarios whose throughput dropped or p95 grew
+by more than --threshold percent.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)  # Templates and static files are resolved relative to the project root
+
+# The app reads its settings at import time
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://stand-in:27017")
+os.environ.setdefault("HEADER_AUTH_ENABLED", "true")
+os.environ.setdefault("DATABRICKS_HEADER_AUTH", "true")
+# Every request comes from one simulated user, who would be throttled
+os.environ.setdefault("RATE_LIMIT_PER_SECOND", "0")
+# Without network I/O, requests can run for long stretches without yielding, which looks like a stalled event loop
+os.environ.setdefault("OVERLOAD_MAX_LOOP_LAG_SECONDS", "0")
+
+import httpx
+
+from benchmarks import mongo_standin
+
+Request = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    # Builds the request function once the app is up and seeded
+    setup: Callable[["Context"], Request]
+    expected_status: tuple[int, ...] = (200,)
+
+
+@dataclass
+class Context:
+    admin_cookies: dict
+    user_cookies: dict
+    todo_ids: list[str]
+
+
+@dataclass
+class Result:
+    scenario: str
+    requests: int
+    concurrency: int
+    errors: int
+    seconds: float
+    rps: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    status_codes: dict[str, int] = field(default_factory=dict)
+
+
+def _dashboard(ctx: Context) -> Request:
+    return lambda client: client.get("/", cookies=ctx.user_cookies)
+
+
+def _todos_list(ctx: Context) -> Request:
+    return lambda client: client.get("/todos/", cookies=ctx.user_cookies)
+
+
+def _todos_list_conditional(ctx: Context) -> Request:
+    etag: dict = {}
+
+    async def request(client: httpx.AsyncClient) -> httpx.Response:
+        headers = {"If-None-Match": etag["value"]} if etag else {}
+        response = await client.get("/todos/", cookies=ctx.user_cookies, headers=headers)
+        etag["value"] = response.headers.get("etag", "")
+        return response
+
+    return request
+
+
+def _todos_search(ctx: Context) -> Request:
+    # A few distinct queries, as when viewers type the same words (mostly cache hits)
+    queries = itertools.cycle(["card 7", "lorem", "seeded card", "dolor 42", "missing"])
+    return lambda client: client.get("/todos/search", params={"q": next(queries)}, cookies=ctx.user_cookies)
+
+
+def _todos_save(ctx: Context) -> Request:
+    counter = itertools.count()
+
+    def request(client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+        n = next(counter)
+        # Alternate creating cards and editing existing ones
+        data = {"title": f"Benchmark card {n}", "content": f"Some **markdown** for card {n}\n\n- item\n- item"}
+        if n % 2:
+            data["todo_id"] = ctx.todo_ids[n % len(ctx.todo_ids)]
+        return client.post("/todos/save", data=data, cookies=ctx.admin_cookies)
+
+    return request
+
+
+def _todos_toggle(ctx: Context) -> Request:
+    ids = itertools.cycle(ctx.todo_ids)
+    return lambda client: client.post(f"/todos/{next(ids)}/toggle", cookies=ctx.user_cookies)
+
+
+def _header_auth(ctx: Context) -> Request:
+    # A small population of users, so most requests hit the identity cache as in production
+    emails = itertools.cycle([f"user{i}@example.com" for i in range(50)])
+    return lambda client: client.get("/", headers={"X-Databricks-User-Email": next(emails)})
+
+
+SCENARIOS = [
+    Scenario("dashboard", "GET / with a session cookie", _dashboard),
+    Scenario("todos_list", "GET /todos/, first page of cards", _todos_list),
+    Scenario("todos_list_conditional", "GET /todos/ revalidated with If-None-Match", _todos_list_conditional, (200, 304)),
+    Scenario("todos_search", "GET /todos/search, active search over five queries", _todos_search),
+    Scenario("todos_save", "POST /todos/save, alternating create and update", _todos_save),
+    Scenario("todos_toggle", "POST /todos/{id}/toggle", _todos_toggle),
+    Scenario("header_auth", "GET / authenticated by Databricks headers", _header_auth),
+]
+
+
+async def _seed(count: int) -> list[str]:
+    from app.core.collections import todos_collection
+    from app.features.todos.model import TodoItem
+    from app.features.todos.ranking import spread_ranks
+    from app.features.todos.rendering import render_fields
+
+    rng = random.Random(0)
+    ids = []
+    for i, rank in enumerate(spread_ranks(count)):
+        content = f"# Card {i}\n\n" + "Lorem ipsum dolor sit amet. " * rng.randint(1, 20)
+        todo = TodoItem(
+            title=f"Seeded card {i}",
+            content=content,
+            **render_fields(content),
+            column_width=rng.choice([3, 4, 6, 12]),
+            completed=rng.random() < 0.3,
+            rank=rank,
+        )
+        doc = todo.model_dump(by_alias=True, exclude_none=True)
+        doc.pop("_id", None)
+        result = await todos_collection.collection.insert_one(doc)
+        ids.append(str(result.inserted_id))
+    return ids
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def _measure(scenario: Scenario, request: Request, client: httpx.AsyncClient, requests: int, concurrency: int, warmup: int) -> Result:
+    for _ in range(warmup):
+        await request(client)
+
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    errors = 0
+    remaining = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while next(remaining) < requests:
+            start = time.perf_counter()
+            try:
+                response = await request(client)
+                status = response.status_code
+            except Exception:
+                status = "exception"
+            latencies.append(time.perf_counter() - start)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status not in scenario.expected_status:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ms = sorted(latency * 1000 for latency in latencies)
+    return Result(
+        scenario=scenario.name,
+        requests=len(ms),
+        concurrency=concurrency,
+        errors=errors,
+        seconds=round(elapsed, 4),
+        rps=round(len(ms) / elapsed, 1),
+        mean_ms=round(statistics.fmean(ms), 3),
+        p50_ms=round(_percentile(ms, 0.50), 3),
+        p95_ms=round(_percentile(ms, 0.95), 3),
+        p99_ms=round(_percentile(ms, 0.99), 3),
+        max_ms=round(ms[-1], 3),
+        status_codes=statuses,
+    )
+
+
+async def run(
+    scenario_names: list[str] | None = None,
+    requests: int = 500,
+    concurrency: int = 10,
+    warmup: int = 20,
+    seed_todos: int = 200,
+    db_latency_ms: float = 0.0,
+) -> list[Result]:
+    """Start the app against a fresh stand-in database and run the scenarios in order"""
+    mongo_standin.install(latency=db_latency_ms / 1000)
+
+    import main
+    from app.core.security import create_access_token
+
+    selected = [s for s in SCENARIOS if not scenario_names or s.name in scenario_names]
+    results = []
+    async with main.app.router.lifespan_context(main.app):
+        ctx = Context(
+            admin_cookies={"access_token": create_access_token({"sub": "admin", "email": "admin@example.com", "name": "Admin", "role": "admin"})},
+            user_cookies={"access_token": create_access_token({"sub": "user", "email": "user@example.com", "name": "User", "role": "user"})},
+            todo_ids=await _seed(seed_todos),
+        )
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for scenario in selected:
+                results.append(await _measure(scenario, scenario.setup(ctx), client, requests, concurrency, warmup))
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=ROOT
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_baseline(path: Path, results: list[Result], options: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": options,
+        "results": {result.scenario: asdict(result) for result in results},
+    }, indent=2) + "\n")
+
+
+def compare(baseline: dict, results: list[Result], threshold: float) -> list[str]:
+    """Print a comparison table; returns the names of regressed scenarios"""
+    regressed = []
+    print(f"\nCompared with baseline from {baseline.get('created_at', '?')} (commit {baseline.get('commit') or '?'})")
+    print(f"{'scenario':<24}{'rps':>22}{'p95 ms':>24}")
+    for result in results:
+        before = baseline["results"].get(result.scenario)
+        if not before:
+            print(f"{result.scenario:<24}{'(not in baseline)':>22}")
+            continue
+        rps_change = (result.rps - before["rps"]) / before["rps"] * 100
+        p95_change = (result.p95_ms - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        flag = ""
+        if rps_change < -threshold or p95_change > threshold:
+            regressed.append(result.scenario)
+            flag = "  REGRESSION"
+        print(
+            f"{result.scenario:<24}{before['rps']:>9.1f} -> {result.rps:>7.1f} ({rps_change:+5.1f}%)"
+            f"{before['p95_ms']:>8.2f} -> {result.p95_ms:>7.2f} ({p95_change:+5.1f}%){flag}"
+        )
+    return regressed
+
+
+def print_results(results: list[Result]) -> None:
+    print(f"{'scenario':<24}{'requests':>9}{'errors':>8}{'rps':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for r in results:
+        print(f"{r.scenario:<24}{r.requests:>9}{r.errors:>8}{r.rps:>10.1f}{r.p50_ms:>9.2f}{r.p95_ms:>9.2f}{r.p99_ms:>9.2f}{r.max_ms:>9.2f}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-s", "--scenario", action="append", choices=[s.name for s in SCENARIOS], help="Run only these scenarios (repeatable)")
+    parser.add_argument("-n", "--requests", type=int, default=500, help="Measured requests per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=10, help="Concurrent clients")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario")
+    parser.add_argument("--seed-todos", type=int, default=200, help="Todo cards in the database before the run")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Simulated MongoDB round trip per operation")
+    parser.add_argument("--save", type=Path, help="Write results as a JSON baseline")
+    parser.add_argument("--compare", type=Path, help="Compare with a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if --compare finds a regression")
+    args = parser.parse_args(argv)
+
+    options = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "warmup": args.warmup,
+        "seed_todos": args.seed_todos,
+        "db_latency_ms": args.db_latency_ms,
+    }
+    results = asyncio.run(run(args.scenario, **options))
+    print_results(results)
+
+    if args.save:
+        save_baseline(args.save, results, options)
+        print(f"\nBaseline saved to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if baseline.get("options") != options:
+            print(f"\nNote: baseline options differ: {baseline.get('options')}")
+        regressed = compare(baseline, results, args.threshold)
+        if regressed and args.fail_on_regression:
+            return 1
+
+    return 1 if any(r.errors for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
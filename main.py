@@ -1,31 +1,67 @@
+from app.core import startup  # First, so startup timing includes every import
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+import asyncio
+import logging
 
 from app.core.config import get_settings
-from app.core.database import connect_to_mongodb, close_mongodb
+from app.core.database import connect_to_mongodb, close_mongodb, warm_up_mongodb
+from app.core.health import router as health_router
+from app.core.metrics import MetricsMiddleware, router as metrics_router
+from app.core.timing import ServerTimingMiddleware, phase
+from app.core.collections import close_collection_cache, ensure_all_indexes
 from app.auth.router import router as auth_router, init_oauth_providers
-from app.core.features import discover_features
+from app.auth.providers import registry as oauth_registry
+from app.core.features import LazyFeatureMiddleware, feature_registry
+from app.core.assets import AssetFiles, manifest as asset_manifest
+from app.core.templates import precompile as precompile_templates, templates
+from app.core.compression import CompressionMiddleware
+from app.core.ratelimit import RateLimitMiddleware
+from app.core.http_cache import BOOT_TIME, cache_headers, is_not_modified, make_etag, not_modified
 from app.auth.middleware import get_current_user, get_available_auth_providers
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongodb()
+    if await warm_up_mongodb():
+        if settings.mongodb_ensure_indexes:
+            await ensure_all_indexes()
+    else:
+        logger.error("MongoDB unreachable at startup; /readyz reports unavailable until it answers")
+    asset_manifest.load(build_assets=settings.static_build_on_startup)
     init_oauth_providers()
+    if not settings.fast_start:
+        # Fast start compiles templates and opens the OAuth HTTP client on first use
+        from app.features.todos.rendering import warm_up as warm_up_markdown
+        precompile_templates()
+        warm_up_markdown()
+        await oauth_registry.startup()
+
+    # Discover features once; handlers read the snapshot from the registry.
+    # Fast start reads feature_info from source and imports routers on first request.
+    feature_registry.build(lazy=settings.fast_start)
+    feature_registry.mount(app)
+    watcher = asyncio.create_task(feature_registry.watch(app)) if settings.feature_watch else None
+
+    startup.mark("ready")
     yield
+
+    if watcher:
+        watcher.cancel()
+    await oauth_registry.aclose()
+    await close_collection_cache()
     await close_mongodb()
 
 
 app = FastAPI(title=settings.app_name, lifespan=lifespan)
-templates = Jinja2Templates(directory="app/templates")
 
-# Serve static files for cyberpunk.css
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Static files; fingerprinted copies under /static/dist are precompressed and cached forever
+app.mount("/static", AssetFiles(directory="app/static"), name="static")
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -35,28 +71,39 @@ async def root(request: Request):
     
     if user:
         # Authenticated - show dashboard
-        features = discover_features()
-        return templates.TemplateResponse(
-            "dashboard/dashboard.html",
-            {
-                "request": request,
-                "user": {
-                    "name": user.get("name", "User"), 
-                    "email": user.get("email", ""), 
-                    "avatar_url": None,
-                    "role": user.get("role", "user"),
-                },
-                "features": [{"name": f.name, "url": f.url} for f in features],
-            },
+        # Only depends on the user and the feature snapshot, so a repeat visit is a 304
+        etag = make_etag(
+            "dashboard", user.get("id"), user.get("name"), user.get("email"), user.get("role"),
+            feature_registry.snapshot.fingerprint,
         )
+        if is_not_modified(request, etag, BOOT_TIME):
+            return not_modified(etag, BOOT_TIME)
+
+        with phase("render"):
+            response = await templates.render(
+                "dashboard/dashboard.html",
+                {
+                    "request": request,
+                    "user": {
+                        "name": user.get("name", "User"), 
+                        "email": user.get("email", ""), 
+                        "avatar_url": None,
+                        "role": user.get("role", "user"),
+                    },
+                    "features": feature_registry.features,
+                },
+            )
+        response.headers.update(cache_headers(etag, BOOT_TIME))
+        return response
     
     # Not authenticated - show landing page (no login required)
     providers = get_available_auth_providers(request)
-    return templates.TemplateResponse("landing.html", {
-        "request": request, 
-        "providers": providers,
-        "user": None
-    })
+    with phase("render"):
+        return await templates.render("landing.html", {
+            "request": request, 
+            "providers": providers,
+            "user": None
+        })
 
 
 @app.get("/logout", response_class=HTMLResponse)
@@ -70,7 +117,27 @@ async def logout():
 
 
 app.include_router(auth_router)
+app.include_router(health_router)
+if settings.compression_enabled:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_minimum_size)
+app.add_middleware(
+    RateLimitMiddleware,
+    rate=settings.rate_limit_per_second,
+    burst=settings.rate_limit_burst,
+    max_keys=settings.rate_limit_max_keys,
+    max_in_flight=settings.overload_max_in_flight,
+    max_loop_lag=settings.overload_max_loop_lag_seconds,
+    exempt_paths=tuple(settings.rate_limit_exempt_paths),
+)
+if settings.server_timing != "off":
+    app.add_middleware(ServerTimingMiddleware)
+if settings.metrics_enabled:
+    # Metrics are still collected without a token, but never served unauthenticated
+    if settings.metrics_token:
+        app.include_router(metrics_router)
+    app.add_middleware(MetricsMiddleware)
+if settings.fast_start:
+    app.add_middleware(LazyFeatureMiddleware, registry=feature_registry)
+app.add_middleware(startup.FirstRequestMiddleware)
 
-features = discover_features()
-for feature in features:
-    app.include_router(feature.router)
+startup.mark("imported")
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Tests for fingerprinted static assets and response compression: CSS
+minification, the build and manifest, precompressed immutable serving,
+and gzip compression of buffered and streamed responses.
+Run this with: python tests/test_assets.py
+"""
+
+import asyncio
+import gzip
+import os
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
+
+from app.core import assets
+from app.core.assets import AssetFiles, AssetManifest, build, minify_css
+from app.core.compression import CompressionMiddleware, negotiate
+
+CSS = """/* Header "comment" with quotes, don't */
+.card  >  .title ,  .card:hover {
+    content : "keep  /* this */  ;" ;
+    margin: 0 auto ;
+}
+@media (max-width: 768px) {
+    .card :first-child { color: #fff; }
+}
+"""
+
+
+def test_minify():
+    print("Testing CSS minification...")
+
+    assert minify_css(CSS) == (
+        '.card>.title,.card:hover{content :"keep  /* this */  ;";margin:0 auto}'
+        "@media (max-width:768px){.card :first-child{color:#fff}}"
+    ), minify_css(CSS)
+    print("✓ Comments and whitespace dropped, strings and descendant selectors kept")
+
+
+def test_build_and_serve():
+    print("Testing the asset build and precompressed serving...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        static = Path(tmp)
+        (static / "site.css").write_text(CSS * 20)
+        (static / "logo.png").write_bytes(b"\x89PNG")
+
+        manifest = build(static)
+        hashed = manifest["files"]["site.css"]
+        assert list(manifest["files"]) == ["site.css"], manifest
+        assert hashed.startswith("site.") and hashed.endswith(".css") and len(hashed) == len("site..css") + 12
+        data = (static / "dist" / hashed).read_bytes()
+        assert gzip.decompress((static / "dist" / f"{hashed}.gz").read_bytes()) == data
+        # Content-addressed: rebuilding unchanged sources gives the same names
+        assert build(static)["files"] == manifest["files"]
+        print("✓ Minified, content-hashed and precompressed")
+
+        loaded = AssetManifest()
+        loaded.load(build_assets=False, static_dir=static)
+        assert loaded.url("site.css") == f"/static/dist/{hashed}"
+        assert loaded.url("logo.png") == "/static/logo.png"
+        missing = AssetManifest()
+        missing.load(build_assets=False, static_dir=static / "nowhere")
+        assert missing.url("site.css") == "/static/site.css"
+        print("✓ URLs use hashed names, plain names when not built")
+
+        app = FastAPI()
+        app.mount("/static", AssetFiles(directory=static), name="static")
+        original, assets.manifest = assets.manifest, loaded
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.get(f"/static/dist/{hashed}", headers={"Accept-Encoding": "gzip"})
+                assert response.headers["content-encoding"] == "gzip"
+                assert response.headers["content-type"].startswith("text/css")
+                assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+                assert response.content == data
+
+                response = await client.get(f"/static/dist/{hashed}", headers={"Accept-Encoding": "identity"})
+                assert "content-encoding" not in response.headers and response.content == data
+
+                response = await client.get("/static/site.css")
+                assert "immutable" not in response.headers.get("cache-control", "")
+
+        try:
+            asyncio.run(run())
+        finally:
+            assets.manifest = original
+    print("✓ Hashed files served precompressed with immutable caching")
+
+
+def test_compression_middleware():
+    print("Testing response compression...")
+
+    assert negotiate("gzip, deflate, br") == "gzip"
+    assert negotiate("br;q=1.0, gzip;q=0") is None
+    assert negotiate("") is None
+
+    page = "<p>" + "todo card " * 200 + "</p>"
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/page")
+    async def html():
+        return HTMLResponse(page)
+
+    @app.get("/small")
+    async def small():
+        return HTMLResponse("<p>hi</p>")
+
+    @app.get("/text")
+    async def text():
+        return PlainTextResponse(page, headers={"Content-Encoding": "identity"})
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"<div>chunk {i}</div>" * 10
+        return StreamingResponse(chunks(), media_type="text/html")
+
+    @app.get("/events")
+    async def events():
+        async def chunks():
+            yield "data: " + "x" * 1000 + "\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/page", headers={"Accept-Encoding": "gzip"})
+            assert response.headers["content-encoding"] == "gzip"
+            assert response.headers["vary"] == "Accept-Encoding"
+            assert int(response.headers["content-length"]) < len(page) / 10
+            assert response.text == page
+
+            for path in ("/small", "/text", "/events"):
+                response = await client.get(path, headers={"Accept-Encoding": "gzip"})
+                assert response.headers.get("content-encoding") in (None, "identity"), path
+            response = await client.get("/page", headers={"Accept-Encoding": "identity"})
+            assert "content-encoding" not in response.headers
+
+        # Streamed: every chunk is flushed, so it decompresses on its own as it arrives
+        messages = []
+
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "query_string": b"",
+            "root_path": "", "scheme": "http", "server": ("test", 80), "client": ("127.0.0.1", 1),
+            "headers": [(b"accept-encoding", b"gzip")], "http_version": "1.1",
+        }
+        await app(scope, receive, send)
+        disconnected.set()
+        start = messages[0]
+        headers = dict(start["headers"])
+        assert headers[b"content-encoding"] == b"gzip" and b"content-length" not in headers
+        decompressor = zlib.decompressobj(31)
+        *chunks, trailer = [m["body"] for m in messages[1:]]
+        assert len(chunks) == 3, len(chunks)
+        for i, chunk in enumerate(chunks):
+            assert decompressor.decompress(chunk).decode() == f"<div>chunk {i}</div>" * 10
+        assert decompressor.decompress(trailer) == b"" and decompressor.eof
+
+    asyncio.run(run())
+    print("✓ HTML gzipped; small, encoded and event-stream responses untouched; streams flushed per chunk")
+
+
+def main():
+    print("=" * 60)
+    print("Asset and Compression Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_minify()
+        test_build_and_serve()
+        test_compression_middleware()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Smoke test for the benchmark suite: every scenario runs against the
+MongoDB stand-in without errors, and baselines round-trip.
+Run this with: python tests/test_benchmarks.py
+"""
+
+import asyncio
+from functools import lru_cache
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import run as benchmarks
+
+
+@lru_cache
+def _results() -> tuple:
+    """Every scenario run briefly, once per test process"""
+    return tuple(asyncio.run(benchmarks.run(requests=20, concurrency=4, warmup=2, seed_todos=30)))
+
+
+def test_scenarios_run_clean():
+    print("Running every scenario briefly...")
+
+    results = _results()
+    assert [r.scenario for r in results] == [s.name for s in benchmarks.SCENARIOS]
+    for result in results:
+        assert result.errors == 0, f"{result.scenario}: {result.status_codes}"
+        assert result.requests == 20
+        assert 0 < result.p50_ms <= result.p95_ms <= result.p99_ms <= result.max_ms
+    print("✓ All scenarios completed without errors")
+
+
+def test_baseline_round_trip():
+    print("Testing baseline save and compare...")
+
+    results = list(_results())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "baseline.json"
+        benchmarks.save_baseline(path, results, {"requests": 20})
+        baseline = json.loads(path.read_text())
+
+    assert set(baseline["results"]) == {r.scenario for r in results}
+    assert benchmarks.compare(baseline, results, threshold=10.0) == []
+
+    # Halve throughput of one scenario: flagged as a regression
+    baseline["results"][results[0].scenario]["rps"] = results[0].rps * 2
+    assert benchmarks.compare(baseline, results, threshold=10.0) == [results[0].scenario]
+    print("✓ Baselines save and regressions are flagged")
+
+
+def main():
+    print("=" * 60)
+    print("Benchmark Suite Smoke Test")
+    print("=" * 60)
+    print()
+
+    try:
+        test_scenarios_run_clean()
+        test_baseline_round_trip()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Tests for the read-through collection cache and its backends.
+The Redis backend runs against a minimal in-process RESP stand-in.
+Run this with: python tests/test_collection_cache.py
+"""
+
+import asyncio
+from datetime import datetime, timezone
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from bson import ObjectId
+
+from benchmarks import mongo_standin
+
+mongo_standin.install()
+
+from app.core import config, database
+from app.core.cache import MemoryCacheBackend, RedisCacheBackend
+from app.core.collections import CachedCollection
+from app.core.http_cache import BOOT_TIME, CollectionVersion
+
+
+class RespStandIn:
+    """Serves GET/MGET/SET (PX)/DEL/INCR/PING over RESP from a dict"""
+
+    def __init__(self):
+        self.data: dict[bytes, tuple[bytes, float | None]] = {}
+        self.commands = 0
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            args = []
+            for _ in range(int(line[1:])):
+                length = int((await reader.readline())[1:])
+                args.append((await reader.readexactly(length + 2))[:-2])
+            self.commands += 1
+            writer.write(self.reply(args[0].upper(), args[1:]))
+            await writer.drain()
+        writer.close()
+
+    def reply(self, command: bytes, args: list[bytes]) -> bytes:
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command == b"GET":
+            return self.bulk(args[0])
+        if command == b"MGET":
+            return b"*%d\r\n" % len(args) + b"".join(self.bulk(key) for key in args)
+        if command == b"SET":
+            expires_at = time.monotonic() + int(args[3]) / 1000 if len(args) > 3 else None
+            self.data[args[0]] = (args[1], expires_at)
+            return b"+OK\r\n"
+        if command == b"DEL":
+            return b":%d\r\n" % sum(self.data.pop(key, None) is not None for key in args)
+        if command == b"INCR":
+            value = int(self.data.get(args[0], (b"0", None))[0]) + 1
+            self.data[args[0]] = (str(value).encode(), None)
+            return b":%d\r\n" % value
+        return b"-ERR unknown command\r\n"
+
+    def bulk(self, key: bytes) -> bytes:
+        value, expires_at = self.data.get(key, (None, None))
+        if value is None or (expires_at and expires_at < time.monotonic()):
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class FakeCollection:
+    """Just enough of a Motor collection to count round trips"""
+
+    def __init__(self, docs: list[dict]):
+        self.docs = docs
+        self.reads = 0
+
+    async def find_one(self, filter, projection=None, sort=None):
+        self.reads += 1
+        return next((doc for doc in self.docs if all(doc.get(k) == v for k, v in (filter or {}).items())), None)
+
+    async def update_one(self, filter, update):
+        doc = await self.find_one(filter)
+        doc.update(update["$set"])
+
+
+class FakeHelper:
+    name = "things"
+
+    def __init__(self, docs: list[dict]):
+        self.collection = FakeCollection(docs)
+        self.version = CollectionVersion(self.name)
+
+
+async def check_backend(backend):
+    await backend.set("k", b"value", 60)
+    assert await backend.get("k") == b"value"
+    assert await backend.get("missing") is None
+
+    await backend.set("short", b"x", 0.05)
+    await asyncio.sleep(0.1)
+    assert await backend.get("short") is None
+
+    assert await backend.get_counters("n") == [0]
+    assert await backend.incr("n") == 1
+    assert await backend.incr("n", "n:stamp") == 2
+    counter, stamp = await backend.get_counters("n", "n:stamp")
+    assert counter == 2 and abs(stamp - time.time() * 1000) < 5000
+    assert await backend.get_with_counter("n", "k") == (2, b"value")
+    assert await backend.get_with_counter("other", "missing") == (0, None)
+
+    await backend.delete("k")
+    assert await backend.get("k") is None
+
+
+async def check_read_through(backend):
+    _id = ObjectId()
+    helper = FakeHelper([{"_id": _id, "name": "first"}])
+    cached = CachedCollection(helper, backend, ttl=60)
+
+    doc = await cached.find_one({"_id": _id})
+    assert doc == {"_id": _id, "name": "first"}
+    assert await cached.find_one({"_id": _id}) == doc
+    assert helper.collection.reads == 1, "second read should be served from the cache"
+
+    # Misses are cached too
+    assert await cached.find_one({"_id": ObjectId()}) is None
+    assert await cached.find_one({"name": "nobody"}) is None
+    reads = helper.collection.reads
+
+    version = helper.version.local
+    await cached.update_one({"_id": _id}, {"$set": {"name": "second"}})
+    assert helper.version.local != version, "writes bump the version"
+    assert (await cached.find_one({"_id": _id}))["name"] == "second"
+    assert helper.collection.reads == reads + 2  # one for the write's lookup, one re-read
+
+
+class FlakyBackend(MemoryCacheBackend):
+    """Memory backend whose counter increments fail while `down` is set, like an unreachable server"""
+
+    down = False
+
+    async def incr(self, key: str, stamp_key: str | None = None) -> int | None:
+        return None if self.down else await super().incr(key, stamp_key)
+
+
+async def check_failed_invalidation():
+    _id = ObjectId()
+    helper = FakeHelper([{"_id": _id, "name": "first"}])
+    backend = FlakyBackend()
+    cached = CachedCollection(helper, backend, ttl=60)
+    await cached.find_one({"_id": _id})
+
+    backend.down = True
+    await cached.update_one({"_id": _id}, {"$set": {"name": "second"}})
+    reads = helper.collection.reads
+    assert (await cached.find_one({"_id": _id}))["name"] == "second"
+    assert (await cached.find_one({"_id": _id}))["name"] == "second"
+    assert helper.collection.reads == reads + 2, "reads must skip the cache while the generation is stale"
+
+    backend.down = False
+    assert (await cached.find_one({"_id": _id}))["name"] == "second"
+    assert await cached.find_one({"_id": _id}) is not None
+    assert helper.collection.reads == reads + 3, "cached again once the generation moved"
+
+    # Deleting keys never resets a generation
+    await backend.delete(cached._generation_key)
+    assert await backend.get_counters(cached._generation_key) == [1]
+
+
+async def check_unreachable_server():
+    backend = RedisCacheBackend("redis://127.0.0.1:1/0", timeout=0.2)
+    assert await backend.get("k") is None
+    await backend.set("k", b"v", 60)
+    assert backend.stats()["errors"] == 2
+
+
+def test_memory_backend():
+    print("Testing memory backend...")
+    asyncio.run(check_backend(MemoryCacheBackend()))
+    asyncio.run(check_read_through(MemoryCacheBackend()))
+    asyncio.run(check_failed_invalidation())
+    print("✓ Memory backend works")
+    print("✓ Reads skip the cache until a failed invalidation succeeds")
+
+
+def test_redis_backend():
+    print("Testing Redis-protocol backend against the stand-in...")
+
+    async def run():
+        stand_in = RespStandIn()
+        port = await stand_in.start()
+        backend = RedisCacheBackend(f"redis://127.0.0.1:{port}/0")
+        await check_backend(backend)
+        await check_read_through(backend)
+        # A cached read is one round trip: the generation and the entry in one MGET
+        cached = CachedCollection(FakeHelper([{"_id": 1}]), backend, ttl=60)
+        await cached.find_one({"_id": 1})
+        commands = stand_in.commands
+        await cached.find_one({"_id": 1})
+        assert stand_in.commands == commands + 1
+        # Connections are pooled, not opened per command
+        assert backend.stats()["idle_connections"] == 1
+        await backend.aclose()
+        await asyncio.sleep(0.01)  # Let the stand-in see the disconnect
+        stand_in.server.close()
+
+    asyncio.run(run())
+    asyncio.run(check_unreachable_server())
+    print("✓ Redis-protocol backend works and degrades to misses when the server is down")
+
+
+def test_no_backend():
+    print("Testing pass-through without a backend...")
+
+    async def run():
+        helper = FakeHelper([{"_id": 1}])
+        cached = CachedCollection(helper, None, ttl=60)
+        await cached.find_one({"_id": 1})
+        await cached.find_one({"_id": 1})
+        assert helper.collection.reads == 2
+
+    asyncio.run(run())
+    print("✓ Reads go straight to the collection")
+
+
+def test_shared_version():
+    print("Testing collection versions across worker processes...")
+
+    async def run():
+        await database.connect_to_mongodb()
+        await database.get_collection("collection_versions").delete_many({})
+
+        # One worker: the local version, without a round trip
+        version = CollectionVersion("things", shared=True)
+        operations = database.client.operations
+        await version.bump()
+        assert await version.current() == (1, version.last_modified)
+        assert database.client.operations == operations
+        print("✓ A single worker answers from its local version")
+
+        # Several workers sharing the database only: recorded in MongoDB
+        original, config.worker_processes = config.worker_processes, 2
+        try:
+            first, second = CollectionVersion("things", shared=True), CollectionVersion("things", shared=True)
+            version, _ = await second.current()
+            assert version == 0
+            await first.bump()
+            await first.bump()
+            version, last_modified = await second.current()
+            assert version == 2 and second.local == 0
+            assert last_modified.tzinfo is not None
+        finally:
+            config.worker_processes = original
+        print("✓ Without a shared cache, workers share the version through MongoDB")
+
+        # A shared cache backend: the generation every write increments is the version
+        stand_in = RespStandIn()
+        port = await stand_in.start()
+        workers = []
+        for _ in range(2):
+            helper = FakeHelper([{"_id": 1, "name": "first"}])
+            helper.version.shared = True
+            cached = CachedCollection(helper, RedisCacheBackend(f"redis://127.0.0.1:{port}/0"), ttl=60)
+            helper.version.counter = cached.read_generation
+            workers.append((helper, cached))
+        (first, first_cached), (second, second_cached) = workers
+        assert await second.version.current() == (0, BOOT_TIME)
+        operations = database.client.operations
+        await first_cached.update_one({"_id": 1}, {"$set": {"name": "second"}})
+        commands = stand_in.commands
+        version, last_modified = await second.version.current()
+        assert version == 1 and abs((datetime.now(timezone.utc) - last_modified).total_seconds()) < 5
+        assert stand_in.commands == commands + 1, "one cache round trip per version read"
+        assert database.client.operations == operations, "MongoDB is not touched"
+        for _, cached in workers:
+            await cached.backend.aclose()
+        await asyncio.sleep(0.01)
+        stand_in.server.close()
+        print("✓ With a shared cache, the version is the cache generation: no MongoDB round trips")
+
+        # Unreachable cache server: the version is unknown, never stale
+        helper = FakeHelper([])
+        helper.version.shared = True
+        cached = CachedCollection(helper, RedisCacheBackend("redis://127.0.0.1:1/0", timeout=0.2), ttl=60)
+        helper.version.counter = cached.read_generation
+        assert await helper.version.current() is None
+        await database.close_mongodb()
+
+    asyncio.run(run())
+
+
+def main():
+    print("=" * 60)
+    print("Collection Cache Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_memory_backend()
+        test_redis_backend()
+        test_no_backend()
+        test_shared_version()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
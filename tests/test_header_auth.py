@@ -107,6 +107,45 @@ async def test_header_auth_manager():
     print("✓ HeaderAuthManager structure verified")
 
 
+async def test_identity_cache():
+    """Test identity cache short-circuits repeat header authentication"""
+    print("Testing identity cache...")
+    
+    from app.auth.identity_cache import identity_cache
+    
+    settings = get_settings()
+    saved = (settings.header_auth_enabled, settings.databricks_header_auth)
+    settings.header_auth_enabled = True
+    settings.databricks_header_auth = True
+    identity_cache.clear()
+    
+    manager = HeaderAuthManager()
+    manager._create_or_get_user = AsyncMock(return_value={
+        "id": "user-id-1",
+        "email": "cached@example.com",
+        "name": "cached",
+        "role": "user",
+        "auth_method": "header",
+    })
+    request = MockRequest(headers={"X-Databricks-User-Email": "cached@example.com"})
+    
+    try:
+        first = await manager.resolve_user(request)
+        second = await manager.resolve_user(request)
+        assert first == second
+        assert manager._create_or_get_user.await_count == 1
+        assert identity_cache.stats()["hits"] >= 1
+        print("✓ Repeat request served from identity cache")
+        
+        assert identity_cache.invalidate_user("user-id-1") == 1
+        await manager.resolve_user(request)
+        assert manager._create_or_get_user.await_count == 2
+        print("✓ Invalidation forces a fresh lookup")
+    finally:
+        settings.header_auth_enabled, settings.databricks_header_auth = saved
+        identity_cache.clear()
+
+
 async def test_middleware_integration():
     """Test middleware integration"""
     print("Testing middleware integration...")
@@ -130,6 +169,8 @@ async def main():
         print()
         await test_header_auth_manager()
         print()
+        await test_identity_cache()
+        print()
         await test_middleware_integration()
         print()
         print("🎉 All tests passed!")
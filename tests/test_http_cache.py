@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for conditional GETs of the dashboard and the todo list: repeat
+visits get 304 Not Modified, answered without MongoDB on a single worker,
+and any card write changes the ETag without an extra round trip.
+Runs against the in-memory MongoDB stand-in from benchmarks/.
+Run this with: python tests/test_http_cache.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from benchmarks import mongo_standin
+
+mongo_standin.install()
+
+import httpx
+
+from app.core import config, database
+from app.core.collections import CollectionHelper, todos_collection
+
+
+def test_conditional_gets():
+    print("Testing 304 Not Modified for / and /todos/...")
+
+    import main
+    from app.core.security import create_access_token
+
+    cookies = {"access_token": create_access_token({"sub": "admin", "email": "a@example.com", "name": "A", "role": "admin"})}
+
+    async def run():
+        async with main.app.router.lifespan_context(main.app):
+            # Collections cached from a client another test module connected
+            for helper in CollectionHelper.registry:
+                helper._collection = None
+            await todos_collection.collection.delete_many({})
+            await database.get_collection("collection_versions").delete_many({})
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+                async def get(path: str, etag: str | None = None) -> httpx.Response:
+                    headers = {"If-None-Match": etag} if etag else {}
+                    return await client.get(path, headers=headers, cookies=cookies)
+
+                response = await get("/")
+                assert response.status_code == 200 and response.headers["etag"]
+                repeat = await get("/", response.headers["etag"])
+                assert repeat.status_code == 304 and repeat.content == b""
+                assert repeat.headers["etag"] == response.headers["etag"]
+                print("✓ A repeat dashboard visit is a 304")
+
+                response = await get("/todos/")
+                assert response.status_code == 200 and response.headers["last-modified"]
+                etag = response.headers["etag"]
+                operations = database.client.operations
+                repeat = await get("/todos/", etag)
+                assert repeat.status_code == 304, repeat.status_code
+                assert database.client.operations == operations, "a single worker answers without MongoDB"
+                print("✓ A repeat todo list visit is a 304 without a MongoDB round trip")
+
+                response = await client.post("/todos/save", data={"title": "New"}, cookies=cookies)
+                assert response.status_code == 200
+                response = await get("/todos/", etag)
+                assert response.status_code == 200 and response.headers["etag"] != etag
+                etag = response.headers["etag"]
+                assert (await get("/todos/", etag)).status_code == 304
+                todo_id = str((await todos_collection.collection.find_one({"title": "New"}))["_id"])
+                operations = database.client.operations
+                response = await client.post(f"/todos/{todo_id}/toggle", cookies=cookies)
+                assert response.status_code == 200
+                assert database.client.operations == operations + 1, "writes stay single round trips"
+                assert (await get("/todos/", etag)).status_code == 200
+                print("✓ A card write changes the ETag and costs no extra round trip")
+
+                # Several workers and no shared cache: the version is read from MongoDB
+                original, config.worker_processes = config.worker_processes, 2
+                try:
+                    etag = (await get("/todos/")).headers["etag"]
+                    operations = database.client.operations
+                    assert (await get("/todos/", etag)).status_code == 304
+                    assert database.client.operations == operations + 1
+                    await client.post("/todos/save", data={"title": "Another"}, cookies=cookies)
+                    assert (await get("/todos/", etag)).status_code == 200
+                finally:
+                    config.worker_processes = original
+                print("✓ Several workers without a shared cache: one point read per 304")
+
+    asyncio.run(run())
+
+
+def main():
+    print("=" * 60)
+    print("Conditional GET Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_conditional_gets()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for live todo updates: every card write made through the app
+publishes the matching upsert or delete event to viewers of /todos/events.
+Runs against the in-memory MongoDB stand-in from benchmarks/.
+Run this with: python tests/test_live.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from benchmarks import mongo_standin
+
+mongo_standin.install()
+
+import httpx
+
+from app.core.collections import CollectionHelper, todos_collection
+from app.features.todos.live import TOPIC, broker
+
+
+def _drain(subscription) -> list:
+    return [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+
+
+def test_writes_publish_events():
+    print("Testing events published by card writes...")
+
+    import main
+    from app.core.security import create_access_token
+
+    cookies = {"access_token": create_access_token({"sub": "admin", "email": "a@example.com", "name": "A", "role": "admin"})}
+
+    async def run():
+        async with main.app.router.lifespan_context(main.app):
+            # Collections cached from a client another test module connected
+            for helper in CollectionHelper.registry:
+                helper._collection = None
+            await todos_collection.collection.delete_many({})
+            subscription = broker.subscribe(TOPIC)
+            try:
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+                    response = await client.post("/todos/save", data={"title": "First"}, cookies=cookies)
+                    assert response.status_code == 200, response.text
+                    doc = await todos_collection.collection.find_one({"title": "First"})
+                    todo_id = str(doc["_id"])
+                    events = _drain(subscription)
+                    assert [(e["type"], e["todo"]["_id"], e["todo"]["title"]) for e in events] == [
+                        ("upsert", doc["_id"], "First"),
+                    ], events
+                    print("✓ Creating a card publishes an upsert")
+
+                    response = await client.post("/todos/save", data={"title": "Renamed", "todo_id": todo_id}, cookies=cookies)
+                    assert response.status_code == 200, response.text
+                    events = _drain(subscription)
+                    assert [(e["type"], e["todo"]["title"]) for e in events] == [("upsert", "Renamed")], events
+
+                    response = await client.post(f"/todos/{todo_id}/toggle", cookies=cookies)
+                    assert response.status_code == 200, response.text
+                    events = _drain(subscription)
+                    assert [(e["type"], e["todo"]["completed"]) for e in events] == [("upsert", True)], events
+                    print("✓ Updating and toggling a card publish upserts with the new document")
+
+                    response = await client.delete(f"/todos/{todo_id}", cookies=cookies)
+                    assert response.status_code == 200, response.text
+                    assert _drain(subscription) == [{"type": "delete", "id": todo_id}]
+                    response = await client.delete(f"/todos/{todo_id}", cookies=cookies)
+                    assert _drain(subscription) == []
+                    print("✓ Deleting a card publishes a delete, once")
+            finally:
+                broker.unsubscribe(subscription)
+
+    asyncio.run(run())
+
+
+def main():
+    print("=" * 60)
+    print("Live Todo Update Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_writes_publish_events()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Tests for Prometheus metrics and Server-Timing: exposition format, the
+request middleware, attribution of MongoDB command time to requests, and
+phase timings.
+Run this with: python tests/test_metrics.py
+"""
+
+import asyncio
+import contextvars
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+import httpx
+from fastapi import FastAPI, Request
+
+from app.core import metrics, timing
+from app.core.metrics import MetricsMiddleware, MetricsRegistry, command_metrics
+from app.core.timing import RequestStats, ServerTimingMiddleware, phase
+
+
+def test_exposition_format():
+    print("Testing text exposition...")
+
+    registry = MetricsRegistry()
+    requests = registry.counter("demo_requests_total", "Demo requests")
+    latency = registry.histogram("demo_seconds", "Demo latency", buckets=(0.1, 1.0))
+    requests.inc(route="/a", status=200)
+    requests.inc(2, route="/a", status=200)
+    latency.observe(0.05, route="/a")
+    latency.observe(0.5, route="/a")
+    latency.observe(0.1, route="/a")  # Bucket bounds are inclusive
+    registry.register_stats("demo_cache", lambda: {"hits": 3, "size": 1, "backend": "memory"}, counters=("hits",), cache="x")
+
+    text = registry.render()
+    assert "# TYPE demo_requests_total counter" in text
+    assert 'demo_requests_total{route="/a",status="200"} 3.0' in text
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 2' in text
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 3' in text
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{route="/a"} 3' in text
+    assert 'demo_cache_hits_total{cache="x"} 3' in text
+    assert 'demo_cache_size{cache="x"} 1' in text
+    assert "backend" not in text, "non-numeric stats are skipped"
+    print("✓ Counters, histograms and stats sources render correctly")
+
+
+def test_middleware_and_db_attribution():
+    print("Testing request middleware and per-request DB time...")
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        # What pymongo does from Motor's executor thread, in the request's copied context
+        await asyncio.get_running_loop().run_in_executor(
+            None, contextvars.copy_context().run, command_metrics.succeeded,
+            SimpleNamespace(command_name="find", duration_micros=2500),
+        )
+        return {"id": item_id}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for item_id in ("1", "2", "3"):
+                assert (await client.get(f"/items/{item_id}")).status_code == 200
+            assert (await client.get("/missing")).status_code == 404
+
+    asyncio.run(run())
+    text = metrics.registry.render()
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 3.0' in text
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1.0' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 3' in text
+    assert 'http_request_db_commands_total{route="/items/{item_id}"} 3.0' in text
+    assert 'http_request_db_seconds_sum{route="/items/{item_id}"} 0.0075' in text
+    assert 'mongodb_commands_total{command="find",outcome="succeeded"} 3.0' in text
+    assert 'http_requests_in_progress 0.0' in text
+    print("✓ Requests are labelled by route and charged for their MongoDB time")
+
+
+def test_endpoint_requires_token():
+    print("Testing /metrics authentication...")
+
+    app = FastAPI()
+    app.include_router(metrics.router)
+
+    async def scrape(headers=None):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return (await client.get("/metrics", headers=headers)).status_code
+
+    original = metrics.settings.metrics_token
+    try:
+        metrics.settings.metrics_token = ""
+        assert asyncio.run(scrape()) == 401
+        assert asyncio.run(scrape({"Authorization": "Bearer "})) == 401
+        metrics.settings.metrics_token = "scrape-token"
+        assert asyncio.run(scrape()) == 401
+        assert asyncio.run(scrape({"Authorization": "Bearer wrong"})) == 401
+        assert asyncio.run(scrape({"Authorization": "Bearer scrape-token"})) == 200
+    finally:
+        metrics.settings.metrics_token = original
+    print("✓ Scrapes need the bearer token, and nothing is served without one")
+
+
+def test_server_timing():
+    print("Testing Server-Timing phases...")
+
+    stats = RequestStats()
+    token = timing.current_request.set(stats)
+    try:
+        with phase("render"):
+            time.sleep(0.01)
+            with phase("markdown"):
+                time.sleep(0.02)
+            with phase("render"):
+                time.sleep(0.01)
+    finally:
+        timing.current_request.reset(token)
+    # Nested phases are exclusive: markdown time is not also counted as render
+    assert 0.02 <= stats.phases["markdown"] < 0.03, stats.phases
+    assert 0.02 <= stats.phases["render"] < 0.03, stats.phases
+
+    with phase("render"):
+        pass  # Outside a request: no-op
+
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/page")
+    async def page(request: Request, role: str = "user"):
+        request.state.current_user = {"role": role}
+        with phase("auth"):
+            pass
+        return {}
+
+    async def get(path: str) -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path)
+
+    assert "server-timing" not in asyncio.run(get("/page")).headers
+    header = asyncio.run(get("/page?role=admin")).headers["server-timing"]
+    assert header.startswith("auth;dur=") and ", total;dur=" in header, header
+
+    timing.settings.server_timing = "all"
+    try:
+        assert "server-timing" in asyncio.run(get("/page")).headers
+    finally:
+        timing.settings.server_timing = "admin"
+    print("✓ Phases are exclusive and the header is shown to admins")
+
+
+def main():
+    print("=" * 60)
+    print("Metrics Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_exposition_format()
+        test_middleware_and_db_attribution()
+        test_endpoint_requires_token()
+        test_server_timing()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared OAuth HTTP client against a local stub OAuth server.
+Run this with: python tests/test_oauth_client.py
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.auth.github import GitHubOAuthProvider
+from app.auth.providers import OAuthProviderConfig, OAuthProviderRegistry
+
+
+async def stub_token(request):
+    form = await request.form()
+    assert form["code"] == "test-code"
+    return JSONResponse({"access_token": "stub-access-token", "token_type": "bearer"})
+
+
+async def stub_user(request):
+    assert request.headers["authorization"] == "Bearer stub-access-token"
+    return JSONResponse({"id": 42, "login": "octo", "email": "octo@example.com", "avatar_url": None})
+
+
+class StubOAuthServer:
+    """Local OAuth provider stub served by uvicorn in a background thread"""
+
+    def __init__(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        app = Starlette(routes=[
+            Route("/token", stub_token, methods=["POST"]),
+            Route("/user", stub_user),
+        ])
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.monotonic() + 5
+        while not self.server.started:
+            assert time.monotonic() < deadline, "stub server did not start"
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+
+def test_login_reuses_pooled_connection():
+    """A full login (token exchange + user info) reuses one keep-alive connection"""
+    print("Testing connection reuse against stub OAuth server...")
+    
+    async def run(stub: StubOAuthServer):
+        registry = OAuthProviderRegistry()
+        provider = GitHubOAuthProvider(OAuthProviderConfig(
+            client_id="id",
+            client_secret="secret",
+            authorize_url=stub.url("/authorize"),
+            access_token_url=stub.url("/token"),
+            user_info_url=stub.url("/user"),
+            scope="user:email",
+            timeout=5.0,
+        ))
+        registry.register("github", provider)
+        await registry.startup()
+        try:
+            for _ in range(3):
+                token = await provider.exchange_code_for_token("test-code", stub.url("/callback"))
+                user = await provider.get_user_info(token["access_token"])
+                assert user == {"id": "42", "email": "octo@example.com", "name": "octo", "avatar_url": None}
+        finally:
+            await registry.aclose()
+        return registry.connection_stats()
+    
+    with StubOAuthServer() as stub:
+        stats = asyncio.run(run(stub))
+    
+    assert stats == {"requests": 6, "connections_opened": 1, "connections_reused": 5}, stats
+    print("✓ 3 logins used 1 connection for 6 requests")
+
+
+def test_client_requires_startup():
+    """Providers fail loudly if the shared client was never started"""
+    print("Testing client lifecycle...")
+    
+    registry = OAuthProviderRegistry()
+    try:
+        registry.http_client
+    except RuntimeError:
+        print("✓ Unstarted client raises")
+        return
+    raise AssertionError("http_client should raise before startup()")
+
+
+def main():
+    """Run all tests"""
+    print("Starting OAuth client tests...\n")
+    
+    try:
+        test_login_reuses_pooled_connection()
+        print()
+        test_client_requires_startup()
+        print()
+        print("🎉 All tests passed!")
+        
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Tests for fractional todo ranks, paging past unranked cards and the
+background rebalance (against the in-memory MongoDB stand-in from benchmarks/).
+Run this with: python tests/test_ranking.py
+"""
+
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from benchmarks import mongo_standin
+
+mongo_standin.install()
+
+from bson import ObjectId
+
+from app.core import database
+from app.core.collections import todos_collection
+from app.core.leases import acquire_lease, release_lease
+from app.core.pagination import keyset_filter
+from app.features.todos import ranking
+from app.features.todos.ranking import DIGITS, rank_between, spread_ranks
+
+
+def test_rank_between_random_inserts():
+    """Random insertions always produce a rank strictly between the neighbours"""
+    print("Testing random insertions...")
+    
+    rng = random.Random(42)
+    ranks: list[str] = []
+    for _ in range(2000):
+        i = rng.randint(0, len(ranks))
+        before = ranks[i - 1] if i > 0 else None
+        after = ranks[i] if i < len(ranks) else None
+        rank = rank_between(before, after)
+        assert before is None or before < rank
+        assert after is None or rank < after
+        assert not rank.endswith(DIGITS[0])
+        ranks.insert(i, rank)
+    
+    assert ranks == sorted(ranks)
+    print("✓ 2000 random insertions stay ordered")
+
+
+def test_rank_between_rejects_out_of_order():
+    """Neighbours in the wrong order are rejected"""
+    print("Testing out-of-order neighbours...")
+    
+    for before, after in (("b", "a"), ("V", "V")):
+        try:
+            rank_between(before, after)
+        except ValueError:
+            continue
+        raise AssertionError(f"rank_between({before!r}, {after!r}) should fail")
+    print("✓ Out-of-order neighbours rejected")
+
+
+def test_spread_ranks():
+    """Rebalanced ranks are distinct, ordered and leave room between neighbours"""
+    print("Testing spread ranks...")
+    
+    for count in (0, 1, 61, 62, 1000):
+        ranks = spread_ranks(count)
+        assert len(ranks) == count
+        assert ranks == sorted(set(ranks))
+        for before, after in zip(ranks, ranks[1:]):
+            assert len(rank_between(before, after)) <= len(max(before, after, key=len)) + 1
+    print("✓ Spread ranks are ordered with room to insert")
+
+
+async def _reset_cards(ranks: list) -> list[ObjectId]:
+    """Fresh todos with the given ranks (None: a legacy card without one); returns their ids"""
+    await database.connect_to_mongodb()
+    collection = todos_collection.collection
+    await collection.delete_many({})
+    ids = []
+    for i, rank in enumerate(ranks):
+        doc = {"_id": ObjectId(), "title": f"Card {i}", "order": i}
+        if rank is not None:
+            doc["rank"] = rank
+        await collection.insert_one(doc)
+        ids.append(doc["_id"])
+    return ids
+
+
+async def _board() -> list[ObjectId]:
+    cursor = todos_collection.collection.find({}).sort([("rank", 1), ("_id", 1)])
+    return [doc["_id"] async for doc in cursor]
+
+
+def test_pages_past_unranked_cards():
+    """A page ending on a card without a rank continues with the ranked cards"""
+    print("Testing keyset pages over unranked cards...")
+
+    async def run():
+        await _reset_cards([None, None, None, "V", "a", "b", "c"])
+        board = await _board()
+        seen, query = [], {}
+        while True:
+            cursor = todos_collection.collection.find(query).sort([("rank", 1), ("_id", 1)]).limit(2)
+            page = [doc async for doc in cursor]
+            if not page:
+                break
+            seen += [doc["_id"] for doc in page]
+            query = keyset_filter("rank", page[-1].get("rank"), page[-1]["_id"])
+        assert seen == board, "pages skipped or repeated cards"
+        await database.close_mongodb()
+
+    asyncio.run(run())
+    print("✓ Every card is paged exactly once, unranked cards first")
+
+
+def test_move_after_last_loaded_card():
+    """Dropped after the last loaded card, a card goes before the first card not loaded yet"""
+    print("Testing a move past the loaded pages...")
+
+    from app.features.todos.router import move_todo
+
+    async def run():
+        ids = await _reset_cards(["V", "W", "X", "Y"])
+        # Only cards 0 and 3 are loaded: card 3 is dropped below card 0, with nothing after it
+        await move_todo(None, str(ids[3]), before_id=str(ids[0]), after_id="", user={"role": "admin"})
+        assert await _board() == [ids[0], ids[3], ids[1], ids[2]], "card jumped past unloaded cards"
+        # The real last card still goes to the end
+        await move_todo(None, str(ids[0]), before_id=str(ids[2]), after_id="", user={"role": "admin"})
+        assert await _board() == [ids[3], ids[1], ids[2], ids[0]]
+        await database.close_mongodb()
+
+    asyncio.run(run())
+    print("✓ The card is ranked between its neighbour and the next card in the database")
+
+
+def test_rebalance_keeps_concurrent_moves():
+    """A move landing during a rebalance is not overwritten by it"""
+    print("Testing a move racing the rebalance...")
+
+    async def run():
+        ids = await _reset_cards(["V" * 20, "W" * 20, None, "X" * 20, "Y" * 20])
+        original = todos_collection.cached.bulk_write
+        moved = []
+
+        async def racing(requests, **kwargs):
+            if not moved:
+                # Card 4 is moved to the top between the rebalance's read and its writes
+                await todos_collection.collection.update_one({"_id": ids[4]}, {"$set": {"rank": "01"}})
+                moved.append(ids[4])
+            return await original(requests, **kwargs)
+
+        todos_collection.cached.bulk_write = racing
+        try:
+            assert await ranking.rebalance_ranks() > 0
+        finally:
+            del todos_collection.cached.bulk_write
+        board = await _board()
+        assert board == [ids[4], ids[2], ids[0], ids[1], ids[3]], board
+        docs = await todos_collection.collection.find({}).to_list(None)
+        assert all(len(doc["rank"]) <= 2 for doc in docs), "ranks were not rewritten evenly"
+        await database.close_mongodb()
+
+    asyncio.run(run())
+    print("✓ The moved card keeps its place and ranks are spread again")
+
+
+def test_rebalanced_cards_rerender():
+    """Cached card fragments carry data-rank, which the rebalance changes without touching updated_at"""
+    print("Testing card fragments after a rebalance...")
+
+    from app.features.todos.router import render_card
+
+    async def run():
+        await _reset_cards(["V" * 20, "W" * 20])
+        for doc in await todos_collection.collection.find({}).to_list(None):
+            await render_card(doc, False)
+        assert await ranking.rebalance_ranks() == 2
+        for doc in await todos_collection.collection.find({}).to_list(None):
+            assert f'data-rank="{doc["rank"]}"' in await render_card(doc, False)
+        await database.close_mongodb()
+
+    asyncio.run(run())
+    print("✓ Rebalanced cards render with their new rank")
+
+
+def test_rebalance_lease():
+    """Only one worker rebalances at a time"""
+    print("Testing the rebalance lease...")
+
+    async def run():
+        await _reset_cards(["V" * 20, "W" * 20])
+        owner = await acquire_lease(ranking.REBALANCE_LEASE, 60)
+        assert owner and await acquire_lease(ranking.REBALANCE_LEASE, 60) is None
+        assert await ranking.rebalance_ranks() == 0, "rebalanced while another worker held the lease"
+        await release_lease(ranking.REBALANCE_LEASE, owner)
+        assert await ranking.rebalance_ranks() == 2
+        # Released again after the run; an expired lease can be taken over
+        owner = await acquire_lease(ranking.REBALANCE_LEASE, 0)
+        assert owner and await acquire_lease(ranking.REBALANCE_LEASE, 60) is not None
+        await database.close_mongodb()
+
+    asyncio.run(run())
+    print("✓ A held lease skips the rebalance; released and expired leases are taken")
+
+
+def main():
+    """Run all tests"""
+    print("Starting ranking tests...\n")
+    
+    try:
+        test_rank_between_random_inserts()
+        print()
+        test_rank_between_rejects_out_of_order()
+        print()
+        test_spread_ranks()
+        print()
+        test_pages_past_unranked_cards()
+        print()
+        test_move_after_last_loaded_card()
+        print()
+        test_rebalance_keeps_concurrent_moves()
+        print()
+        test_rebalanced_cards_rerender()
+        print()
+        test_rebalance_lease()
+        print()
+        print("🎉 All tests passed!")
+        
+    except Exception as e:
+        print(f"❌ Test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
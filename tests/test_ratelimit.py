@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Tests for rate limiting and overload shedding: token buckets, per-user and
+per-IP keys, the in-flight cap, event-loop lag and the exported counters.
+Run this with: python tests/test_ratelimit.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.auth import middleware as auth_middleware
+from app.core import config
+from app.core.metrics import registry
+from app.core.ratelimit import RateLimitMiddleware, TokenBucket, rate_limit_stats
+from app.core.security import create_access_token
+
+
+def test_token_bucket():
+    print("Testing token buckets...")
+
+    buckets = TokenBucket(rate=10, burst=3, max_keys=100)
+    assert [buckets.acquire("a") for _ in range(3)] == [0, 0, 0]
+    wait = buckets.acquire("a")
+    assert 0.09 < wait <= 0.1, wait
+    assert buckets.acquire("b") == 0
+    time.sleep(0.11)
+    assert buckets.acquire("a") == 0 and buckets.acquire("a") > 0
+    print("✓ Bursts allowed, then one token per 1/rate seconds, per key")
+
+    time.sleep(0.31)  # burst / rate: the bucket has expired, as it would be full again
+    assert [buckets.acquire("a") for _ in range(4)][:3] == [0, 0, 0]
+    print("✓ Idle buckets refill completely")
+
+
+def _app(**options) -> tuple[FastAPI, RateLimitMiddleware]:
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work(request: Request, seconds: float = 0):
+        await asyncio.sleep(seconds)
+        user = await auth_middleware.get_current_user(request)
+        return {"user": user and user["id"]}
+
+    @app.get("/events")
+    async def events():
+        async def stream():
+            yield "data: hello\n\n"
+            await asyncio.sleep(0.5)
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/static/file")
+    async def static_file():
+        return {}
+
+    @app.get("/staticfoo")
+    async def not_static():
+        return {}
+
+    app.add_middleware(RateLimitMiddleware, **options)
+    app.middleware_stack = app.build_middleware_stack()
+    limiter = app.middleware_stack
+    while not isinstance(limiter, RateLimitMiddleware):
+        limiter = limiter.app
+    return app, limiter
+
+
+def _cookies(user_id: str) -> dict:
+    return {"access_token": create_access_token({"sub": user_id, "email": f"{user_id}@example.com", "name": user_id})}
+
+
+def test_throttling():
+    print("Testing per-user throttling...")
+
+    app, limiter = _app(rate=1, burst=2, exempt_paths=("/static",))
+    resolved = []
+    original = auth_middleware._resolve_current_user
+
+    async def counting_resolve(request):
+        resolved.append(request.url.path)
+        return await original(request)
+
+    auth_middleware._resolve_current_user = counting_resolve
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            alice = [await client.get("/work", cookies=_cookies("alice")) for _ in range(3)]
+            assert [r.status_code for r in alice] == [200, 200, 429]
+            assert alice[0].json() == {"user": "alice"}
+            assert alice[2].headers["retry-after"] == "1"
+            assert len(resolved) == 3, "user resolved again by the handler"
+
+            # Other users and anonymous clients (keyed by IP) have their own buckets
+            assert (await client.get("/work", cookies=_cookies("bob"))).status_code == 200
+            anonymous = [(await client.get("/work")).status_code for _ in range(3)]
+            assert anonymous == [200, 200, 429], anonymous
+            assert [(await client.get("/static/file")).status_code for _ in range(5)] == [200] * 5
+            # Exempt on whole path segments only
+            assert (await client.get("/staticfoo")).status_code == 429
+
+    try:
+        asyncio.run(run())
+    finally:
+        auth_middleware._resolve_current_user = original
+    assert limiter.stats()["throttled"] == 3
+    print("✓ Buckets per user id, anonymous clients by IP, exempt paths untouched")
+    print("✓ 429 with Retry-After; the user is resolved once per request")
+
+
+def test_worker_share():
+    print("Testing limits split over worker processes...")
+
+    _, limiter = _app(rate=10, burst=40)
+    assert limiter.workers == 1 and (limiter.buckets.rate, limiter.buckets.burst) == (10, 40)
+    _, limiter = _app(rate=10, burst=5, workers=4)
+    assert (limiter.buckets.rate, limiter.buckets.burst) == (2.5, 2)
+
+    original, config.worker_processes = config.worker_processes, 8
+    try:
+        _, limiter = _app(rate=10, burst=40)
+    finally:
+        config.worker_processes = original
+    assert (limiter.buckets.rate, limiter.buckets.burst) == (1.25, 5)
+    print("✓ Each of N workers gets 1/N of the rate and burst")
+
+
+def test_shedding():
+    print("Testing overload shedding...")
+
+    app, limiter = _app(rate=0, max_in_flight=2, max_loop_lag=0.1)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(client.get("/work", params={"seconds": 0.2}) for _ in range(4)))
+            statuses = sorted(r.status_code for r in responses)
+            assert statuses == [200, 200, 503, 503], statuses
+            shed = next(r for r in responses if r.status_code == 503)
+            assert shed.headers["retry-after"] == "1"
+            assert limiter.in_flight == 0
+
+            # Open event streams don't count towards the cap
+            async with client.stream("GET", "/events") as stream_a, client.stream("GET", "/events") as stream_b:
+                assert (await client.get("/work")).status_code == 200
+                await stream_a.aread()
+                await stream_b.aread()
+
+            # Requests arriving while the loop is behind are shed
+            lag = limiter.loop_lag
+            time.sleep(0.3)
+            assert lag.current() > 0.1
+            assert (await client.get("/work")).status_code == 503
+            await asyncio.sleep(0.05)  # The overdue measurement runs
+            assert lag.current() < 0.1 and lag.seconds > 0.1
+            assert (await client.get("/work")).status_code == 200
+
+    asyncio.run(run())
+    assert limiter.stats()["shed"] == 3
+    print("✓ 503 with Retry-After past the in-flight cap; event streams not counted")
+    print("✓ Requests shed while the event loop lags")
+
+
+def test_metrics():
+    print("Testing exported counters...")
+
+    stats = rate_limit_stats()
+    assert stats["throttled"] >= 2 and stats["shed"] >= 3
+    text = registry.render()
+    assert "# TYPE app_rate_limit_throttled_total counter" in text
+    assert "# TYPE app_rate_limit_shed_total counter" in text
+    assert "app_rate_limit_in_flight " in text
+    print("✓ Throttled and shed requests exported as counters")
+
+
+def main():
+    print("=" * 60)
+    print("Rate Limit Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_token_bucket()
+        test_throttling()
+        test_worker_share()
+        test_shedding()
+        test_metrics()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
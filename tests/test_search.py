@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Tests for todo search: tokenizing and ranking in the in-process index,
+falling back from $text, the recent-query cache, and the search endpoint.
+Runs against the in-memory MongoDB stand-in from benchmarks/.
+Run this with: python tests/test_search.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from benchmarks import mongo_standin
+
+mongo_standin.install()
+
+import httpx
+
+from app.core.collections import todos_collection
+from app.core.database import close_mongodb, connect_to_mongodb
+from app.features.todos.search import InvertedIndex, TodoSearch, tokenize
+
+DOCS = [
+    {"_id": 1, "rank": "a", "title": "Buy groceries", "description": "milk and eggs", "content": None},
+    {"_id": 2, "rank": "b", "title": "Fix bike", "description": None, "content": "Needs new brakes. Buy brake pads."},
+    {"_id": 3, "rank": "c", "title": "Plan trip", "description": "Book train", "content": "Pack milk for the road"},
+]
+
+
+def test_inverted_index():
+    print("Testing the in-process index...")
+
+    assert tokenize("Buy **groceries**, NOW!") == ["buy", "groceries", "now"]
+    assert tokenize(None) == []
+
+    index = InvertedIndex(DOCS)
+    assert [doc["_id"] for doc in index.search(["groceries"], 10)] == [1]
+    # Title matches outrank content matches
+    assert [doc["_id"] for doc in index.search(["buy"], 10)] == [1, 2]
+    # Description outranks content; ties keep card order
+    assert [doc["_id"] for doc in index.search(["milk"], 10)] == [1, 3]
+    # Any term matches; more matching terms rank higher
+    assert [doc["_id"] for doc in index.search(["milk", "trip"], 10)] == [3, 1]
+    assert index.search(["nothing"], 10) == []
+    assert len(index.search(["buy", "milk", "bike"], 2)) == 2
+    print("✓ Weighted ranking over title, description and content")
+
+
+async def _seed():
+    await todos_collection.collection.delete_many({})
+    for doc in DOCS:
+        await todos_collection.cached.insert_one(dict(doc))
+
+
+def test_fallback_and_cache():
+    print("Testing $text fallback and the query cache...")
+
+    async def run():
+        await connect_to_mongodb()
+        await _seed()
+        search = TodoSearch("auto", limit=10, cache_size=16, ttl=60)
+
+        # The stand-in rejects $text like a deployment without text indexes
+        assert [doc["_id"] for doc in await search.search("Buy")] == [1, 2]
+        assert search.backend == "memory"
+        assert search.index_builds == 1
+        print("✓ Falls back to the in-process index when $text is unavailable")
+
+        await search.search("buy")
+        await search.search("  BUY ")
+        assert search.queries == 1, search.queries
+        assert await search.search("  ") == []
+        print("✓ Equivalent queries are answered from the cache")
+
+        await todos_collection.cached.insert_one({"_id": 4, "rank": "d", "title": "Buy a bike"})
+        assert [doc["_id"] for doc in await search.search("buy")] == [1, 4, 2]
+        assert search.queries == 2 and search.index_builds == 2
+        print("✓ Writes invalidate cached results and rebuild the index")
+
+        strict = TodoSearch("text", limit=10, cache_size=16, ttl=60)
+        try:
+            await strict.search("buy")
+            raise AssertionError("text backend should not fall back")
+        except mongo_standin.OperationFailure:
+            pass
+        print("✓ The text backend reports $text errors instead of falling back")
+        await close_mongodb()
+
+    asyncio.run(run())
+
+
+def test_search_endpoint():
+    print("Testing GET /todos/search...")
+
+    import main
+    from app.core.security import create_access_token
+
+    async def run():
+        cookies = {"access_token": create_access_token({"sub": "u", "email": "u@example.com", "name": "U", "role": "user"})}
+        async with main.app.router.lifespan_context(main.app):
+            await _seed()
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+                response = await client.get("/todos/search", params={"q": "milk"}, cookies=cookies)
+                assert response.status_code == 200
+                html = response.text
+                assert html.index('data-id="1"') < html.index('data-id="3"'), "results not ranked"
+                assert 'data-id="2"' not in html
+
+                response = await client.get("/todos/search", params={"q": "zebra"}, cookies=cookies)
+                assert 'No tasks match "zebra"' in response.text
+
+                # Clearing the search restores the first page in card order
+                response = await client.get("/todos/search", params={"q": ""}, cookies=cookies)
+                html = response.text
+                assert html.index('data-id="1"') < html.index('data-id="2"') < html.index('data-id="3"')
+
+                response = await client.get("/todos/search", params={"q": "milk"})
+                assert response.status_code == 401
+
+            indexes = await todos_collection.collection.index_information()
+            assert "todo_search" in indexes, "text index not declared"
+
+    asyncio.run(run())
+    print("✓ Ranked card fragments, empty state, first page and auth")
+
+
+def main():
+    print("=" * 60)
+    print("Search Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_inverted_index()
+        test_fallback_and_cache()
+        test_search_endpoint()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
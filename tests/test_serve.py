@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tests for the production launcher: binding, uvicorn settings, prefork
+workers, recycling after a request limit, failed startups and shutdown.
+The workers serve a small ASGI app in a subprocess.
+Run this with: python tests/test_serve.py
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+import httpx
+
+from app.core.config import Settings
+from app.serve import bind_socket, server_config, worker_count
+
+SERVER = """
+import logging, os, sys
+from app.core import config
+from app.core.config import Settings
+from app.serve import serve
+
+logging.basicConfig(level=logging.INFO)
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        message = await receive()
+        if os.environ.get("FAIL_STARTUP"):
+            await send({"type": "lifespan.startup.failed", "message": "no database"})
+            return
+        await send({"type": "lifespan.startup.complete"})
+        await receive()
+        await send({"type": "lifespan.shutdown.complete"})
+        return
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": f"{os.getpid()} {config.worker_processes}".encode()})
+
+sys.exit(serve(app, Settings(
+    server_bind=sys.argv[1], server_workers=2, server_max_requests=3, server_max_requests_jitter=0,
+    server_graceful_timeout_seconds=2,
+)))
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start(bind: str, **env) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-c", SERVER, bind], cwd=ROOT, env={**os.environ, "PYTHONPATH": ROOT, **env},
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+
+
+def test_settings():
+    print("Testing binding and uvicorn settings...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "app.sock")
+        sock = bind_socket(f"unix:{path}", 16)
+        assert sock.family == socket.AF_UNIX and os.path.exists(path)
+        sock.close()
+        # A socket file left behind is replaced
+        bind_socket(f"unix:{path}", 16).close()
+    sock = bind_socket("127.0.0.1:0", 16)
+    assert sock.family == socket.AF_INET and sock.get_inheritable()
+    sock.close()
+    print("✓ TCP and unix sockets bound before forking")
+
+    settings = Settings(server_workers=0, server_max_requests=0, server_keepalive_seconds=7)
+    assert worker_count(settings) == (os.cpu_count() or 1)
+    config = server_config(lambda scope, receive, send: None, settings)
+    assert config.limit_max_requests is None and config.timeout_keep_alive == 7
+    config.load()
+    assert config.http_protocol_class.__name__ == "HttpToolsProtocol"
+    print("✓ Worker count defaults to the CPUs; httptools used when installed")
+
+
+def test_workers_recycle():
+    print("Testing prefork workers...")
+
+    port = free_port()
+    server = start(f"127.0.0.1:{port}")
+    try:
+        pids = []
+        deadline = time.monotonic() + 20
+        while len(pids) < 16 and time.monotonic() < deadline:
+            try:
+                # A new connection per request, so requests spread over the workers
+                response = httpx.get(f"http://127.0.0.1:{port}/", headers={"Connection": "close"}, timeout=5)
+                pid, workers = map(int, response.text.split())
+                assert workers == 2, "worker count not visible to the workers"
+                pids.append(pid)
+            except httpx.TransportError:
+                pass
+            # uvicorn checks the request limit every 0.1s
+            time.sleep(0.12)
+        assert len(pids) == 16, f"server answered {len(pids)} requests"
+        # Workers are replaced after 3 (at most 4) requests each
+        assert len(set(pids)) >= 4 and max(pids.count(pid) for pid in pids) <= 4, pids
+        assert server.pid not in pids
+        print(f"✓ {len(set(pids))} worker processes served 16 requests, recycled after 3 each")
+
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=15) == 0
+        output = server.stdout.read()
+        assert "recycled" in output and "Finished server process" in output, output
+        print("✓ SIGTERM stops the workers gracefully")
+
+        server = start(f"127.0.0.1:{port}")
+        time.sleep(2)
+        server.kill()
+        server.wait()
+        time.sleep(2)
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=2)
+            raise AssertionError("workers kept serving after the parent was killed")
+        except httpx.TransportError:
+            pass
+        print("✓ Workers exit when the parent is killed")
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
+
+
+def test_startup_failure():
+    print("Testing a failed startup...")
+
+    server = start(f"127.0.0.1:{free_port()}", FAIL_STARTUP="1")
+    try:
+        assert server.wait(timeout=15) == 3
+        assert "failed to start" in server.stdout.read()
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
+    print("✓ Workers whose lifespan fails stop the server instead of respawning")
+
+
+def main():
+    print("=" * 60)
+    print("Server Launcher Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_settings()
+        test_workers_recycle()
+        test_startup_failure()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests for fast-start mode: the import time budget, deferred imports of
+OAuth providers, markdown and feature routers, loading a feature on
+its first request, and the dev-mode feature watcher.
+Run this with: python tests/test_startup.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from app.core.startup import import_times
+
+FAST_START_ENV = {
+    "FAST_START": "true",
+    "SERVER_TIMING": "off",
+    "GITHUB_CLIENT_ID": "id",
+    "GITHUB_CLIENT_SECRET": "secret",
+}
+
+# Runs in a fresh interpreter so sys.modules shows exactly what startup imported
+LAZY_SCRIPT = """
+import asyncio, json, sys
+from benchmarks import mongo_standin
+mongo_standin.install()
+
+import httpx
+import main
+from app.core import startup
+from app.core.security import create_access_token
+
+DEFERRED = ("markdown", "app.auth.github", "app.features.todos.router")
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        after_ready = [name for name in DEFERRED if name in sys.modules]
+        providers = main.oauth_registry.list_providers()
+        cookies = {"access_token": create_access_token({"sub": "admin", "email": "a@example.com", "name": "A", "role": "admin"})}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            response = await client.get("/todos/", cookies=cookies)
+        return {
+            "after_ready": after_ready,
+            "providers": providers,
+            "status": response.status_code,
+            "router_loaded": "app.features.todos.router" in sys.modules,
+            "report": startup.report(),
+        }
+
+print(json.dumps(asyncio.run(run())))
+"""
+
+
+def test_import_budget():
+    print("Testing import time budget...")
+
+    from app.core.config import get_settings
+
+    budget = get_settings().startup_budget_seconds
+    times = import_times(env=FAST_START_ENV)
+    total = next(seconds for name, depth, seconds in times if name == "main" and depth == 0)
+    imported = {name for name, _, _ in times}
+    assert total <= budget, f"import main took {total:.3f}s, budget {budget}s"
+    assert "markdown" not in imported, "markdown imported by main under fast start"
+    assert "app.auth.github" not in imported, "OAuth providers imported by main"
+    assert "uvicorn" not in imported, "the production launcher's server imported by main"
+    print(f"✓ import main: {total * 1000:.0f} ms (budget {budget * 1000:.0f} ms)")
+
+
+def test_lazy_startup():
+    print("Testing deferred imports and first-request feature loading...")
+
+    result = subprocess.run(
+        [sys.executable, "-c", LAZY_SCRIPT],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        env={**os.environ, **FAST_START_ENV, "PYTHONPATH": ROOT},
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    data = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert data["after_ready"] == [], f"imported before first use: {data['after_ready']}"
+    assert "github" in data["providers"], "lazy provider not listed"
+    print("✓ markdown, OAuth providers and feature routers not imported at startup")
+
+    assert data["status"] == 200, f"GET /todos/ returned {data['status']}"
+    assert data["router_loaded"], "todos router not loaded by its first request"
+    print("✓ Feature router loaded and served on first request")
+
+    report = data["report"]
+    assert set(report) == {"imported", "ready", "first_request"}, report
+    assert report["imported"] <= report["ready"] <= report["first_request"], report
+    print(f"✓ Startup milestones: {report}")
+
+
+def test_feature_watch():
+    print("Testing the feature watcher...")
+
+    import asyncio
+    from dataclasses import replace
+    from fastapi import FastAPI
+    from app.core.features import FeatureRegistry
+
+    async def run():
+        registry, app = FeatureRegistry(), FastAPI()
+        registry.build()
+        registry.mount(app)
+        module = sys.modules["app.features.todos.router"]
+        router, routes = module.router, list(app.routes)
+
+        # As if a feature source file had changed
+        registry._snapshot = replace(registry.snapshot, fingerprint=())
+        watcher = asyncio.create_task(registry.watch(app, interval=0))
+        while registry.snapshot.fingerprint == ():
+            await asyncio.sleep(0.01)
+        watcher.cancel()
+
+        assert module.router is router, "loaded feature re-imported"
+        assert list(app.routes) == routes
+        todos = next(feature for feature in registry.features if feature.url == "/todos")
+        assert todos.router is router, "snapshot holds a router the app doesn't serve"
+
+    asyncio.run(run())
+    print("✓ Changes rebuild the snapshot without re-importing loaded features")
+
+
+def main():
+    print("=" * 60)
+    print("Startup Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_import_budget()
+        test_lazy_startup()
+        test_feature_watch()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared async Jinja environment: bytecode caching,
+precompiling, macros and streamed page rendering.
+Run this with: python tests/test_templates.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+import httpx
+import jinja2
+from fastapi import FastAPI, Request
+
+from app.core import templates as templates_module
+from app.core.templates import RENDER_ERROR_MARKER, _chunks, environment, precompile, stream_errors, templates
+from app.core.timing import RequestStats, current_request
+
+
+def test_shared_environment():
+    print("Testing the shared environment...")
+
+    import main
+    from app.features.todos import router as todos_router
+
+    assert main.templates is templates and todos_router.templates is templates
+    assert environment.is_async
+    assert "todo_card" in environment.globals and "asset_url" in environment.globals
+    print("✓ main.py and the todos feature render through one async environment")
+
+    # A fresh bytecode cache and no compiled templates in memory, whatever ran before in this process
+    original = environment.bytecode_cache
+    with tempfile.TemporaryDirectory() as bytecode_dir:
+        environment.bytecode_cache = jinja2.FileSystemBytecodeCache(bytecode_dir)
+        environment.cache.clear()
+        try:
+            count = precompile()
+            assert count == len(environment.list_templates(extensions=["html"])) and count >= 5
+            assert len(os.listdir(bytecode_dir)) == count, os.listdir(bytecode_dir)
+        finally:
+            environment.bytecode_cache = original
+            environment.cache.clear()
+    print(f"✓ {count} templates precompiled and written to the bytecode cache")
+
+
+def test_macro_and_stream():
+    print("Testing macros and streamed rendering...")
+
+    async def run():
+        todo_card = await templates.macro("todos/_card.html", "todo_card")
+        assert todo_card is not None
+        assert await templates.macro("todos/_card.html", "todo_card") is not None
+        html = await todo_card({"_id": "abc", "title": "<b>Escaped</b>", "column_width": 12, "html": ""}, False)
+        assert 'data-id="abc"' in html and "&lt;b&gt;Escaped&lt;/b&gt;" in html
+
+        app = FastAPI()
+
+        @app.get("/page")
+        async def page(request: Request):
+            return templates.stream("landing.html", {"request": request, "providers": [], "user": None})
+
+        @app.get("/buffered")
+        async def buffered(request: Request):
+            return await templates.render("landing.html", {"request": request, "providers": [], "user": None})
+
+        # Called directly: httpx's ASGI transport would buffer the body
+        messages = []
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/page", "raw_path": b"/page", "query_string": b"",
+            "root_path": "", "scheme": "http", "server": ("test", 80), "client": ("127.0.0.1", 1),
+            "headers": [], "http_version": "1.1",
+        }
+        original = templates_module.settings
+        templates_module.settings = original.model_copy(update={"template_stream_chunk_size": 1024})
+        try:
+            await app(scope, receive, send)
+        finally:
+            templates_module.settings = original
+        disconnected.set()
+        headers = dict(messages[0]["headers"])
+        assert headers[b"content-type"] == b"text/html; charset=utf-8" and b"content-length" not in headers
+        chunks = [message["body"] for message in messages[1:] if message["body"]]
+        assert len(chunks) > 1, "page was not streamed"
+        assert chunks[0].startswith(b"<!DOCTYPE html>") and b"</html>" not in chunks[0]
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            assert b"".join(chunks) == (await client.get("/buffered")).content
+        return len(chunks)
+
+    chunks = asyncio.run(run())
+    print("✓ Card macro renders escaped HTML from the cached module")
+    print(f"✓ Streamed page matches the buffered render, sent in {chunks} chunks")
+
+
+def test_stream_timing_and_failure():
+    print("Testing render timing and failures of streamed pages...")
+
+    def fail():
+        raise RuntimeError("broken template")
+
+    async def collect(template, context) -> tuple[list[str], RequestStats]:
+        stats = RequestStats()
+        token = current_request.set(stats)
+        try:
+            return [chunk async for chunk in _chunks(template, context, 16)], stats
+        finally:
+            current_request.reset(token)
+
+    async def run():
+        template = environment.from_string("{% for i in range(50) %}<p>{{ i }}</p>{% endfor %}{{ fail() }}")
+        errors = stream_errors.samples()
+        chunks, stats = await collect(template, {"fail": fail})
+        assert chunks[0].startswith("<p>0</p>") and chunks[-1] == RENDER_ERROR_MARKER
+        assert stream_errors.samples() != errors
+        assert stats.phases["render"] > 0
+
+        chunks, stats = await collect(environment.from_string("{{ 'ok' }}"), {})
+        assert chunks == ["ok"] and "render" in stats.phases
+
+    asyncio.run(run())
+    print("✓ Streamed rendering is charged to the render phase")
+    print("✓ A failing streamed render is logged and ends with an error marker")
+
+
+def main():
+    print("=" * 60)
+    print("Template Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_shared_environment()
+        test_macro_and_stream()
+        test_stream_timing_and_failure()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
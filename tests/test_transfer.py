@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Tests for NDJSON export and import of todos: splitting streamed uploads
+into lines, validating cards, the export/import round trip and per-line
+error reports.
+Runs against the in-memory MongoDB stand-in from benchmarks/.
+Run this with: python tests/test_transfer.py
+"""
+
+import asyncio
+from datetime import datetime, timezone
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from benchmarks import mongo_standin
+
+mongo_standin.install()
+
+import httpx
+from bson import ObjectId
+
+from app.core.collections import todos_collection
+from app.features.todos import transfer
+from app.features.todos.live import TOPIC, broker
+from app.features.todos.transfer import parse_line, read_lines
+
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+async def _lines(*parts: bytes) -> list:
+    return [item async for item in read_lines(_chunks(*parts))]
+
+
+def test_read_lines():
+    print("Testing line splitting...")
+
+    async def run():
+        assert await _lines(b'{"a"', b': 1}\n\n{"b": 2}\r\n', b'{"c": 3}') == [
+            (1, b'{"a": 1}'), (3, b'{"b": 2}'), (4, b'{"c": 3}'),
+        ]
+        original, transfer.MAX_LINE_BYTES = transfer.MAX_LINE_BYTES, 8
+        try:
+            assert await _lines(b'{"x": 1}\n{"long', b'_value": 1', b'2345}\n{"y": 2}\n') == [
+                (1, b'{"x": 1}'), (2, None), (3, b'{"y": 2}'),
+            ]
+        finally:
+            transfer.MAX_LINE_BYTES = original
+
+    asyncio.run(run())
+    print("✓ Lines split across chunks, blank lines skipped, oversized lines reported")
+
+
+def test_parse_line():
+    print("Testing card validation...")
+
+    _id = ObjectId()
+    card = parse_line(json.dumps({
+        "_id": {"$oid": str(_id)}, "title": "Backup", "content": "**bold**",
+        "html": "<script>alert(1)</script>", "rank": "V", "updated_at": {"$date": "2024-01-01T00:00:00Z"},
+    }).encode())
+    assert card["_id"] == _id and card["rank"] == "V"
+    assert card["html"] == "<p><strong>bold</strong></p>" and card["content_hash"]
+    assert card["updated_at"] > datetime(2025, 1, 1, tzinfo=timezone.utc), "cached card HTML is keyed on updated_at"
+    print("✓ Extended JSON ids kept, HTML rendered from content instead of imported, updated_at renewed")
+
+    for line, expected in (
+        (b"not json", "Invalid JSON"),
+        (b"[1, 2]", "Expected a JSON object"),
+        (b'{"description": "no title"}', "title"),
+        (b'{"title": "Wide", "column_width": 20}', "column_width"),
+    ):
+        try:
+            parse_line(line)
+            raise AssertionError(f"{line!r} should be rejected")
+        except ValueError as e:
+            assert expected in transfer._error_message(e), transfer._error_message(e)
+    print("✓ Invalid JSON and cards failing TodoItem validation rejected")
+
+
+def test_export_import_endpoints():
+    print("Testing /todos/export and /todos/import...")
+
+    import main
+    from app.core.security import create_access_token
+
+    def cookies(role: str) -> dict:
+        return {"access_token": create_access_token({"sub": role, "email": f"{role}@example.com", "name": role, "role": role})}
+
+    async def run():
+        async with main.app.router.lifespan_context(main.app):
+            await todos_collection.collection.delete_many({})
+            for i in range(5):
+                await todos_collection.cached.insert_one({"title": f"Card {i}", "content": f"Text {i}", "rank": "V" + "ABCDE"[i], "html": "<p>x</p>"})
+
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+                response = await client.get("/todos/export", cookies=cookies("user"))
+                assert response.status_code == 403
+                response = await client.post("/todos/import", content=b"", cookies=cookies("user"))
+                assert response.status_code == 403
+
+                response = await client.get("/todos/export", cookies=cookies("admin"))
+                assert response.status_code == 200
+                assert response.headers["content-type"] == "application/x-ndjson"
+                assert response.headers["content-disposition"].startswith('attachment; filename="todos-')
+                lines = response.text.splitlines()
+                assert len(lines) == 5 and all("html" not in json.loads(line) for line in lines)
+                print("✓ Export streams every card as NDJSON, admin only")
+
+                # Restoring a backup replaces the cards it contains
+                await todos_collection.cached.update_one({"title": "Card 0"}, {"$set": {"title": "Changed"}})
+                upload = "\n".join(lines) + '\n{"title": "New card"}\nnot json\n{"title": "Narrow", "column_width": 0}\n'
+                response = await client.post(
+                    "/todos/import", content=upload.encode(), cookies=cookies("admin"),
+                    headers={"Content-Type": "application/x-ndjson"},
+                )
+                assert response.status_code == 200, response.text
+                result = response.json()
+                assert (result["inserted"], result["updated"], result["failed"]) == (1, 5, 2), result
+                assert [error["line"] for error in result["errors"]] == [7, 8]
+
+            docs = await todos_collection.collection.find({}).sort("rank", 1).to_list(None)
+            assert [doc["title"] for doc in docs] == ["Card 0", "Card 1", "Card 2", "Card 3", "Card 4", "New card"]
+            assert docs[-1]["rank"] > docs[-2]["rank"]
+            assert all(doc["html"] == f"<p>Text {i}</p>" for i, doc in enumerate(docs[:5]))
+            print("✓ Import replaces cards by _id, appends new ones and reports failing lines")
+
+    asyncio.run(run())
+
+
+def test_batches():
+    print("Testing batching...")
+
+    async def run():
+        from app.core.database import close_mongodb, connect_to_mongodb
+
+        await connect_to_mongodb()
+        await todos_collection.collection.delete_many({})
+        upload = b"".join(b'{"title": "Card %d"}\n' % i for i in range(7))
+        subscription = broker.subscribe(TOPIC)
+        result = await transfer.import_lines(_chunks(upload), batch_size=3)
+        assert (result.inserted, result.failed) == (7, 0)
+        # Live viewers reload the board once per import, and only if it wrote anything
+        events = [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+        assert events == [{"type": "refresh"}], events
+        result = await transfer.import_lines(_chunks(b"not json\n"), batch_size=3)
+        assert result.failed == 1 and subscription.queue.empty()
+        broker.unsubscribe(subscription)
+        chunks = [chunk async for chunk in transfer.export_lines(batch_size=3)]
+        assert [chunk.count("\n") for chunk in chunks] == [3, 3, 1]
+        await close_mongodb()
+
+    asyncio.run(run())
+    print("✓ Import and export work in fixed-size batches; viewers refreshed once per import")
+
+
+def main():
+    print("=" * 60)
+    print("Todo Export/Import Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_read_lines()
+        test_parse_line()
+        test_export_import_endpoints()
+        test_batches()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
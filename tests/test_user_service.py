@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for find_or_create_user: one upsert per call, concurrent first logins,
+roles from ADMIN_EMAILS and retries after a duplicate key error.
+Runs against the in-memory MongoDB stand-in from benchmarks/.
+Run this with: python tests/test_user_service.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+from pymongo.errors import DuplicateKeyError
+
+from app.auth import user_service
+from app.auth.user_service import find_or_create_user
+from app.core import database
+from app.core.collections import CollectionHelper, users_collection
+from app.core.config import Settings, get_settings
+from benchmarks import mongo_standin
+
+ADMIN_EMAILS = " Admin@Example.com ,, other@example.com"
+
+
+def test_admin_emails():
+    print("Testing ADMIN_EMAILS parsing...")
+
+    original = os.environ.get("ADMIN_EMAILS")
+    os.environ["ADMIN_EMAILS"] = ADMIN_EMAILS
+    get_settings.cache_clear()
+    try:
+        assert get_settings().admin_emails == {"admin@example.com", "other@example.com"}
+    finally:
+        if original is None:
+            del os.environ["ADMIN_EMAILS"]
+        else:
+            os.environ["ADMIN_EMAILS"] = original
+        get_settings.cache_clear()
+    assert Settings(admin_emails="").admin_emails == frozenset()
+    assert Settings(admin_emails=["A@b.c"]).admin_emails == {"a@b.c"}
+    print("✓ Comma-separated emails parsed once, trimmed and lowercased")
+
+
+async def _connect():
+    # Patch and reset here rather than at import: other test modules may have
+    # connected a different client and cached collections from it
+    mongo_standin.install(latency=0.01)
+    await database.connect_to_mongodb()
+    for helper in CollectionHelper.registry:
+        helper._collection = None
+
+
+async def _upserts():
+    await _connect()
+    collection = users_collection.collection
+    await collection.delete_many({})
+    try:
+        before = database.client.operations
+        user = await find_or_create_user("github", "1", "ADMIN@example.com", "Ada")
+        assert database.client.operations - before == 1
+        assert user["role"] == "admin" and user["email"] == "ADMIN@example.com"
+        stored = await collection.find_one({"_id": user["_id"]})
+        assert {key: stored[key] for key in user if key != "created_at"} == {
+            key: value for key, value in user.items() if key != "created_at"
+        }
+        print("✓ A new user is created in one round trip, as admin when listed")
+
+        # Existing users are returned unchanged, whatever the provider reports now
+        before = database.client.operations
+        again = await find_or_create_user("github", "1", "renamed@example.com", "Renamed")
+        assert database.client.operations - before == 1
+        assert again["_id"] == user["_id"] and again["name"] == "Ada"
+        print("✓ An existing user is found in one round trip and left unchanged")
+
+        users = await asyncio.gather(*(
+            find_or_create_user("google", "2", "user@example.com", "Bo") for _ in range(10)
+        ))
+        assert len({u["_id"] for u in users}) == 1 and users[0]["role"] == "user"
+        assert await collection.count_documents({"provider": "google"}) == 1
+        print("✓ Concurrent first logins create a single user")
+
+        # A concurrent upsert winning the race surfaces as a duplicate key error: retried
+        original = collection.find_one_and_update
+        calls = []
+
+        async def racing(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                await original(*args, **kwargs)
+                raise DuplicateKeyError("E11000 duplicate key error", 11000)
+            return await original(*args, **kwargs)
+
+        collection.find_one_and_update = racing
+        try:
+            raced = await find_or_create_user("microsoft", "3", "m@example.com", "Mo")
+        finally:
+            del collection.find_one_and_update
+        assert len(calls) == 2 and raced["provider_id"] == "3"
+        assert await collection.count_documents({"provider": "microsoft"}) == 1
+        print("✓ Duplicate key errors from a racing insert are retried")
+    finally:
+        await database.close_mongodb()
+
+
+def test_upserts():
+    print("Testing find_or_create_user...")
+    original = user_service.settings
+    user_service.settings = Settings(admin_emails=ADMIN_EMAILS)
+    try:
+        asyncio.run(_upserts())
+    finally:
+        user_service.settings = original
+
+
+def main():
+    print("=" * 60)
+    print("User Service Tests")
+    print("=" * 60)
+    print()
+
+    try:
+        test_admin_emails()
+        test_upserts()
+        print()
+        print("=" * 60)
+        print("🎉 All tests passed!")
+        print("=" * 60)
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()